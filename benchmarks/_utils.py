@@ -0,0 +1,22 @@
+import os
+import timeit
+from typing import Callable
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "example_project.settings")
+    import django
+
+    django.setup()
+
+
+def bench(label: str, func: Callable, number: int = 0, repeat: int = 5) -> float:
+    """
+    Prints and returns the best time per call (in seconds) of ``func``.
+    """
+    timer = timeit.Timer(func)
+    if not number:
+        number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    print(f"{label:<48} {best * 1e6:>14.3f} us/call ({number} loops)")
+    return best
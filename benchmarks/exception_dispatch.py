@@ -0,0 +1,50 @@
+"""
+Dispatch cost of :class:`certego_saas.ext.exceptions.ExceptionHandlerRegistry`
+as the number of registered handlers grows.
+
+    $ python -m benchmarks.exception_dispatch
+"""
+from ._utils import bench, setup_django
+
+setup_django()
+
+from rest_framework.exceptions import NotFound  # noqa
+
+from certego_saas.ext.exceptions import ExceptionHandlerRegistry  # noqa
+
+
+def _handler(exc, context, response):
+    return response
+
+
+class DeepNotFound(NotFound):
+    pass
+
+
+class DeeperNotFound(DeepNotFound):
+    pass
+
+
+def main():
+    for size in (3, 30, 300, 3000):
+        exc_classes = [type(f"Error{i}", (Exception,), {}) for i in range(size)]
+        registry = ExceptionHandlerRegistry({"NotFound": _handler})
+        for exc_class in exc_classes:
+            registry.register(exc_class, _handler)
+        bench(
+            f"{size:>5} handlers, registered class",
+            lambda: registry.resolve(exc_classes[-1]),
+        )
+        bench(
+            f"{size:>5} handlers, 2 levels below a registered class",
+            lambda: registry.resolve(DeeperNotFound),
+        )
+        bench(
+            f"{size:>5} handlers, unregistered class",
+            lambda: registry.resolve(KeyError),
+        )
+        print()
+
+
+if __name__ == "__main__":
+    main()
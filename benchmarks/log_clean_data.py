@@ -0,0 +1,83 @@
+"""
+Compares :meth:`certego_saas.ext.log.LogBuilder._clean_data`
+with the previous recursive, ``ast.literal_eval``-on-every-value implementation.
+
+    $ python -m benchmarks.log_clean_data
+"""
+import ast
+import json
+
+from ._utils import bench, setup_django
+
+setup_django()
+
+from certego_saas.apps.payments.consts import STRIPE_SENSITIVE_FIELDS_SET  # noqa
+from certego_saas.ext.log import LogBuilder  # noqa
+
+
+class LegacyLogBuilder(LogBuilder):
+    def _clean_data(self, data):
+        if isinstance(data, bytes):
+            data = data.decode(errors="replace")
+
+        if isinstance(data, list):
+            return [self._clean_data(d) for d in data]
+        if isinstance(data, dict):
+            data = dict(data)
+
+            for key, value in data.items():
+                try:
+                    value = ast.literal_eval(value)
+                except (ValueError, SyntaxError):
+                    pass
+                if isinstance(value, (list, dict)):
+                    data[key] = self._clean_data(value)
+                if key.lower() in self.sensitive_fields:
+                    data[key] = self.CLEANED_SUBSTITUTE
+        return data
+
+
+def make_body(size: int) -> dict:
+    """
+    Request body of (roughly) ``size`` bytes once JSON encoded.
+    """
+    item = {
+        "name": "sample.exe",
+        "hash": "d41d8cd98f00b204e9800998ecf8427e",
+        "private": "False",
+        "count": "42",
+        "tags": ["malware", "pe"],
+        "options": "{'timeout': 60, 'api': 'abc'}",
+        "token": "secret",
+    }
+    item_size = len(json.dumps(item))
+    return {
+        "password": "hunter2",
+        "files": [dict(item, id=i) for i in range(max(1, size // item_size))],
+    }
+
+
+def main():
+    for label, size in (
+        ("1 KB", 1024),
+        ("100 KB", 100 * 1024),
+        ("5 MB", 5 * 1024**2),
+    ):
+        body = make_body(size)
+        results = []
+        for cls in (LegacyLogBuilder, LogBuilder):
+            builder = cls(request=None, response=None, view=None)
+            builder.sensitive_fields = STRIPE_SENSITIVE_FIELDS_SET
+            results.append(
+                bench(
+                    f"{cls.__name__} {label}",
+                    lambda b=builder: b._clean_data(body),
+                    number=1 if size > 1024**2 else 0,
+                    repeat=3,
+                )
+            )
+        print(f"{'speedup':<48} {results[0] / results[1]:>12.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
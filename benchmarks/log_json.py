@@ -0,0 +1,89 @@
+"""
+Compares the default (``repr``) formatting of the records produced by
+:func:`certego_saas.ext.exceptions.custom_exception_handler`
+with :class:`certego_saas.ext.formatters.JSONLogFormatter`.
+
+    $ python -m benchmarks.log_json
+"""
+import logging
+import time
+
+from ._utils import bench, setup_django
+
+setup_django()
+
+from rest_framework.exceptions import APIException  # noqa
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa
+from rest_framework.views import APIView  # noqa
+
+from certego_saas.ext import formatters  # noqa
+from certego_saas.ext.exceptions import custom_exception_handler  # noqa
+from certego_saas.models import User  # noqa
+
+
+class _CaptureHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class FailingView(APIView):
+    def post(self, request, *args, **kwargs):
+        raise APIException("upstream failure")
+
+
+def make_records(body_size: int, count: int = 10):
+    handler = _CaptureHandler()
+    logger = logging.getLogger("certego_saas.ext.log")
+    logger.addHandler(handler)
+    logger.propagate = False
+    factory = APIRequestFactory()
+    user = User(pk=1, username="benchmark")
+    view = FailingView()
+    for i in range(count):
+        request = factory.post(
+            f"/api/jobs/{i}",
+            {"file_name": "sample.exe", "comment": "x" * body_size, "token": "abc"},
+            format="json",
+        )
+        request.x_request_time = time.time()
+        force_authenticate(request, user=user)
+        view.request = view.initialize_request(request)
+        try:
+            view.post(view.request)
+        except APIException as exc:
+            custom_exception_handler(exc, {"request": view.request, "view": view})
+    logger.removeHandler(handler)
+    return handler.records
+
+
+def main():
+    print(f"orjson available: {formatters.orjson is not None}\n")
+    default_formatter = logging.Formatter()
+    json_formatter = formatters.JSONLogFormatter()
+    for label, size in (("small body", 100), ("large body", 100 * 1024)):
+        records = make_records(size)
+        bench(
+            f"repr formatter, {label}",
+            lambda: [default_formatter.format(r) for r in records],
+        )
+        bench(
+            f"JSONLogFormatter, {label}",
+            lambda: [json_formatter.format(r) for r in records],
+        )
+        if formatters.orjson is not None:
+            bench(
+                f"JSONLogFormatter (stdlib json), {label}",
+                lambda: [
+                    formatters._json_dumps(formatters.serialize_log(r.msg))
+                    for r in records
+                ],
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
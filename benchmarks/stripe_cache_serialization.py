@@ -0,0 +1,150 @@
+"""
+Compares the cache footprint and deserialization time of whole pickled
+stripe objects with their compact form
+(:mod:`certego_saas.apps.payments.serialization`).
+
+    $ python -m benchmarks.stripe_cache_serialization
+"""
+import pickle
+
+from ._utils import bench, setup_django
+
+setup_django()
+
+import stripe  # noqa
+
+from certego_saas.apps.payments import serialization  # noqa
+from certego_saas.apps.payments.serialization import pack, unpack  # noqa
+
+PRODUCT = {
+    "id": "prod_benchmark",
+    "object": "product",
+    "name": "Researcher",
+    "description": "50 submissions",
+    "active": True,
+    "images": [],
+    "metadata": {
+        "appname": "DRAGONFLY",
+        "max_submissions": "50",
+        "submission_type": "public",
+        "priority": "False",
+        "concurrent_profiles": "1",
+    },
+    "created": 1600000000,
+    "updated": 1600000000,
+    "livemode": False,
+}
+PRICE = {
+    "id": "price_benchmark",
+    "object": "price",
+    "active": True,
+    "currency": "eur",
+    "unit_amount": 1500,
+    "recurring": {"interval": "month", "interval_count": 1, "usage_type": "licensed"},
+    "product": "prod_benchmark",
+    "livemode": False,
+    "metadata": {},
+}
+ADDRESS = {
+    "city": "Modena",
+    "country": "IT",
+    "line1": "Via Benchmark 1",
+    "postal_code": "41100",
+}
+
+
+def make_invoice(index: int, lines: int) -> dict:
+    return {
+        "id": f"in_{index}",
+        "object": "invoice",
+        "customer": "cus_benchmark",
+        "subscription": "sub_benchmark",
+        "status": "paid",
+        "currency": "eur",
+        "description": None,
+        "total": 1500,
+        "subtotal": 1500,
+        "amount_due": 1500,
+        "amount_paid": 1500,
+        "amount_remaining": 0,
+        "created": 1600000000 + index,
+        "due_date": None,
+        "hosted_invoice_url": f"https://invoice.stripe.com/i/in_{index}",
+        "invoice_pdf": f"https://pay.stripe.com/invoice/in_{index}/pdf",
+        "customer_address": ADDRESS,
+        "customer_email": "benchmark@certego.net",
+        "status_transitions": {"finalized_at": 1, "paid_at": 2},
+        "lines": {
+            "object": "list",
+            "has_more": False,
+            "url": f"/v1/invoices/in_{index}/lines",
+            "data": [
+                {
+                    "id": f"il_{index}_{line}",
+                    "object": "line_item",
+                    "amount": 1500,
+                    "currency": "eur",
+                    "description": "1 × Researcher (at €15.00 / month)",
+                    "period": {"start": 1600000000, "end": 1602600000},
+                    "price": PRICE,
+                    "metadata": {},
+                }
+                for line in range(lines)
+            ],
+        },
+    }
+
+
+SUBSCRIPTION = stripe.Subscription.construct_from(
+    {
+        "id": "sub_benchmark",
+        "object": "subscription",
+        "customer": "cus_benchmark",
+        "status": "active",
+        "current_period_start": 1600000000,
+        "current_period_end": 1602600000,
+        "start_date": 1600000000,
+        "created": 1600000000,
+        "cancel_at_period_end": False,
+        "default_payment_method": "pm_benchmark",
+        "items": {
+            "object": "list",
+            "data": [
+                {"id": "si_benchmark", "object": "subscription_item", "price": PRICE}
+            ],
+        },
+        "plan": {
+            "id": "price_benchmark",
+            "object": "plan",
+            "amount": 1500,
+            "currency": "eur",
+            "interval": "month",
+            "product": PRODUCT,
+        },
+        "latest_invoice": make_invoice(0, lines=3),
+    },
+    "key",
+)
+INVOICES = [
+    stripe.Invoice.construct_from(make_invoice(i, lines=3), "key") for i in range(24)
+]
+
+
+def compare(label: str, obj) -> None:
+    full = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    compact = pickle.dumps(pack(obj), pickle.HIGHEST_PROTOCOL)
+    print(f"{label}: {len(full)} bytes pickled, {len(compact)} bytes compact")
+    bench(f"{label}: pickle.loads (current)", lambda: pickle.loads(full))
+
+    def cold():
+        # first read of the entry in this process
+        serialization._constructed.clear()
+        return unpack(pickle.loads(compact))
+
+    bench(f"{label}: pickle.loads + unpack (first read)", cold)
+    bench(f"{label}: pickle.loads + unpack", lambda: unpack(pickle.loads(compact)))
+
+
+if __name__ == "__main__":
+    compare("subscription", SUBSCRIPTION)
+    compare("24 invoices", INVOICES)
@@ -0,0 +1,120 @@
+"""
+Latency and throughput of the payments stripe calls against a local
+fake stripe server (:mod:`certego_saas.ext.test_utilities.fake_stripe`),
+with stripe's default HTTP client (2 retries) and with
+:class:`certego_saas.apps.payments.http_client.StripeHTTPClient` (1 retry).
+
+    $ python -m benchmarks.stripe_http_client
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ._utils import bench, setup_django
+
+setup_django()
+
+import stripe  # noqa
+
+from certego_saas.apps.payments.catalog import build_snapshot, list_prices  # noqa
+from certego_saas.apps.payments.http_client import StripeHTTPClient  # noqa
+from certego_saas.ext.test_utilities.fake_stripe import FakeStripeServer  # noqa
+from certego_saas.models import Customer, Subscription  # noqa
+
+# simulated stripe response time (seconds)
+LATENCY = 0.002
+THREADS = 16
+CALLS = 800
+FAILURES = 10
+
+PRODUCT = {
+    "id": "prod_bench",
+    "object": "product",
+    "name": "Researcher",
+    "active": True,
+    "metadata": {"max_submissions": "50", "appname": "DRAGONFLY"},
+}
+SUBSCRIPTION = {
+    "id": "sub_bench",
+    "object": "subscription",
+    "customer": "cus_bench",
+    "status": "active",
+    "current_period_start": 1000,
+    "current_period_end": 2000,
+    "plan": {"id": "price_0", "object": "plan", "product": PRODUCT},
+}
+
+# the cache aliases of example_project are dummy caches: every call hits stripe
+subscription = Subscription(subscription_id="sub_bench", appname="DRAGONFLY")
+customer = Customer(customer_id="cus_bench")
+
+FLOWS = {
+    "get_subscription": lambda: subscription.get_subscription(),
+    "get_products (uncached)": lambda: build_snapshot(list_prices()),
+    "checkout session": lambda: customer.create_checkout_session(
+        "price_0", "https://ok", "https://ko"
+    ),
+}
+
+
+def throughput(server: FakeStripeServer) -> None:
+    connections = server.connections
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        list(executor.map(lambda _: subscription.get_subscription(), range(CALLS)))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'get_subscription, ' + str(THREADS) + ' threads':<48} "
+        f"{CALLS / elapsed:>14.1f} calls/s "
+        f"({server.connections - connections} new connections)"
+    )
+
+
+def time_to_failure(server: FakeStripeServer) -> None:
+    # stripe 5xx: retried, then raised
+    server.status = 500
+    start = time.perf_counter()
+    for _ in range(FAILURES):
+        try:
+            stripe.Subscription.retrieve("sub_bench")
+        except stripe.error.APIError:
+            pass
+    elapsed = (time.perf_counter() - start) / FAILURES
+    server.status = 200
+    print(
+        f"{'time to failure, stripe 5xx':<48} {elapsed * 1e3:>14.1f} ms/call "
+        f"({stripe.max_network_retries} retries)"
+    )
+
+
+def main():
+    # client -> max network retries
+    clients = {
+        stripe.RequestsClient(): 2,
+        StripeHTTPClient(pool_size=THREADS): 1,
+    }
+    with FakeStripeServer(latency=LATENCY) as server:
+        stripe.api_base = server.url
+        server.add(SUBSCRIPTION)
+        server.add(PRODUCT)
+        for i in range(20):
+            server.add(
+                {
+                    "id": f"price_{i}",
+                    "object": "price",
+                    "currency": "eur",
+                    "unit_amount": 1500,
+                    "product": PRODUCT,
+                }
+            )
+        for client, retries in clients.items():
+            print(f"-- {type(client).__name__}")
+            stripe.default_http_client = client
+            stripe.max_network_retries = retries
+            for label, flow in FLOWS.items():
+                bench(label, flow, number=200)
+            throughput(server)
+            time_to_failure(server)
+
+
+if __name__ == "__main__":
+    main()
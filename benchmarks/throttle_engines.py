@@ -0,0 +1,62 @@
+"""
+Cost per request of the throttle engines of :mod:`certego_saas.ext.throttling`
+for a single key at 10k requests/min, on a local memory cache.
+
+    $ python -m benchmarks.throttle_engines
+"""
+import time
+from types import SimpleNamespace
+
+from ._utils import setup_django
+
+setup_django()
+
+from django.core.cache.backends.locmem import LocMemCache  # noqa
+
+from certego_saas.ext.throttling import THROTTLE_ENGINES  # noqa
+from certego_saas.ext.throttling import POSTModelUserRateThrottle  # noqa
+from certego_saas.models import User  # noqa
+
+REQUESTS = 10_000
+
+
+class _View:
+    action = "create"
+
+
+def run(engine: str) -> None:
+    class Throttle(POSTModelUserRateThrottle):
+        rate = f"{REQUESTS}/min"
+
+    Throttle.engine = engine
+    Throttle.cache = LocMemCache(f"bench-{engine}", {"OPTIONS": {"MAX_ENTRIES": 10}})
+    # user specific rates are resolved once per request: not measured here
+    request = SimpleNamespace(
+        user=User(pk=1, username="bench"),
+        method="POST",
+        META={},
+        _certego_throttle_rates={},
+    )
+    view = _View()
+    # 10k requests spread over one minute of simulated time
+    clock = SimpleNamespace(now=0.0)
+    Throttle.timer = lambda self: clock.now
+    allowed = 0
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        clock.now = i * 60 / REQUESTS
+        allowed += Throttle().allow_request(request, view)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{engine:<10} {elapsed / REQUESTS * 1e6:>10.1f} us/request, "
+        f"{allowed} allowed, {len(Throttle.cache._cache)} cache entries"
+    )
+
+
+def main():
+    for engine in THROTTLE_ENGINES:
+        run(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from typing import Dict, Optional
+
+from .membership import Membership
+from .organization import Organization
+
+__all__ = [
+    "MembershipContext",
+    "get_membership_context",
+]
+
+
+def get_owner_id(obj) -> Optional[int]:
+    """
+    Primary key of the ``user`` owning ``obj``, without loading the user.
+    """
+    user_id = getattr(obj, "user_id", None)
+    if user_id is None and (user := getattr(obj, "user", None)):
+        user_id = user.pk
+    return user_id
+
+
+class MembershipContext:
+    """
+    Memberships (with their organization) resolved once per request,
+    keyed by user pk, for the permission classes and the querysets of
+    :mod:`certego_saas.apps.organization`.
+    The memberships of all the users asked at once are loaded
+    with a single query.
+    """
+
+    def __init__(self):
+        # user pk -> membership, None if not a member
+        self._memberships: Dict[int, Optional[Membership]] = {}
+        self._certego_pk: Optional[int] = None
+
+    def load(self, *user_ids: Optional[int]) -> None:
+        missing = {
+            pk for pk in user_ids if pk is not None and pk not in self._memberships
+        }
+        if not missing:
+            return
+        for membership in Membership.objects.select_related("organization").filter(
+            user_id__in=missing
+        ):
+            self._memberships[membership.user_id] = membership
+        for pk in missing:
+            self._memberships.setdefault(pk, None)
+
+    def get(self, user_id: Optional[int]) -> Optional[Membership]:
+        self.load(user_id)
+        return self._memberships.get(user_id)
+
+    def get_organization_id(self, user_id: Optional[int]) -> Optional[int]:
+        membership = self.get(user_id)
+        return membership.organization_id if membership else None
+
+    def is_admin(self, user_id: Optional[int], organization_id: int) -> bool:
+        membership = self.get(user_id)
+        return bool(
+            membership
+            and membership.is_admin
+            and membership.organization_id == organization_id
+        )
+
+    @property
+    def certego_pk(self) -> int:
+        if self._certego_pk is None:
+            self._certego_pk = Organization.certego().pk
+        return self._certego_pk
+
+
+def get_membership_context(request) -> MembershipContext:
+    """
+    The :class:`MembershipContext` of ``request``, created on first use.
+    """
+    try:
+        return request._certego_membership_context
+    except AttributeError:
+        context = MembershipContext()
+        request._certego_membership_context = context
+        return context
@@ -1,7 +1,7 @@
 from django.db.models import Q
 from rest_framework.viewsets import GenericViewSet
 
-from .organization import Organization
+from .context import get_membership_context
 from .permissions import (
     IsObjectOwnerOrSameOrgOrCertegoOrgPermission,
     IsObjectOwnerPermission,
@@ -33,16 +33,18 @@ class ObjectUserQuerysetMixin(GenericViewSet):
         queryset = super().get_queryset()
         if self.action in self.TO_FILTER_VIEW_ACTIONS:
             user = self.request.user
-            if user.has_membership():
+            context = get_membership_context(self.request)
+            organization_id = context.get_organization_id(user.pk)
+            if organization_id is not None:
                 query = Q(user=user) | Q(
                     user__membership__organization_id__in=[
-                        user.membership.organization_id,
-                        Organization.certego().pk,
+                        organization_id,
+                        context.certego_pk,
                     ]
                 )
             else:
                 query = Q(user=user) | Q(
-                    user__membership__organization_id=Organization.certego().pk
+                    user__membership__organization_id=context.certego_pk
                 )
             queryset = queryset.filter(query)
         return queryset
@@ -1,7 +1,7 @@
 from rest_framework.permissions import BasePermission
 
+from .context import get_membership_context, get_owner_id
 from .invitation import Invitation
-from .membership import Membership
 from .organization import Organization
 
 
@@ -14,58 +14,56 @@ class InvitationDestroyObjectPermission(BasePermission):
     message = "Invitation was previously accepted or declined so cannot be deleted."
 
     def has_object_permission(self, request, view, obj: Invitation):
-        is_pending = obj.is_pending()
-        try:
-            Membership.objects.get(
-                user__username=request.user,
-                organization=obj.organization,
-                is_admin=True,
-            )
-        except Membership.DoesNotExist:
+        context = get_membership_context(request)
+        if not context.is_admin(request.user.pk, obj.organization_id):
             return False
-        return is_pending
+        return obj.is_pending()
 
 
 class IsObjectOwnerPermission(BasePermission):
     def has_object_permission(self, request, view, obj):
         if isinstance(obj, Organization):
-            return obj.owner == request.user
-        if obj_owner := getattr(obj, "user", None):
-            return obj_owner == request.user
+            membership = get_membership_context(request).get(request.user.pk)
+            return bool(
+                membership
+                and membership.is_owner
+                and membership.organization_id == obj.pk
+            )
+        if owner_id := get_owner_id(obj):
+            return owner_id == request.user.pk
         return False
 
 
 class IsObjectAdminPermission(BasePermission):
     def has_object_permission(self, request, view, obj: Organization):
-        try:
-            return Membership.objects.get(
-                user__username=request.user, organization=obj, is_admin=True
-            )
-        except Membership.DoesNotExist:
-            return False
+        return get_membership_context(request).is_admin(request.user.pk, obj.pk)
 
 
 class IsObjectSameOrgPermission(BasePermission):
     def has_object_permission(self, request, view, obj):
+        context = get_membership_context(request)
         if isinstance(obj, Organization):
-            return obj.user_has_membership(request.user)
-        if obj_owner := getattr(obj, "user", None):
+            return context.get_organization_id(request.user.pk) == obj.pk
+        if owner_id := get_owner_id(obj):
+            # both memberships with a single query
+            context.load(request.user.pk, owner_id)
+            organization_id = context.get_organization_id(owner_id)
             return (
-                obj_owner.has_membership()
-                and request.user.has_membership()
-                and obj_owner.membership.organization_id
-                == request.user.membership.organization_id
+                organization_id is not None
+                and organization_id == context.get_organization_id(request.user.pk)
             )
         return False
 
 
 class IsObjectCertegoOrgPermission(BasePermission):
     def has_object_permission(self, request, view, obj):
-        if obj_owner := getattr(obj, "user", None):
-            return (
-                obj_owner.has_membership()
-                and obj_owner.membership.organization_id == Organization.certego().pk
-            )
+        if owner_id := get_owner_id(obj):
+            context = get_membership_context(request)
+            organization_id = context.get_organization_id(owner_id)
+            # no need to look up the certego organization
+            if organization_id is None:
+                return False
+            return organization_id == context.certego_pk
         return False
 
 
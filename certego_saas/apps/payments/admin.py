@@ -1,9 +1,12 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 
-from .models import Customer, Subscription
+from .models import Customer, PendingCustomer, Subscription
 
 __all__ = [
     "CustomerAdmin",
+    "PendingCustomerAdmin",
+    "SubscriptionAdmin",
 ]
 
 # Register sites!
@@ -21,6 +24,26 @@ class CustomerAdmin(admin.ModelAdmin):
         "currentapp_subscription",
     )
 
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("user")
+            .prefetch_related("subscriptions")
+        )
+
+
+class SubscriptionChangeList(ChangeList):
+    """
+    Resolves the product names of a whole page at once.
+    """
+
+    def get_results(self, request):
+        super().get_results(request)
+        names = Subscription.resolve_product_names(self.result_list)
+        for subscription in self.result_list:
+            subscription.resolved_product_name = names.get(subscription.subscription_id)
+
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
@@ -34,3 +57,26 @@ class SubscriptionAdmin(admin.ModelAdmin):
         "appname",
         "product_name",
     )
+    list_select_related = ("customer",)
+
+    def get_changelist(self, request, **kwargs):
+        return SubscriptionChangeList
+
+    @admin.display(description="product name")
+    def product_name(self, obj: Subscription):
+        return getattr(obj, "resolved_product_name", None)
+
+
+@admin.register(PendingCustomer)
+class PendingCustomerAdmin(admin.ModelAdmin):
+    """
+    Django's ModelAdmin for ``PendingCustomer``.
+    """
+
+    list_display = (
+        "user",
+        "created_at",
+        "attempts",
+        "next_attempt_at",
+        "last_error",
+    )
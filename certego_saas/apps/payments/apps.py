@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CertegoPaymentsConfig(AppConfig):
     name = "certego_saas.apps.payments"
     label = "certego_saas_payments"
+
+    def ready(self):
+        from .http_client import configure
+
+        configure()
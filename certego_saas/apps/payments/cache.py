@@ -1,16 +1,176 @@
+import logging
+import math
+import random
+import time
+from functools import wraps
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple, Type
+
 from cache_memoize import cache_memoize as _cache_memoize
 from django.core.cache import caches
 
 from .consts import CACHE_ALIAS
+from .serialization import is_packed, pack, unpack
 
 __all__ = ["cache_memoize", "get_cache"]
 
+logger = logging.getLogger(__name__)
+
+
+class _Entry(NamedTuple):
+    value: Any
+    # unix time when the entry expires
+    expires_at: float
+    # seconds taken to compute the value
+    delta: float
+    is_exception: bool = False
 
-def cache_memoize(*args, **kwargs):
+
+def cache_memoize(
+    timeout,
+    *args,
+    single_flight: bool = False,
+    early_refresh: float = 0,
+    negative_timeout: Optional[int] = None,
+    negative_exceptions: Tuple[Type[Exception], ...] = (),
+    lock_timeout: int = 30,
+    compact: bool = False,
+    keep_last_known: Optional[int] = None,
+    **kwargs,
+):
     """
     Custom ``cache_memoize``.
+
+    Without the extra options, it's ``django-cache-memoize`` on the
+    ``certego_saas.payments`` cache. Extra options, against cache stampedes:
+
+    - ``single_flight``: on a miss, only the caller that acquires a lock
+      (cache ``add``) computes the value, the others wait for it
+      (at most ``lock_timeout`` seconds) and compute it themselves
+      if the lock is released without a value.
+    - ``early_refresh``: ``beta`` of the probabilistic early recomputation
+      (`XFetch <https://cseweb.ucsd.edu/~avattani/papers/cache_stampede.pdf>`__):
+      the higher, the earlier a caller recomputes the value before it expires;
+      ``1`` is a good default, ``0`` disables it.
+    - ``negative_timeout``: the ``negative_exceptions`` raised by the function
+      are cached (and raised again) for ``negative_timeout`` seconds.
+    - ``compact``: the returned stripe object(s) are cached in the compact
+      form of :mod:`certego_saas.apps.payments.serialization`; callers
+      always get the objects rebuilt from it, on hits and misses alike.
+    - ``keep_last_known``: a copy of the last computed value is kept for
+      ``keep_last_known`` seconds, even after the entry expires or is
+      invalidated; ``get_last_known(*args, **kwargs)`` returns it (or
+      ``None``), e.g. to serve something while the source is down.
+
+    ``invalidate``, ``get_cache_key`` and ``_refresh=True``
+    work as with ``django-cache-memoize``; ``get_cached_many(calls)``
+    returns the cached values (``None`` if missing) of a list of
+    ``args`` tuples, with a single cache round trip and without computing.
     """
-    return _cache_memoize(*args, **kwargs, cache_alias=CACHE_ALIAS)
+    kwargs["cache_alias"] = CACHE_ALIAS
+    if not (
+        single_flight or early_refresh or negative_timeout or compact or keep_last_known
+    ):
+        return _cache_memoize(timeout, *args, **kwargs)
+
+    def decorator(func):
+        # used only for the cache key and the invalidation
+        memoized = _cache_memoize(timeout, *args, **kwargs)(func)
+
+        def compute(cache, cache_key, call_args, call_kwargs) -> _Entry:
+            start = time.time()
+            try:
+                value = func(*call_args, **call_kwargs)
+            except negative_exceptions as e:
+                if not negative_timeout:
+                    raise
+                entry = _Entry(e, start + negative_timeout, 0, is_exception=True)
+                cache.set(cache_key, entry, negative_timeout)
+                return entry
+            if compact:
+                value = pack(value)
+            now = time.time()
+            entry = _Entry(value, now + timeout, now - start)
+            cache.set(cache_key, entry, timeout)
+            if keep_last_known:
+                cache.set(f"last_known.{cache_key}", value, keep_last_known)
+            return entry
+
+        def should_refresh_early(entry: _Entry) -> bool:
+            if not early_refresh or entry.is_exception:
+                return False
+            # -log(u) is exponentially distributed: the closer to the expiry,
+            # the higher the probability of recomputing the value
+            jitter = -entry.delta * early_refresh * math.log(1 - random.random())
+            return time.time() + jitter >= entry.expires_at
+
+        def wait_for(cache, cache_key, lock_key) -> Optional[_Entry]:
+            deadline = time.monotonic() + lock_timeout
+            interval = 0.01
+            while time.monotonic() < deadline:
+                time.sleep(interval)
+                entry = cache.get(cache_key, None)
+                if isinstance(entry, _Entry):
+                    return entry
+                if cache.get(lock_key, None) is None:
+                    # the lock holder failed without caching anything
+                    return None
+                interval = min(interval * 2, 0.5)
+            return None
+
+        @wraps(func)
+        def inner(*call_args, **call_kwargs):
+            cache = caches[CACHE_ALIAS]
+            refresh = bool(call_kwargs.pop("_refresh", False))
+            cache_key = memoized.get_cache_key(*call_args, **call_kwargs)
+            entry = None if refresh else cache.get(cache_key, None)
+            if not isinstance(entry, _Entry) or (
+                compact and not entry.is_exception and not is_packed(entry.value)
+            ):
+                # missing, or stored with another format/schema version
+                entry = None
+
+            if entry is None or refresh or should_refresh_early(entry):
+                lock_key = f"lock.{cache_key}"
+                if not single_flight or cache.add(lock_key, 1, lock_timeout):
+                    try:
+                        entry = compute(cache, cache_key, call_args, call_kwargs)
+                    finally:
+                        if single_flight:
+                            cache.delete(lock_key)
+                elif entry is None:
+                    # somebody else is computing it
+                    entry = wait_for(cache, cache_key, lock_key) or compute(
+                        cache, cache_key, call_args, call_kwargs
+                    )
+
+            if entry.is_exception:
+                raise entry.value
+            return unpack(entry.value) if compact else entry.value
+
+        def get_last_known(*call_args, **call_kwargs):
+            cache_key = memoized.get_cache_key(*call_args, **call_kwargs)
+            value = caches[CACHE_ALIAS].get(f"last_known.{cache_key}", None)
+            return unpack(value) if compact else value
+
+        def get_cached_many(calls: Iterable[tuple]) -> List[Any]:
+            keys = [memoized.get_cache_key(*call_args) for call_args in calls]
+            cached = caches[CACHE_ALIAS].get_many(keys)
+            values = []
+            for key in keys:
+                entry = cached.get(key)
+                if not isinstance(entry, _Entry) or entry.is_exception:
+                    values.append(None)
+                else:
+                    values.append(unpack(entry.value) if compact else entry.value)
+            return values
+
+        inner.invalidate = memoized.invalidate
+        inner.get_last_known = get_last_known
+        inner.get_cached_many = get_cached_many
+        inner.get_cache_key = memoized.get_cache_key
+        return inner
+
+    return decorator
 
 
 def get_cache():
@@ -0,0 +1,218 @@
+"""
+Stripe products catalog: a single snapshot of all the prices
+(with their product) shared by :func:`certego_saas.apps.payments.utils.get_products`,
+:func:`certego_saas.apps.payments.utils.get_products_prices_map`
+and :func:`certego_saas.apps.payments.utils.get_default_product`.
+
+The snapshot is kept in process memory and in the payments cache:
+
+- a cold process loads it synchronously, once (from the cache if possible).
+- a process revalidates its snapshot against the cache at most every
+  ``CatalogLoader.check_interval`` seconds.
+- an expired or invalidated snapshot keeps being served while a single
+  background thread, in a single process (cache lock), fetches the new one.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import stripe
+
+from certego_saas.settings import certego_apps_settings
+
+from .cache import get_cache
+from .circuit import call
+from .consts import PRODUCTS_CACHE_TIMEOUT
+
+__all__ = [
+    "CatalogSnapshot",
+    "CatalogLoader",
+    "build_snapshot",
+    "catalog",
+    "list_prices",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def list_prices() -> List[stripe.Price]:
+    """
+    Returns all the stripe prices with the ``product`` expanded,
+    from the local mirror if ``STRIPE_MIRROR_ENABLED``.
+
+    Alias for ``stripe.Price.list(expand=["data.product"])``, paginated.
+    """
+    if certego_apps_settings.STRIPE_MIRROR_ENABLED:
+        from .models import StripePrice
+
+        return [
+            stripe.Price.construct_from(
+                price.to_dict(expand_product=True), stripe.api_key
+            )
+            for price in StripePrice.objects.select_related("product")
+        ]
+    return call(
+        lambda: list(
+            stripe.Price.list(expand=["data.product"], limit=100).auto_paging_iter()
+        )
+    )
+
+
+class CatalogSnapshot(NamedTuple):
+    """
+    Immutable view of the catalog; the ``dict`` items are shared
+    between requests and must not be modified.
+    """
+
+    fetched_at: float
+    # active products, except "Integration"
+    products: Tuple[Dict[str, Any], ...]
+    # price id, product id and "<product name>__<appname>" -> product
+    prices_map: Dict[str, Dict[str, Any]]
+
+
+def build_snapshot(prices: List[Any], fetched_at: Optional[float] = None):
+    """
+    Builds both the views of the catalog from a single prices listing.
+    """
+    products = []
+    prices_map = {}
+    for price in prices:
+        price = price.to_dict() if isinstance(price, stripe.StripeObject) else price
+        product = price["product"]
+        metadata = product.get("metadata") or {}
+        if product["name"] != "Integration" and product.get("active", True):
+            products.append(
+                {
+                    "id": product["id"],
+                    "name": product["name"],
+                    "description": product.get("description"),
+                    "metadata": metadata,
+                    "currency": price["currency"],
+                    "unit_amount": price.get("unit_amount"),
+                }
+            )
+        obj = {
+            "id": product["id"],
+            "price_id": price["id"],
+            "name": product["name"],
+            "metadata": metadata,
+        }
+        prices_map[price["id"]] = obj
+        prices_map[product["id"]] = obj
+        prices_map[f"{product['name']}__{metadata.get('appname')}"] = obj
+    return CatalogSnapshot(
+        fetched_at=time.time() if fetched_at is None else fetched_at,
+        products=tuple(products),
+        prices_map=prices_map,
+    )
+
+
+class CatalogLoader:
+    """
+    Stale-while-revalidate loader of the :class:`CatalogSnapshot`.
+    """
+
+    CACHE_KEY = "payments.catalog"
+    CACHE_LOCK_KEY = "lock.payments.catalog"
+
+    def __init__(
+        self,
+        ttl: float = PRODUCTS_CACHE_TIMEOUT,
+        check_interval: float = 60,
+        lock_timeout: float = 60,
+        background: bool = True,
+        cache=None,
+    ):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.lock_timeout = lock_timeout
+        self.background = background
+        self._cache = cache
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def cache(self):
+        return self._cache or get_cache()
+
+    def get(self) -> CatalogSnapshot:
+        """
+        Returns the current snapshot, never waiting for stripe
+        unless no snapshot is available at all.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._get_shared() or self._fetch()
+                    self._checked_at = time.monotonic()
+                return self._snapshot
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._revalidate(snapshot)
+        return self._snapshot  # type: ignore
+
+    def invalidate(self) -> None:
+        """
+        Marks the snapshot as expired in every process.
+        """
+        self.cache.delete(self.CACHE_KEY)
+        self._checked_at = 0.0
+
+    # internals
+
+    def _get_shared(self) -> Optional[CatalogSnapshot]:
+        try:
+            return self.cache.get(self.CACHE_KEY, None)
+        except Exception as e:
+            logger.warning(f"Failed to read the catalog from the cache: {e}")
+            return None
+
+    def _revalidate(self, snapshot: CatalogSnapshot) -> None:
+        self._checked_at = time.monotonic()
+        shared = self._get_shared()
+        if shared is not None and shared.fetched_at > snapshot.fetched_at:
+            self._snapshot = snapshot = shared
+        if shared is None or time.time() - snapshot.fetched_at >= self.ttl:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        # a single process refreshes the shared snapshot
+        if not self.cache.add(self.CACHE_LOCK_KEY, 1, self.lock_timeout):
+            self._refreshing = False
+            return
+        if self.background:
+            threading.Thread(
+                target=self._refresh_locked, name="catalog-refresh", daemon=True
+            ).start()
+        else:
+            self._refresh_locked()
+
+    def _refresh_locked(self) -> None:
+        try:
+            self._snapshot = self._fetch()
+        except Exception as e:
+            # keep serving the stale snapshot
+            logger.warning(f"Failed to refresh the stripe catalog: {e}")
+        finally:
+            self.cache.delete(self.CACHE_LOCK_KEY)
+            self._refreshing = False
+
+    def _fetch(self) -> CatalogSnapshot:
+        snapshot = build_snapshot(list_prices())
+        try:
+            # outlives the ttl: expired snapshots are still served
+            self.cache.set(self.CACHE_KEY, snapshot, self.ttl * 2)
+        except Exception as e:
+            logger.warning(f"Failed to store the catalog in the cache: {e}")
+        return snapshot
+
+
+catalog = CatalogLoader()
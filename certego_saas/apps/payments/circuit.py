@@ -0,0 +1,166 @@
+"""
+Circuit breaker around the stripe API calls of ``apps/payments``.
+
+Every call goes through :func:`call`, optionally with its own HTTP timeout
+(see :mod:`certego_saas.apps.payments.http_client`).
+Connection errors, timeouts and stripe 5xx responses are failures: when
+they are at least ``failure_rate`` of the last ``window`` seconds of calls
+(and there were at least ``minimum_calls``), the circuit opens and the
+calls fail fast with :class:`StripeUnavailable` for ``open_timeout``
+seconds. Then a single probe call is let through (half-open):
+it closes the circuit if it succeeds, opens it again otherwise.
+
+The state is per process: each worker learns about a brown-out by itself,
+after ``minimum_calls`` calls at most.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple, TypeVar
+
+import stripe
+
+from .consts import (
+    CIRCUIT_FAILURE_RATE,
+    CIRCUIT_MINIMUM_CALLS,
+    CIRCUIT_OPEN_TIMEOUT,
+    CIRCUIT_WINDOW,
+)
+from .exceptions import StripeUnavailable
+from .http_client import call_timeout, configure
+
+__all__ = [
+    "CircuitBreaker",
+    "call",
+    "stripe_circuit",
+]
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# errors telling stripe is unreachable or failing, not that the request is wrong
+FAILURES = (stripe.error.APIConnectionError, stripe.error.APIError)
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker, see the module documentation.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        minimum_calls: int = CIRCUIT_MINIMUM_CALLS,
+        window: float = CIRCUIT_WINDOW,
+        open_timeout: float = CIRCUIT_OPEN_TIMEOUT,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.minimum_calls = minimum_calls
+        self.window = window
+        self.open_timeout = open_timeout
+        self._lock = threading.Lock()
+        # (monotonic time, failed)
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.open_timeout
+            ):
+                return self.HALF_OPEN
+            return self._state
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+            self._state = self.CLOSED
+            self._probing = False
+
+    def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        ``func(*args, **kwargs)``, unless the circuit is open.
+
+        :raises StripeUnavailable: circuit open, or ``func`` failed
+        """
+        probe = self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except FAILURES as e:
+            self._after_call(failed=True, probe=probe)
+            raise StripeUnavailable(detail=f"stripe unavailable: {e}") from e
+        except Exception:
+            # the request was wrong, stripe is fine
+            self._after_call(failed=False, probe=probe)
+            raise
+        self._after_call(failed=False, probe=probe)
+        return result
+
+    # internals
+
+    def _before_call(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            if time.monotonic() - self._opened_at < self.open_timeout or self._probing:
+                raise StripeUnavailable()
+            self._probing = True
+            return True
+
+    def _after_call(self, failed: bool, probe: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if probe:
+                self._probing = False
+                if failed:
+                    self._open(now)
+                else:
+                    logger.info(f"circuit {self.name}: closed")
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                return
+            self._calls.append((now, failed))
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._calls.popleft()
+            if self._state != self.CLOSED or len(self._calls) < self.minimum_calls:
+                return
+            failures = sum(1 for _, f in self._calls if f)
+            if failures / len(self._calls) >= self.failure_rate:
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        logger.warning(f"circuit {self.name}: open for {self.open_timeout}s")
+        self._state = self.OPEN
+        self._opened_at = now
+        self._calls.clear()
+
+
+stripe_circuit = CircuitBreaker("stripe")
+
+
+def call(
+    func: Callable[..., T], *args, _timeout: Optional[float] = None, **kwargs
+) -> T:
+    """
+    ``func(*args, **kwargs)`` through :data:`stripe_circuit`; ``_timeout``
+    (seconds) overrides the HTTP timeout of the endpoints it calls.
+    """
+    if stripe.default_http_client is None:
+        configure()
+    token = call_timeout.set(_timeout)
+    try:
+        return stripe_circuit.call(func, *args, **kwargs)
+    finally:
+        call_timeout.reset(token)
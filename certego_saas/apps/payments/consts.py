@@ -18,6 +18,59 @@ TEST_ADMIN_IO_PRODUCT_ID = "prod_KteBrO2aApO5pS"
 
 # webhook
 STRIPE_WEBHOOK_SIGNING_KEY = certego_apps_settings.STRIPE_WEBHOOK_SIGNING_KEY
+# processed event ids are kept longer than the stripe retries (3 days)
+STRIPE_EVENTS_RETENTION_DAYS = 30
+
+# cache timeouts (seconds); with the webhook configured
+# the cached stripe objects are invalidated as soon as they change
+SUBSCRIPTION_CACHE_TIMEOUT = 60 * 60 * (24 * 3 if STRIPE_WEBHOOK_SIGNING_KEY else 12)
+PRODUCTS_CACHE_TIMEOUT = 60 * 60 * 24 * (7 if STRIPE_WEBHOOK_SIGNING_KEY else 1)
+# index of the invoice ids of a subscription, refreshed incrementally
+INVOICES_INDEX_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+# final (paid, void, uncollectible) invoices; the others, which may still
+# change, are cached for ``SUBSCRIPTION_CACHE_TIMEOUT``
+INVOICES_CACHE_TIMEOUT = (
+    INVOICES_INDEX_CACHE_TIMEOUT
+    if STRIPE_WEBHOOK_SIGNING_KEY
+    else SUBSCRIPTION_CACHE_TIMEOUT
+)
+# subscriptions not found on stripe
+NEGATIVE_CACHE_TIMEOUT = 60 * 5
+# permission decisions, kept in process memory
+SUBSCRIPTION_DECISION_TTL = 60
+SUBSCRIPTION_DECISION_NEGATIVE_TTL = 15
+# last known subscriptions, served while stripe is unavailable
+LAST_KNOWN_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# stripe calls: HTTP timeouts (seconds) and circuit breaker
+STRIPE_READ_TIMEOUT = 5
+# minimum for the writes (POST, DELETE): cutting them short leaves
+# their outcome unknown
+STRIPE_WRITE_TIMEOUT = 15
+# path prefix -> timeout, for the slower endpoints
+STRIPE_ENDPOINT_TIMEOUTS = {
+    "/v1/customers": 10,
+    "/v1/prices": 10,
+    "/v1/invoices": 10,
+    "/v1/checkout/sessions": 15,
+    "/v1/billing_portal/sessions": 15,
+}
+# the circuit opens when at least half of the calls of the last minute
+# failed (with at least 10 calls) and stays open for 30 seconds
+CIRCUIT_FAILURE_RATE = 0.5
+CIRCUIT_MINIMUM_CALLS = 10
+CIRCUIT_WINDOW = 60
+CIRCUIT_OPEN_TIMEOUT = 30
+
+# deferred stripe customers creation
+# stripe allows 100 (live mode) or 25 (test mode) requests per second
+CUSTOMER_PROVISIONING_BATCH_SIZE = 50
+CUSTOMER_PROVISIONING_RATE = 10
+CUSTOMER_PROVISIONING_MAX_ATTEMPTS = 8
+# seconds; doubled at every failed attempt
+CUSTOMER_PROVISIONING_RETRY_BACKOFF = 60
+# seconds a worker owns the rows of its batch
+CUSTOMER_PROVISIONING_LEASE = 60 * 5
 
 # logging
 STRIPE_SENSITIVE_FIELDS_SET = {
@@ -0,0 +1,154 @@
+"""
+Per-process cache of the subscription permission decisions
+(:class:`certego_saas.apps.payments.permissions.UserHasActiveSubscription`).
+
+A decision is a boolean keyed by user and app, kept in process memory for
+``SUBSCRIPTION_DECISION_TTL`` seconds (``SUBSCRIPTION_DECISION_NEGATIVE_TTL``
+if denied or resolved while stripe was unavailable), so a paid-API request
+costs a dict lookup.
+
+Invalidation (webhook events, ``Subscription``/``Customer`` changes) drops
+the user's decisions in the current process and bumps the user's version
+in the payments cache: the other processes drop the decisions recorded
+with another version, checking each one at most every
+``generation_check_interval`` seconds. Invalidating every user bumps
+a global generation token instead.
+"""
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .cache import get_cache
+from .consts import SUBSCRIPTION_DECISION_NEGATIVE_TTL, SUBSCRIPTION_DECISION_TTL
+
+__all__ = [
+    "DecisionCache",
+    "decision_cache",
+]
+
+# (allowed, expires_at, user version, last version check)
+_Decision = Tuple[bool, float, Optional[str], float]
+
+# ``DecisionCache.set`` default: the version read when recording
+_CURRENT = object()
+
+
+class DecisionCache:
+    """
+    Bounded, in-process TTL cache of permission decisions.
+    """
+
+    GENERATION_KEY = "payments.decisions.generation"
+    VERSION_KEY = "payments.decisions.gen.%s"
+
+    def __init__(
+        self,
+        ttl: float = SUBSCRIPTION_DECISION_TTL,
+        negative_ttl: float = SUBSCRIPTION_DECISION_NEGATIVE_TTL,
+        max_entries: int = 10000,
+        generation_check_interval: float = 1,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.generation_check_interval = generation_check_interval
+        self._lock = threading.Lock()
+        # (user id, appname) -> decision
+        self._decisions: "OrderedDict[Tuple, _Decision]" = OrderedDict()
+        self._generation: Optional[str] = None
+        self._generation_checked_at = 0.0
+
+    def get(self, user_id, appname: str) -> Optional[bool]:
+        """
+        The cached decision, ``None`` if missing or expired.
+        """
+        self._check_generation()
+        key = (user_id, appname)
+        item = self._decisions.get(key)
+        if item is None:
+            return None
+        allowed, expires_at, version, checked_at = item
+        now = time.monotonic()
+        if expires_at <= now:
+            return None
+        if now - checked_at >= self.generation_check_interval:
+            if self.get_version(user_id) != version:
+                with self._lock:
+                    self._decisions.pop(key, None)
+                return None
+            with self._lock:
+                if key in self._decisions:
+                    self._decisions[key] = (allowed, expires_at, version, now)
+        return allowed
+
+    def set(
+        self,
+        user_id,
+        appname: str,
+        allowed: bool,
+        degraded: bool = False,
+        version=_CURRENT,
+    ):
+        """
+        Records a decision under ``version``, the user version read with
+        :meth:`get_version` *before* computing it: if an invalidation
+        lands meanwhile, the decision is dropped at the next check
+        instead of being served until it expires.
+        """
+        ttl = self.ttl if allowed and not degraded else self.negative_ttl
+        if version is _CURRENT:
+            version = self.get_version(user_id)
+        now = time.monotonic()
+        with self._lock:
+            self._decisions[(user_id, appname)] = (allowed, now + ttl, version, now)
+            self._decisions.move_to_end((user_id, appname))
+            while len(self._decisions) > self.max_entries:
+                self._decisions.popitem(last=False)
+
+    def invalidate(self, user_id=None) -> None:
+        """
+        Drops the decisions of ``user_id`` (all of them if ``None``)
+        here and, through the user version (the generation token),
+        in every process.
+        """
+        if user_id is None:
+            with self._lock:
+                self._decisions.clear()
+            self._generation = uuid.uuid4().hex
+            get_cache().set(self.GENERATION_KEY, self._generation, None)
+            return
+        with self._lock:
+            for key in [key for key in self._decisions if key[0] == user_id]:
+                del self._decisions[key]
+        # outlives the decisions recorded with the previous version;
+        # once expired, a version only causes a recomputation
+        get_cache().set(
+            self.VERSION_KEY % user_id,
+            uuid.uuid4().hex,
+            math.ceil(2 * max(self.ttl, self.negative_ttl)),
+        )
+
+    def get_version(self, user_id) -> Optional[str]:
+        """
+        The current version of the decisions of ``user_id``.
+        """
+        return get_cache().get(self.VERSION_KEY % user_id, None)
+
+    # internals
+
+    def _check_generation(self) -> None:
+        now = time.monotonic()
+        if now - self._generation_checked_at < self.generation_check_interval:
+            return
+        self._generation_checked_at = now
+        generation = get_cache().get(self.GENERATION_KEY, None)
+        if generation != self._generation:
+            with self._lock:
+                self._decisions.clear()
+            self._generation = generation
+
+
+decision_cache = DecisionCache()
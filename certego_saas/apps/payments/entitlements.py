@@ -0,0 +1,86 @@
+from typing import Any, Optional
+
+__all__ = [
+    "Entitlements",
+]
+
+
+def _get(metadata: Any, key: str, default: str) -> str:
+    # ``stripe.StripeObject`` supports item access but not ``.get``
+    try:
+        return metadata[key]
+    except KeyError:
+        return default
+
+
+class Entitlements:
+    """
+    Plan limits of a :class:`Subscription`, resolved once from
+    the subscribed (or default) product ``metadata``.
+    """
+
+    __slots__ = (
+        "product_id",
+        "product_name",
+        "status",
+        "is_default",
+        "priority",
+        "monthly_submissions_limit",
+        "can_submit_private",
+        "concurrent_profiles",
+        "degraded",
+    )
+
+    def __init__(
+        self,
+        product_id: str,
+        product_name: str,
+        status: Optional[str],
+        is_default: bool,
+        priority: bool,
+        monthly_submissions_limit: int,
+        can_submit_private: bool,
+        concurrent_profiles: int,
+        degraded: bool = False,
+    ):
+        self.product_id = product_id
+        self.product_name = product_name
+        self.status = status
+        self.is_default = is_default
+        self.priority = priority
+        self.monthly_submissions_limit = monthly_submissions_limit
+        self.can_submit_private = can_submit_private
+        self.concurrent_profiles = concurrent_profiles
+        # resolved from the last known subscription, stripe being unavailable
+        self.degraded = degraded
+
+    @classmethod
+    def from_product(
+        cls,
+        product: Any,
+        status: Optional[str] = None,
+        is_default: bool = False,
+        degraded: bool = False,
+    ) -> "Entitlements":
+        """
+        ``product``: :class:`stripe.Product` or catalog ``dict``.
+        """
+        metadata = product["metadata"]
+        return cls(
+            product_id=product["id"],
+            product_name=str(product["name"]),
+            status=status,
+            is_default=is_default,
+            priority=_get(metadata, "priority", "False") == "True",
+            monthly_submissions_limit=int(_get(metadata, "max_submissions", "0")),
+            can_submit_private=_get(metadata, "submission_type", "") == "private",
+            concurrent_profiles=int(_get(metadata, "concurrent_profiles", "0")),
+            degraded=degraded,
+        )
+
+    @property
+    def is_active(self) -> bool:
+        return self.status == "active"
+
+    def __repr__(self) -> str:
+        return f"<entitlements:{self.product_name},status:{self.status}>"
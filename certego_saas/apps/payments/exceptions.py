@@ -4,6 +4,7 @@ __all__ = [
     "CustomerWithoutSubscription",
     "CustomerCantSubmitPrivateException",
     "CustomerCantSubmitMultipleProfilesException",
+    "StripeUnavailable",
 ]
 
 
@@ -17,11 +18,16 @@ class CustomerWithoutSubscription(APIException):
     default_detail = "You do not have an active paid subscription for this service."
 
     def __init__(self, appname: str, detail=None, code=None):
+        self.appname = getattr(appname, "value", appname)
         self.default_detail = (
             f"You do not have an active paid subscription for service '{appname}'"
         )
         super().__init__(detail=detail, code=code)
 
+    def __reduce__(self):
+        # picklable, to be negatively cached
+        return self.__class__, (self.appname, str(self.detail), self.detail.code)
+
 
 class CustomerCantSubmitPrivateException(PermissionDenied):
     status_code = 400
@@ -31,3 +37,14 @@ class CustomerCantSubmitPrivateException(PermissionDenied):
 class CustomerCantSubmitMultipleProfilesException(PermissionDenied):
     status_code = 400
     default_detail = "Your current plan does not allow for these many concurrent profiles. Please re-submit the analysis with the correct number of profiles."
+
+
+class StripeUnavailable(APIException):
+    """
+    Raised when stripe can't be reached, or while the circuit breaker
+    (:mod:`certego_saas.apps.payments.circuit`) is open.
+    """
+
+    status_code = 503
+    default_detail = "The payments service is temporarily unavailable."
+    default_code = "stripe_unavailable"
@@ -0,0 +1,125 @@
+"""
+HTTP client of the stripe API calls, installed as
+``stripe.default_http_client`` when the app is ready (:func:`configure`):
+
+- a single ``requests`` session, with a bounded pool of keep-alive
+  connections (``STRIPE_HTTP_POOL_SIZE``), shared by all the threads.
+- at most ``STRIPE_MAX_NETWORK_RETRIES`` retries, spaced by a full-jitter
+  exponential backoff capped at ``STRIPE_RETRY_MAX_DELAY`` seconds.
+- a timeout per endpoint (``STRIPE_TIMEOUTS``, longest path prefix wins,
+  over :data:`certego_saas.apps.payments.consts.STRIPE_ENDPOINT_TIMEOUTS`),
+  at least ``STRIPE_WRITE_TIMEOUT`` for the writes, unless
+  :func:`certego_saas.apps.payments.circuit.call` is given one.
+"""
+import contextvars
+import random
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+
+from certego_saas.settings import certego_apps_settings
+
+from .consts import STRIPE_ENDPOINT_TIMEOUTS, STRIPE_READ_TIMEOUT, STRIPE_WRITE_TIMEOUT
+
+__all__ = [
+    "StripeHTTPClient",
+    "call_timeout",
+    "configure",
+]
+
+# timeout of the current ``circuit.call``, over the endpoint ones
+call_timeout: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "stripe_call_timeout", default=None
+)
+_request_timeout: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "stripe_request_timeout", default=None
+)
+
+
+class StripeHTTPClient(stripe.RequestsClient):
+    """
+    ``stripe.RequestsClient`` with a shared connection pool,
+    per-endpoint timeouts and a capped full-jitter retry backoff.
+    """
+
+    def __init__(
+        self,
+        timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: float = STRIPE_READ_TIMEOUT,
+        write_timeout: float = STRIPE_WRITE_TIMEOUT,
+        pool_size: int = 10,
+        retry_max_delay: float = 2,
+        **kwargs,
+    ):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        # longest prefix first
+        self.timeouts = sorted(
+            (timeouts or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.write_timeout = write_timeout
+        self.retry_max_delay = retry_max_delay
+        super().__init__(timeout=default_timeout, session=session, **kwargs)
+
+    @property
+    def _timeout(self):
+        return call_timeout.get() or _request_timeout.get() or self._default_timeout
+
+    @_timeout.setter
+    def _timeout(self, value):
+        self._default_timeout = value
+
+    def timeout_for(self, url: str, method: str = "get") -> float:
+        path = urlsplit(url).path
+        timeout = self._default_timeout
+        for prefix, endpoint_timeout in self.timeouts:
+            if path.startswith(prefix):
+                timeout = endpoint_timeout
+                break
+        if method.lower() != "get":
+            return max(timeout, self.write_timeout)
+        return timeout
+
+    def request(self, method, url, headers, post_data=None):
+        token = _request_timeout.set(self.timeout_for(url, method))
+        try:
+            return super().request(method, url, headers, post_data)
+        finally:
+            _request_timeout.reset(token)
+
+    def request_stream(self, method, url, headers, post_data=None):
+        token = _request_timeout.set(self.timeout_for(url, method))
+        try:
+            return super().request_stream(method, url, headers, post_data)
+        finally:
+            _request_timeout.reset(token)
+
+    def _sleep_time_seconds(self, num_retries: int, *args) -> float:
+        # full jitter: concurrent retries don't hit stripe in lockstep
+        ceiling = min(self.INITIAL_DELAY * 2 ** (num_retries - 1), self.retry_max_delay)
+        return random.uniform(0, ceiling)
+
+
+def configure() -> StripeHTTPClient:
+    """
+    Installs a :class:`StripeHTTPClient` built from the settings
+    as the stripe HTTP client.
+    """
+    client = StripeHTTPClient(
+        timeouts={
+            **STRIPE_ENDPOINT_TIMEOUTS,
+            **certego_apps_settings.STRIPE_TIMEOUTS,
+        },
+        pool_size=certego_apps_settings.STRIPE_HTTP_POOL_SIZE,
+        retry_max_delay=certego_apps_settings.STRIPE_RETRY_MAX_DELAY,
+    )
+    stripe.default_http_client = client
+    stripe.max_network_retries = certego_apps_settings.STRIPE_MAX_NETWORK_RETRIES
+    if certego_apps_settings.STRIPE_API_BASE:
+        stripe.api_base = certego_apps_settings.STRIPE_API_BASE
+    return client
@@ -0,0 +1,181 @@
+"""
+Incremental cache of the stripe invoices of a subscription.
+
+Invoices are cached individually (``invoice.<id>``, compact form of
+:mod:`certego_saas.apps.payments.serialization`) next to an index of the
+subscription's invoice ids (``invoices.<subscription_id>``, newest first):
+
+- the first listing pages through all the invoices (``limit=100``).
+- once the index is older than ``SUBSCRIPTION_CACHE_TIMEOUT``, only the
+  invoices newer than the newest cached one are fetched (``ending_before``).
+- an invoice missing from the cache (evicted, or invalidated by a webhook
+  event) is retrieved alone; if more are missing (e.g. expired), all the
+  invoices are listed again, as in the first listing. Invoices that may
+  still change (``draft``, ``open``) expire after
+  ``SUBSCRIPTION_CACHE_TIMEOUT``, final ones after ``INVOICES_CACHE_TIMEOUT``
+  (longer only with the webhook configured).
+"""
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import stripe
+
+from .cache import get_cache
+from .circuit import call
+from .consts import (
+    INVOICES_CACHE_TIMEOUT,
+    INVOICES_INDEX_CACHE_TIMEOUT,
+    SUBSCRIPTION_CACHE_TIMEOUT,
+)
+from .serialization import pack, unpack
+
+__all__ = [
+    "InvoicesIndex",
+    "list_invoices",
+    "invalidate",
+    "paginate",
+]
+
+logger = logging.getLogger(__name__)
+
+INDEX_CACHE_KEY = "invoices.%s"
+INVOICE_CACHE_KEY = "invoice.%s"
+PAGE_SIZE = 100
+# statuses of the invoices that don't change anymore
+FINAL_STATUSES = ("paid", "void", "uncollectible")
+
+
+class InvoicesIndex(NamedTuple):
+    # newest first
+    ids: Tuple[str, ...]
+    # unix time of the last listing
+    synced_at: float
+
+
+def paginate(
+    ids: List[str], limit: Optional[int] = None, starting_after: Optional[str] = None
+) -> List[str]:
+    """
+    Slice of ``ids`` with the semantics of the stripe list cursors:
+    the ``limit`` ids following ``starting_after`` (excluded).
+    An unknown ``starting_after`` gives an empty page.
+    """
+    start = 0
+    if starting_after:
+        try:
+            start = ids.index(starting_after) + 1
+        except ValueError:
+            return []
+    return ids[start : start + limit if limit else None]
+
+
+def _list_all(subscription_id: str, **params) -> List[stripe.Invoice]:
+    page = stripe.Invoice.list(subscription=subscription_id, limit=PAGE_SIZE, **params)
+    return list(page.auto_paging_iter())
+
+
+def _list(subscription_id: str, **params) -> List[stripe.Invoice]:
+    invoices = call(_list_all, subscription_id, **params)
+    # ``ending_before`` pages are yielded oldest first
+    return sorted(invoices, key=lambda o: o.created, reverse=True)
+
+
+def _store(cache, invoices: List[stripe.Invoice]) -> Dict[str, stripe.Invoice]:
+    final = {}
+    pending = {}
+    for invoice in invoices:
+        target = final if invoice.status in FINAL_STATUSES else pending
+        target[INVOICE_CACHE_KEY % invoice.id] = pack(invoice)
+    if final:
+        cache.set_many(final, INVOICES_CACHE_TIMEOUT)
+    if pending:
+        cache.set_many(pending, SUBSCRIPTION_CACHE_TIMEOUT)
+    return {invoice.id: invoice for invoice in invoices}
+
+
+def _full_sync(cache, subscription_id: str) -> Tuple[InvoicesIndex, Dict]:
+    fetched = _store(cache, _list(subscription_id))
+    index = InvoicesIndex(ids=tuple(fetched), synced_at=time.time())
+    cache.set(INDEX_CACHE_KEY % subscription_id, index, INVOICES_INDEX_CACHE_TIMEOUT)
+    return index, fetched
+
+
+def _sync_index(cache, subscription_id: str) -> Tuple[InvoicesIndex, Dict]:
+    index: Optional[InvoicesIndex] = cache.get(INDEX_CACHE_KEY % subscription_id)
+    fetched: Dict[str, stripe.Invoice] = {}
+    if index is None:
+        return _full_sync(cache, subscription_id)
+    elif time.time() - index.synced_at >= SUBSCRIPTION_CACHE_TIMEOUT:
+        params = {"ending_before": index.ids[0]} if index.ids else {}
+        try:
+            fetched = _store(cache, _list(subscription_id, **params))
+            ids = tuple(i for i in fetched if i not in index.ids) + index.ids
+        except stripe.error.InvalidRequestError as e:
+            # e.g. the newest cached invoice (a draft) was deleted
+            logger.info(f"incremental invoices listing failed ({e}): full listing")
+            fetched = _store(cache, _list(subscription_id))
+            ids = tuple(fetched)
+        index = InvoicesIndex(ids=ids, synced_at=time.time())
+    else:
+        return index, fetched
+    cache.set(INDEX_CACHE_KEY % subscription_id, index, INVOICES_INDEX_CACHE_TIMEOUT)
+    return index, fetched
+
+
+def list_invoices(
+    subscription_id: str,
+    limit: Optional[int] = None,
+    starting_after: Optional[str] = None,
+) -> List[stripe.Invoice]:
+    """
+    Invoices of ``subscription_id``, in descending order of ``created``;
+    all of them unless ``limit`` is given.
+    """
+    cache = get_cache()
+    index, invoices = _sync_index(cache, subscription_id)
+    ids = paginate(list(index.ids), limit, starting_after)
+    missing = [i for i in ids if i not in invoices]
+    if missing:
+        cached = cache.get_many([INVOICE_CACHE_KEY % i for i in missing])
+        for invoice_id in missing:
+            invoice = unpack(cached.get(INVOICE_CACHE_KEY % invoice_id))
+            if invoice is not None:
+                invoices[invoice_id] = invoice
+        missing = [i for i in missing if i not in invoices]
+    if len(missing) > 1:
+        # a single listing rather than a retrieve per invoice
+        index, invoices = _full_sync(cache, subscription_id)
+        ids = paginate(list(index.ids), limit, starting_after)
+    elif missing:
+        invoice_id = missing[0]
+        try:
+            invoices[invoice_id] = call(stripe.Invoice.retrieve, invoice_id)
+        except stripe.error.InvalidRequestError as e:
+            if e.code != "resource_missing":
+                raise
+            # deleted draft
+            index = index._replace(ids=tuple(i for i in index.ids if i != invoice_id))
+            cache.set(
+                INDEX_CACHE_KEY % subscription_id, index, INVOICES_INDEX_CACHE_TIMEOUT
+            )
+        else:
+            _store(cache, [invoices[invoice_id]])
+    return [invoices[i] for i in ids if i in invoices]
+
+
+def invalidate(subscription_id: str, invoice_id: Optional[str] = None) -> None:
+    """
+    Drops the cached ``invoice_id`` and makes the next read of the
+    ``subscription_id`` invoices look for new ones.
+    """
+    cache = get_cache()
+    if invoice_id:
+        cache.delete(INVOICE_CACHE_KEY % invoice_id)
+    index: Optional[InvoicesIndex] = cache.get(INDEX_CACHE_KEY % subscription_id)
+    if index is not None:
+        cache.set(
+            INDEX_CACHE_KEY % subscription_id,
+            index._replace(synced_at=0),
+            INVOICES_INDEX_CACHE_TIMEOUT,
+        )
@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from certego_saas.apps.payments.consts import (
+    CUSTOMER_PROVISIONING_BATCH_SIZE,
+    CUSTOMER_PROVISIONING_MAX_ATTEMPTS,
+    CUSTOMER_PROVISIONING_RATE,
+)
+from certego_saas.apps.payments.provisioning import provision_pending
+
+
+class Command(BaseCommand):
+    help = "Create the stripe customers of the users waiting for one"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=CUSTOMER_PROVISIONING_BATCH_SIZE,
+            help="Customers created per batch",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=CUSTOMER_PROVISIONING_RATE,
+            help="Max customers created per second",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=CUSTOMER_PROVISIONING_MAX_ATTEMPTS,
+            help="Give up on a user after this many failures",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running as a worker, instead of stopping when the queue is empty",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10,
+            help=(
+                "With --loop, seconds to wait when there's nothing to do"
+                " or stripe is unavailable"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            counts = provision_pending(
+                batch_size=options["batch_size"],
+                rate=options["rate"],
+                max_attempts=options["max_attempts"],
+            )
+            if not any(counts.values()):
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+                continue
+            self.stdout.write(
+                self.style.SUCCESS(
+                    ", ".join(f"{count} {key}" for key, count in counts.items())
+                )
+            )
+            if counts["stopped"]:
+                # stripe is throttling us or is unavailable:
+                # retrying right away would burn the attempts of every user
+                if not options["loop"]:
+                    self.stderr.write("stripe is unavailable, stopping")
+                    break
+                time.sleep(options["interval"])
@@ -0,0 +1,24 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from certego_saas.apps.payments.quota import quota_accountant
+
+
+class Command(BaseCommand):
+    help = "Persist the quota usage counters from the cache to the DB"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--period-start",
+            type=datetime.date.fromisoformat,
+            default=None,
+            help=(
+                "First day of the quota periods (YYYY-MM-DD),"
+                " default: all the periods with cached counters"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        updated = quota_accountant.reconcile(period_start=options["period_start"])
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} quota usages"))
@@ -0,0 +1,41 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from certego_saas.apps.payments.consts import STRIPE_EVENTS_RETENTION_DAYS
+from certego_saas.apps.payments.mirror import reconcile
+from certego_saas.apps.payments.webhook import prune_events
+
+
+class Command(BaseCommand):
+    help = "Sync the local mirror of the stripe products, prices, subscriptions and invoices"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--invoices-since",
+            type=datetime.date.fromisoformat,
+            default=None,
+            help="Sync only the invoices created since this date (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--events-retention-days",
+            type=int,
+            default=STRIPE_EVENTS_RETENTION_DAYS,
+            help="Delete the processed webhook event ids older than this",
+        )
+
+    def handle(self, *args, **options):
+        since = options["invoices_since"]
+        counts = reconcile(
+            invoices_since=int(
+                datetime.datetime.combine(
+                    since, datetime.time(), tzinfo=datetime.timezone.utc
+                ).timestamp()
+            )
+            if since
+            else None
+        )
+        for object_type, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f"Synced {count} {object_type}s"))
+        pruned = prune_events(days=options["events_retention_days"])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} webhook events"))
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("certego_saas_payments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="subscription",
+            name="appname",
+            field=models.CharField(
+                choices=[
+                    ("ACCOUNTS", "Accounts"),
+                    ("DRAGONFLY", "Dragonfly"),
+                    ("INTELOWL", "Intelowl"),
+                    ("QUOKKA_PUBLIC", "Quokka Public"),
+                    ("QUOKKA", "Quokka"),
+                ],
+                max_length=32,
+            ),
+        ),
+        migrations.CreateModel(
+            name="QuotaUsage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "appname",
+                    models.CharField(
+                        choices=[
+                            ("ACCOUNTS", "Accounts"),
+                            ("DRAGONFLY", "Dragonfly"),
+                            ("INTELOWL", "Intelowl"),
+                            ("QUOKKA_PUBLIC", "Quokka Public"),
+                            ("QUOKKA", "Quokka"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="quota_usages",
+                        to="certego_saas_payments.customer",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("customer", "appname", "period_start")},
+            },
+        ),
+    ]
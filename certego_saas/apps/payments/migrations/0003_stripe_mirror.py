@@ -0,0 +1,129 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("certego_saas_payments", "0002_quotausage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeInvoice",
+            fields=[
+                ("synced_at", models.PositiveBigIntegerField(default=0)),
+                (
+                    "invoice_id",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                (
+                    "subscription_id",
+                    models.CharField(db_index=True, max_length=64, null=True),
+                ),
+                ("customer_id", models.CharField(db_index=True, max_length=64)),
+                ("status", models.CharField(blank=True, max_length=32, null=True)),
+                ("currency", models.CharField(default="", max_length=3)),
+                ("description", models.TextField(blank=True, null=True)),
+                ("total", models.BigIntegerField(default=0)),
+                ("amount_due", models.BigIntegerField(default=0)),
+                ("amount_paid", models.BigIntegerField(default=0)),
+                ("amount_remaining", models.BigIntegerField(default=0)),
+                ("created", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("due_date", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("period", models.JSONField(blank=True, default=dict)),
+                ("lines_descriptions", models.JSONField(blank=True, default=list)),
+                (
+                    "hosted_invoice_url",
+                    models.URLField(blank=True, max_length=512, null=True),
+                ),
+                ("invoice_pdf", models.URLField(blank=True, max_length=512, null=True)),
+            ],
+            options={
+                "ordering": ["-created"],
+            },
+        ),
+        migrations.CreateModel(
+            name="StripeProduct",
+            fields=[
+                ("synced_at", models.PositiveBigIntegerField(default=0)),
+                (
+                    "product_id",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("name", models.CharField(default="", max_length=256)),
+                ("description", models.TextField(blank=True, null=True)),
+                ("active", models.BooleanField(default=True)),
+                ("metadata", models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="StripePrice",
+            fields=[
+                ("synced_at", models.PositiveBigIntegerField(default=0)),
+                (
+                    "price_id",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("active", models.BooleanField(default=True)),
+                ("currency", models.CharField(default="", max_length=3)),
+                ("unit_amount", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="prices",
+                        to="certego_saas_payments.stripeproduct",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="StripeSubscription",
+            fields=[
+                ("synced_at", models.PositiveBigIntegerField(default=0)),
+                (
+                    "subscription_id",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("customer_id", models.CharField(db_index=True, max_length=64)),
+                ("status", models.CharField(max_length=32)),
+                (
+                    "current_period_start",
+                    models.PositiveBigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "current_period_end",
+                    models.PositiveBigIntegerField(blank=True, null=True),
+                ),
+                ("days_until_due", models.PositiveIntegerField(blank=True, null=True)),
+                ("start_date", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("created", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("ended_at", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("cancel_at", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("cancel_at_period_end", models.BooleanField(default=False)),
+                ("canceled_at", models.PositiveBigIntegerField(blank=True, null=True)),
+                (
+                    "price",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="subscriptions",
+                        to="certego_saas_payments.stripeprice",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
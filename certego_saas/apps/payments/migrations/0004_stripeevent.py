@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("certego_saas_payments", "0003_stripe_mirror"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeEvent",
+            fields=[
+                (
+                    "event_id",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("type", models.CharField(max_length=128)),
+                ("created", models.PositiveBigIntegerField()),
+                ("received_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
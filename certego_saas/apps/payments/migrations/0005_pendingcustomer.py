@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("certego_saas_payments", "0004_stripeevent"),
+        ("certego_saas_user", "0002_migration"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingCustomer",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="pending_customer",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+                ("last_error", models.TextField(blank=True, default="")),
+            ],
+            options={
+                "ordering": ["next_attempt_at"],
+            },
+        ),
+    ]
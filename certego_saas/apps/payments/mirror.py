@@ -0,0 +1,244 @@
+"""
+Local mirror of the stripe products, prices, subscriptions and invoices.
+
+The mirror tables (:class:`StripeProduct`, :class:`StripePrice`,
+:class:`StripeSubscription`, :class:`StripeInvoice`) are kept current by:
+
+- the stripe webhook events (see :class:`certego_saas.apps.payments.views.StripeWebhookView`),
+  verified with the ``STRIPE_WEBHOOK_SIGNING_KEY`` setting.
+- the ``sync_stripe`` management command (:func:`reconcile`),
+  to be run periodically and once at deployment.
+
+With the ``STRIPE_MIRROR_ENABLED`` setting, the :class:`Subscription`
+methods and properties read from the mirror and never call the stripe API.
+"""
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+import stripe
+from django.db import models, transaction
+
+from .consts import STRIPE_WEBHOOK_SIGNING_KEY
+from .models import StripeInvoice, StripePrice, StripeProduct, StripeSubscription
+
+__all__ = [
+    "construct_event",
+    "get_invoice_subscription_id",
+    "sync_object",
+    "sync_event",
+    "reconcile",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _to_dict(obj: Any) -> Dict:
+    return obj.to_dict() if isinstance(obj, stripe.StripeObject) else obj
+
+
+def _id(obj: Any) -> Optional[str]:
+    """
+    Id of an expandable field.
+    """
+    return obj["id"] if isinstance(obj, dict) else obj
+
+
+def _upsert(model, pk: str, defaults: Dict, synced_at: int) -> Optional[models.Model]:
+    """
+    ``update_or_create`` unless the row holds a more recent state.
+    """
+    with transaction.atomic():
+        instance = model.objects.select_for_update().filter(pk=pk).first()
+        if instance is not None and instance.synced_at > synced_at:
+            logger.info(f"skipped outdated {instance} (synced_at: {synced_at})")
+            return None
+        instance, _ = model.objects.update_or_create(
+            pk=pk, defaults={**defaults, "synced_at": synced_at}
+        )
+    return instance
+
+
+# syncers: plain stripe object dict -> mirror row
+
+
+def _sync_product(obj: Dict, synced_at: int) -> Optional[StripeProduct]:
+    return _upsert(
+        StripeProduct,
+        obj["id"],
+        {
+            "name": obj.get("name") or "",
+            "description": obj.get("description"),
+            "active": obj.get("active", True),
+            "metadata": obj.get("metadata") or {},
+        },
+        synced_at,
+    )
+
+
+def _sync_price(obj: Dict, synced_at: int) -> Optional[StripePrice]:
+    product = obj["product"]
+    if isinstance(product, dict):
+        _sync_product(product, synced_at)
+    else:
+        # filled by the ``product.*`` events or the reconciliation
+        StripeProduct.objects.get_or_create(pk=product)
+    return _upsert(
+        StripePrice,
+        obj["id"],
+        {
+            "product_id": _id(product),
+            "active": obj.get("active", True),
+            "currency": obj.get("currency") or "",
+            "unit_amount": obj.get("unit_amount"),
+        },
+        synced_at,
+    )
+
+
+def _sync_subscription(obj: Dict, synced_at: int) -> Optional[StripeSubscription]:
+    items = (obj.get("items") or {}).get("data") or []
+    item = items[0] if items else {}
+    price = item.get("price") or obj.get("plan")
+    price_id = None
+    if isinstance(price, dict) and price.get("object") == "price":
+        _sync_price(price, synced_at)
+    if price:
+        price_id = _id(price)
+    if price_id and not StripePrice.objects.filter(pk=price_id).exists():
+        price_id = None
+    return _upsert(
+        StripeSubscription,
+        obj["id"],
+        {
+            "customer_id": _id(obj["customer"]),
+            "price_id": price_id,
+            "status": obj["status"],
+            # moved to the subscription items in the most recent API versions
+            "current_period_start": obj.get("current_period_start")
+            or item.get("current_period_start"),
+            "current_period_end": obj.get("current_period_end")
+            or item.get("current_period_end"),
+            "days_until_due": obj.get("days_until_due"),
+            "start_date": obj.get("start_date"),
+            "created": obj.get("created"),
+            "ended_at": obj.get("ended_at"),
+            "cancel_at": obj.get("cancel_at"),
+            "cancel_at_period_end": obj.get("cancel_at_period_end") or False,
+            "canceled_at": obj.get("canceled_at"),
+        },
+        synced_at,
+    )
+
+
+def get_invoice_subscription_id(obj: Dict) -> Optional[str]:
+    subscription = obj.get("subscription")
+    if subscription is None:
+        # moved to ``parent`` in the most recent API versions
+        parent = obj.get("parent") or {}
+        subscription = (parent.get("subscription_details") or {}).get("subscription")
+    return _id(subscription)
+
+
+def _sync_invoice(obj: Dict, synced_at: int) -> Optional[StripeInvoice]:
+    lines = (obj.get("lines") or {}).get("data") or []
+    return _upsert(
+        StripeInvoice,
+        obj["id"],
+        {
+            "subscription_id": get_invoice_subscription_id(obj),
+            "customer_id": _id(obj["customer"]),
+            "status": obj.get("status"),
+            "currency": obj.get("currency") or "",
+            "description": obj.get("description"),
+            "total": obj.get("total") or 0,
+            "amount_due": obj.get("amount_due") or 0,
+            "amount_paid": obj.get("amount_paid") or 0,
+            "amount_remaining": obj.get("amount_remaining") or 0,
+            "created": obj.get("created"),
+            "due_date": obj.get("due_date"),
+            "period": (lines[0].get("period") or {}) if lines else {},
+            "lines_descriptions": [line.get("description") for line in lines],
+            "hosted_invoice_url": obj.get("hosted_invoice_url"),
+            "invoice_pdf": obj.get("invoice_pdf"),
+        },
+        synced_at,
+    )
+
+
+SYNCERS: Dict[str, Callable[[Dict, int], Optional[models.Model]]] = {
+    "product": _sync_product,
+    "price": _sync_price,
+    "subscription": _sync_subscription,
+    "invoice": _sync_invoice,
+}
+
+
+def sync_object(obj: Any, synced_at: Optional[int] = None) -> Optional[models.Model]:
+    """
+    Stores a stripe object in the mirror.
+    Returns ``None`` for unsupported or outdated objects.
+    """
+    obj = _to_dict(obj)
+    syncer = SYNCERS.get(obj.get("object"), None)
+    if syncer is None:
+        return None
+    return syncer(obj, int(time.time()) if synced_at is None else synced_at)
+
+
+# webhook
+
+
+def construct_event(payload: bytes, sig_header: Optional[str]) -> stripe.Event:
+    """
+    Alias for :meth:`stripe.Webhook.construct_event`
+    with the ``STRIPE_WEBHOOK_SIGNING_KEY`` setting.
+
+    :raises ValueError: invalid payload or signing key not configured.
+    :raises stripe.error.SignatureVerificationError: invalid signature.
+    """
+    if not STRIPE_WEBHOOK_SIGNING_KEY:
+        raise ValueError("STRIPE_WEBHOOK_SIGNING_KEY is not set")
+    return stripe.Webhook.construct_event(
+        payload, sig_header, STRIPE_WEBHOOK_SIGNING_KEY
+    )
+
+
+def sync_event(event: Any) -> Optional[models.Model]:
+    """
+    Applies a ``product.*``, ``price.*``, ``customer.subscription.*``
+    or ``invoice.*`` event to the mirror.
+    """
+    event = _to_dict(event)
+    obj = event["data"]["object"]
+    if event["type"] in ("product.deleted", "price.deleted"):
+        # keep the row, referenced by the subscriptions
+        obj = {**obj, "active": False}
+    return sync_object(obj, synced_at=event["created"])
+
+
+# reconciliation
+
+
+def reconcile(invoices_since: Optional[int] = None) -> Dict[str, int]:
+    """
+    Pages through all the stripe products, prices, subscriptions and
+    invoices (created after ``invoices_since``, if given) and stores them.
+    Returns the number of synced objects per type.
+    """
+    synced_at = int(time.time())
+    invoice_filters = {"created": {"gte": invoices_since}} if invoices_since else {}
+    listings = {
+        "product": stripe.Product.list(limit=100),
+        "price": stripe.Price.list(limit=100),
+        "subscription": stripe.Subscription.list(limit=100, status="all"),
+        "invoice": stripe.Invoice.list(limit=100, **invoice_filters),
+    }
+    counts = {}
+    for object_type, listing in listings.items():
+        counts[object_type] = sum(
+            sync_object(obj, synced_at) is not None
+            for obj in listing.auto_paging_iter()
+        )
+    logger.info(f"reconciled stripe mirror: {counts}")
+    return counts
@@ -1,25 +1,46 @@
-from typing import List, Tuple
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import stripe
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache as default_cache
 from django.db import models, transaction
+from django.dispatch import receiver
 from django.utils.functional import cached_property
 
 from certego_saas.ext.models import AppChoices, AppSpecificModel
+from certego_saas.settings import certego_apps_settings
 
 from .apps import CertegoPaymentsConfig
 from .cache import cache_memoize
-from .exceptions import CustomerWithoutSubscription
-from .utils import get_default_product
+from .circuit import call
+from .consts import (
+    LAST_KNOWN_CACHE_TIMEOUT,
+    NEGATIVE_CACHE_TIMEOUT,
+    SUBSCRIPTION_CACHE_TIMEOUT,
+)
+from .decisions import decision_cache
+from .entitlements import Entitlements
+from .exceptions import CustomerWithoutSubscription, StripeUnavailable
+from .invoices import list_invoices, paginate
+from .utils import get_default_product, get_products_prices_map
 
 __all__ = [
     "AppChoices",
     "Customer",
     "Subscription",
+    "QuotaUsage",
+    "PendingCustomer",
+    "StripeProduct",
+    "StripePrice",
+    "StripeSubscription",
+    "StripeInvoice",
+    "StripeEvent",
 ]
 
+logger = logging.getLogger(__name__)
+
 
 class Customer(models.Model):
     """
@@ -42,25 +63,36 @@ class Customer(models.Model):
     # subscription info
 
     @cached_property
-    def currentapp_subscription(self) -> "Subscription":
+    def subscriptions_map(self) -> Dict[str, "Subscription"]:
+        """
+        appname -> subscription, resolved with a single query
+        (none if prefetched with ``prefetch_related("subscriptions")``).
+        """
+        subscriptions = {}
+        for subscription in self.subscriptions.all():
+            # no query to get back to this customer
+            subscription.customer = self
+            subscriptions[subscription.appname] = subscription
+        return subscriptions
+
+    def get_app_subscription(self, appname: str) -> "Subscription":
+        appname = getattr(appname, "value", appname)
         try:
-            return self.subscriptions.get(appname=AppChoices.CURRENTAPP)
-        except Subscription.DoesNotExist:
-            return Subscription(customer=self, appname=AppChoices.CURRENTAPP)
+            return self.subscriptions_map[appname]
+        except KeyError:
+            return Subscription(customer=self, appname=appname)
+
+    @cached_property
+    def currentapp_subscription(self) -> "Subscription":
+        return self.get_app_subscription(AppChoices.CURRENTAPP)
 
     @cached_property
     def dragonfly_subscription(self) -> "Subscription":
-        try:
-            return self.subscriptions.get(appname=AppChoices.DRAGONFLY)
-        except Subscription.DoesNotExist:
-            return Subscription(customer=self, appname=AppChoices.DRAGONFLY)
+        return self.get_app_subscription(AppChoices.DRAGONFLY)
 
     @cached_property
     def intelowl_subscription(self) -> "Subscription":
-        try:
-            return self.subscriptions.get(appname=AppChoices.INTELOWL)
-        except Subscription.DoesNotExist:
-            return Subscription(customer=self, appname=AppChoices.INTELOWL)
+        return self.get_app_subscription(AppChoices.INTELOWL)
 
     # stripe API: utility methods
 
@@ -73,7 +105,8 @@ class Customer(models.Model):
 
         * `Stripe Checkout Docs <https://stripe.com/private_docs/payments/checkout>`__
         """
-        return stripe.checkout.Session.create(
+        return call(
+            stripe.checkout.Session.create,
             customer=self.customer_id,
             payment_method_types=["card"],
             line_items=[
@@ -96,20 +129,24 @@ class Customer(models.Model):
 
         * `Stripe Billing Portal settings <https://dashboard.stripe.com/test/settings/billing/portal>`__
         """
-        return stripe.billing_portal.Session.create(
-            customer=self.customer_id, return_url=return_url
+        return call(
+            stripe.billing_portal.Session.create,
+            customer=self.customer_id,
+            return_url=return_url,
         )
 
     # stripe API: fetch methods
 
-    @cache_memoize(60 * 60 * 12)
+    @cache_memoize(
+        SUBSCRIPTION_CACHE_TIMEOUT, single_flight=True, early_refresh=1, compact=True
+    )
     def get_stripe_customer(self) -> stripe.Customer:
         """
         Returns instance of :class:`stripe.Customer` for user.
 
         * (uses :meth:``stripe.Customer.retrieve()``
         """
-        return stripe.Customer.retrieve(self.customer_id)
+        return call(stripe.Customer.retrieve, self.customer_id)
 
     # stripe API: mutation methods
 
@@ -129,8 +166,14 @@ class Customer(models.Model):
         except cls.DoesNotExist:
             pass
 
-        # create new customer in stripe DB
-        stripe_customer = stripe.Customer.create(
+        # create new customer in stripe DB;
+        # a retry of a request stripe committed returns the same customer.
+        # The stripe account is shared by the apps: the key is scoped by host
+        stripe_customer = call(
+            stripe.Customer.create,
+            idempotency_key=(
+                f"customer-create-{certego_apps_settings.HOST_NAME.lower()}-{user.pk}"
+            ),
             email=user.email,
             name=user.get_full_name(),
             metadata={
@@ -144,6 +187,7 @@ class Customer(models.Model):
         # create new Customer instance
         customer = cls.objects.create(customer_id=stripe_customer.id, user=user)
         created = True
+        PendingCustomer.objects.filter(user=user).delete()
 
         return customer, created
 
@@ -156,7 +200,7 @@ class Customer(models.Model):
         """
 
         # delete customer on stripe DB
-        deleted = stripe.Customer.delete(self.customer_id).deleted
+        deleted = call(stripe.Customer.delete, self.customer_id).deleted
 
         # delete customer instance
         self.delete()
@@ -192,69 +236,101 @@ class Subscription(AppSpecificModel):
             ("customer", "appname"),
         ]
 
+    # set when stripe is unavailable and the last known state is served
+    degraded = False
+
     # useful properties
 
-    @property
-    def product_name(self) -> str:
+    @cached_property
+    def entitlements(self) -> Entitlements:
+        """
+        Plan limits, resolved with a single subscription lookup
+        and cached on this instance (i.e. per request).
+        """
         try:
-            return str(self.subscribed_product().name)
+            subscription = self.get_subscription(expand=["plan.product"])
         except CustomerWithoutSubscription:
-            default_product = get_default_product()
-            return default_product["name"]
+            return Entitlements.from_product(get_default_product(), is_default=True)
+        return Entitlements.from_product(
+            subscription.plan.product,
+            status=subscription.status,
+            degraded=self.degraded,
+        )
+
+    @property
+    def product_name(self) -> str:
+        return self.entitlements.product_name
 
     @property
     def priority(self) -> bool:
         """
         ``metadata.priority``
         """
-        priority = False
-        try:
-            priority = self.subscribed_product().metadata.priority
-        except CustomerWithoutSubscription:
-            default_product = get_default_product()
-            priority = default_product["metadata"]["priority"]
-        finally:
-            priority = priority == "True"
-        return priority
+        return self.entitlements.priority
 
     @property
     def monthly_submissions_limit(self) -> int:
         """
         ``metadata.max_submissions``
         """
-        try:
-            max_submissions = self.subscribed_product().metadata.max_submissions
-        except CustomerWithoutSubscription:
-            default_product = get_default_product()
-            max_submissions = default_product["metadata"]["max_submissions"]
-
-        return int(max_submissions)
+        return self.entitlements.monthly_submissions_limit
 
     @property
     def can_submit_private(self) -> bool:
         """
         ``metadata.submission_type == "private"``
         """
-        try:
-            submission_type = self.subscribed_product().metadata.submission_type
-        except CustomerWithoutSubscription:
-            default_product = get_default_product()
-            submission_type = default_product["metadata"]["submission_type"]
-
-        return submission_type == "private"
+        return self.entitlements.can_submit_private
 
     @property
     def concurrent_profiles(self) -> int:
         """
-        ``metadata.max_submissions``
+        ``metadata.concurrent_profiles``
         """
-        try:
-            concurrent_profiles = self.subscribed_product().metadata.concurrent_profiles
-        except CustomerWithoutSubscription:
-            default_product = get_default_product()
-            concurrent_profiles = default_product["metadata"]["concurrent_profiles"]
+        return self.entitlements.concurrent_profiles
 
-        return int(concurrent_profiles)
+    @classmethod
+    def resolve_product_names(
+        cls, subscriptions: Iterable["Subscription"]
+    ) -> Dict[str, Optional[str]]:
+        """
+        subscription id -> subscribed product name (``None`` if unknown),
+        for many subscriptions at once and without calling stripe:
+        from the cached subscriptions, then from the mirror (one query),
+        through the catalog snapshot.
+        """
+        subscriptions = [s for s in subscriptions if s.subscription_id]
+        names: Dict[str, Optional[str]] = {}
+        price_ids: Dict[str, Optional[str]] = {}
+        cached = cls._retrieve_subscription.get_cached_many(
+            (subscription,) for subscription in subscriptions
+        )
+        for subscription, stripe_subscription in zip(subscriptions, cached):
+            if stripe_subscription is not None:
+                price_ids[subscription.subscription_id] = stripe_subscription.plan.id
+                # expanded: ``plan.product``
+                names[subscription.subscription_id] = getattr(
+                    stripe_subscription.plan.product, "name", None
+                )
+        missing = [
+            s.subscription_id
+            for s in subscriptions
+            if s.subscription_id not in price_ids
+        ]
+        if missing:
+            price_ids.update(
+                StripeSubscription.objects.filter(pk__in=missing).values_list(
+                    "subscription_id", "price_id"
+                )
+            )
+        prices_map = get_products_prices_map()
+        for subscription in subscriptions:
+            product = prices_map.get(price_ids.get(subscription.subscription_id))
+            if product is not None:
+                names[subscription.subscription_id] = product["name"]
+            else:
+                names.setdefault(subscription.subscription_id, None)
+        return names
 
     # utility methods
 
@@ -300,24 +376,104 @@ class Subscription(AppSpecificModel):
 
     # stripe API: fetch methods
 
-    @cache_memoize(60 * 60 * 12)
     def get_subscription(self, expand=None) -> stripe.Subscription:
         """
         Returns customer's active subscription.
 
-        * (uses :meth:``stripe.Subscription.retrieve()``
+        * uses the local mirror if ``STRIPE_MIRROR_ENABLED``,
+          :meth:``stripe.Subscription.retrieve()`` otherwise.
         """
-        expand = expand or []
         if not self.subscription_id:
             raise CustomerWithoutSubscription(appname=self.appname)
-        subscription = stripe.Subscription.retrieve(self.subscription_id, expand=expand)
+        if certego_apps_settings.STRIPE_MIRROR_ENABLED:
+            return self._get_mirrored_subscription(
+                latest_invoice="latest_invoice" in (expand or [])
+            )
+        try:
+            return self._retrieve_subscription()
+        except StripeUnavailable:
+            return self._get_last_known_subscription()
+
+    @cache_memoize(
+        SUBSCRIPTION_CACHE_TIMEOUT,
+        single_flight=True,
+        early_refresh=1,
+        negative_timeout=NEGATIVE_CACHE_TIMEOUT,
+        negative_exceptions=(CustomerWithoutSubscription,),
+        compact=True,
+        keep_last_known=LAST_KNOWN_CACHE_TIMEOUT,
+    )
+    def _retrieve_subscription(self) -> stripe.Subscription:
+        # one cache entry for every ``expand``: a single key to invalidate
+        try:
+            return call(
+                stripe.Subscription.retrieve,
+                self.subscription_id,
+                expand=["plan.product", "latest_invoice"],
+            )
+        except stripe.error.InvalidRequestError as e:
+            if e.code == "resource_missing":
+                raise CustomerWithoutSubscription(appname=self.appname)
+            raise
+
+    def _get_last_known_subscription(self) -> stripe.Subscription:
+        """
+        While stripe is unavailable: the last retrieved subscription,
+        or its mirrored copy. Sets ``degraded``.
+
+        :raises StripeUnavailable: nothing known about the subscription
+        """
+        subscription = self._retrieve_subscription.get_last_known(self)
+        if subscription is None:
+            try:
+                subscription = self._get_mirrored_subscription(latest_invoice=True)
+            except CustomerWithoutSubscription:
+                raise StripeUnavailable()
+        logger.warning(f"{self}: stripe unavailable, serving the last known state")
+        self.degraded = True
         return subscription
 
-    @cache_memoize(60 * 60 * 12)
-    def get_invoices(self) -> List[stripe.Invoice]:
-        invoices = stripe.Invoice.list(subscription=self.subscription_id).data
-        # sort in descending order of "created"
-        return sorted(invoices, key=lambda o: o.created, reverse=True)
+    def _get_mirrored_subscription(
+        self, latest_invoice: bool = False
+    ) -> stripe.Subscription:
+        try:
+            mirrored = StripeSubscription.objects.select_related("price__product").get(
+                pk=self.subscription_id
+            )
+        except StripeSubscription.DoesNotExist:
+            # not synced (yet): never fallback to the stripe API
+            raise CustomerWithoutSubscription(appname=self.appname)
+        invoice = None
+        if latest_invoice:
+            invoice = StripeInvoice.objects.filter(
+                subscription_id=self.subscription_id
+            ).first()
+        return mirrored.to_stripe(latest_invoice=invoice)
+
+    def get_invoices(
+        self, limit: Optional[int] = None, starting_after: Optional[str] = None
+    ) -> List[stripe.Invoice]:
+        """
+        Returns customer's invoices, in descending order of ``created``:
+        all of them, or the ``limit`` ones following the
+        ``starting_after`` invoice id (as the stripe list cursors).
+
+        * uses the local mirror if ``STRIPE_MIRROR_ENABLED``,
+          the incremental invoices cache otherwise
+          (:mod:`certego_saas.apps.payments.invoices`).
+        """
+        if certego_apps_settings.STRIPE_MIRROR_ENABLED:
+            queryset = StripeInvoice.objects.filter(
+                subscription_id=self.subscription_id
+            )
+            ids = paginate(
+                list(queryset.values_list("pk", flat=True)), limit, starting_after
+            )
+            mirrored = queryset.in_bulk(ids)
+            return [mirrored[invoice_id].to_stripe() for invoice_id in ids]
+        if not self.subscription_id:
+            return []
+        return list_invoices(self.subscription_id, limit, starting_after)
 
     def get_latest_invoice(self) -> stripe.Invoice:
         return self.get_subscription(expand=["latest_invoice"]).latest_invoice
@@ -326,3 +482,321 @@ class Subscription(AppSpecificModel):
 
     def __str__(self) -> str:
         return f"<app:{self.appname},sub:{self.subscription_id}>"
+
+
+@receiver(models.signals.post_save, sender=Subscription)
+@receiver(models.signals.post_delete, sender=Subscription)
+def subscription_changed_handler(sender, instance: Subscription, **kwargs):
+    try:
+        decision_cache.invalidate(instance.customer.user_id)
+    except Customer.DoesNotExist:
+        # deleted along with its customer
+        decision_cache.invalidate()
+
+
+@receiver(models.signals.post_save, sender=Customer)
+@receiver(models.signals.post_delete, sender=Customer)
+def customer_changed_handler(sender, instance: Customer, **kwargs):
+    if kwargs.get("created", False):
+        # no subscription yet: nothing to change for the user
+        return
+    decision_cache.invalidate(instance.user_id)
+
+
+class QuotaUsage(AppSpecificModel):
+    """
+    Number of submissions of a ``Customer`` for an app in a quota period.
+    Periodically reconciled from the cache counters of
+    :class:`certego_saas.apps.payments.quota.QuotaAccountant`.
+    """
+
+    # fields
+
+    customer = models.ForeignKey(
+        f"{CertegoPaymentsConfig.label}.Customer",
+        related_name="quota_usages",
+        on_delete=models.CASCADE,
+    )
+    period_start = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # meta
+
+    class Meta:
+        unique_together = [
+            ("customer", "appname", "period_start"),
+        ]
+
+    # repr methods
+
+    def __str__(self) -> str:
+        return f"<app:{self.appname},customer:{self.customer_id},period:{self.period_start},count:{self.count}>"
+
+
+class PendingCustomer(models.Model):
+    """
+    User waiting for its stripe customer,
+    created by :mod:`certego_saas.apps.payments.provisioning`.
+    """
+
+    # fields
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="pending_customer",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # also pushed forward while a worker is provisioning it
+    next_attempt_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_error = models.TextField(blank=True, default="")
+
+    # meta
+
+    class Meta:
+        ordering = ["next_attempt_at"]
+
+    # repr methods
+
+    def __str__(self) -> str:
+        return f"<pending customer:{self.user_id},attempts:{self.attempts}>"
+
+
+# local mirror of the stripe objects
+
+
+class StripeMirrorModel(models.Model):
+    """
+    Base class of the local copies of stripe objects,
+    kept current by :mod:`certego_saas.apps.payments.mirror`.
+    """
+
+    # unix time of the stripe state stored in this row
+    # (event creation or reconciliation time); older events are discarded
+    synced_at = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class StripeProduct(StripeMirrorModel):
+    """
+    Local copy of a :class:`stripe.Product`.
+    """
+
+    # fields
+
+    product_id = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=256, default="")
+    description = models.TextField(null=True, blank=True)
+    active = models.BooleanField(default=True)
+    metadata = models.JSONField(default=dict, blank=True)
+
+    # methods
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.product_id,
+            "object": "product",
+            "name": self.name,
+            "description": self.description,
+            "active": self.active,
+            "metadata": self.metadata,
+        }
+
+    def to_stripe(self) -> stripe.Product:
+        return stripe.Product.construct_from(self.to_dict(), stripe.api_key)
+
+    # repr methods
+
+    def __str__(self) -> str:
+        return f"<product:{self.product_id},name:{self.name}>"
+
+
+class StripePrice(StripeMirrorModel):
+    """
+    Local copy of a :class:`stripe.Price`.
+    """
+
+    # fields
+
+    price_id = models.CharField(max_length=64, primary_key=True)
+    product = models.ForeignKey(
+        StripeProduct, related_name="prices", on_delete=models.CASCADE
+    )
+    active = models.BooleanField(default=True)
+    currency = models.CharField(max_length=3, default="")
+    unit_amount = models.BigIntegerField(null=True, blank=True)
+
+    # methods
+
+    def to_dict(self, expand_product: bool = False) -> dict:
+        return {
+            "id": self.price_id,
+            "object": "price",
+            "product": self.product.to_dict() if expand_product else self.product_id,
+            "active": self.active,
+            "currency": self.currency,
+            "unit_amount": self.unit_amount,
+            # legacy ``stripe.Plan`` field
+            "amount": self.unit_amount,
+        }
+
+    # repr methods
+
+    def __str__(self) -> str:
+        return f"<price:{self.price_id},product:{self.product_id}>"
+
+
+class StripeSubscription(StripeMirrorModel):
+    """
+    Local copy of a :class:`stripe.Subscription`.
+    """
+
+    # fields
+
+    subscription_id = models.CharField(max_length=64, primary_key=True)
+    customer_id = models.CharField(max_length=64, db_index=True)
+    price = models.ForeignKey(
+        StripePrice,
+        related_name="subscriptions",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(max_length=32)
+    # unix timestamps, as returned by stripe
+    current_period_start = models.PositiveBigIntegerField(null=True, blank=True)
+    current_period_end = models.PositiveBigIntegerField(null=True, blank=True)
+    days_until_due = models.PositiveIntegerField(null=True, blank=True)
+    start_date = models.PositiveBigIntegerField(null=True, blank=True)
+    created = models.PositiveBigIntegerField(null=True, blank=True)
+    ended_at = models.PositiveBigIntegerField(null=True, blank=True)
+    cancel_at = models.PositiveBigIntegerField(null=True, blank=True)
+    cancel_at_period_end = models.BooleanField(default=False)
+    canceled_at = models.PositiveBigIntegerField(null=True, blank=True)
+
+    # methods
+
+    def to_stripe(self, latest_invoice=None) -> stripe.Subscription:
+        """
+        :class:`stripe.Subscription` with ``plan.product``
+        (and ``latest_invoice``, if given) expanded.
+        """
+        plan = self.price.to_dict(expand_product=True) if self.price else None
+        return stripe.Subscription.construct_from(
+            {
+                "id": self.subscription_id,
+                "object": "subscription",
+                "customer": self.customer_id,
+                "plan": plan,
+                "status": self.status,
+                "current_period_start": self.current_period_start,
+                "current_period_end": self.current_period_end,
+                "days_until_due": self.days_until_due,
+                "start_date": self.start_date,
+                "created": self.created,
+                "ended_at": self.ended_at,
+                "cancel_at": self.cancel_at,
+                "cancel_at_period_end": self.cancel_at_period_end,
+                "canceled_at": self.canceled_at,
+                "latest_invoice": latest_invoice.to_dict() if latest_invoice else None,
+            },
+            stripe.api_key,
+        )
+
+    # repr methods
+
+    def __str__(self) -> str:
+        return f"<sub:{self.subscription_id},status:{self.status}>"
+
+
+class StripeInvoice(StripeMirrorModel):
+    """
+    Local copy of a :class:`stripe.Invoice`
+    (only the fields exposed by ``InvoiceSerializer``).
+    """
+
+    # fields
+
+    invoice_id = models.CharField(max_length=64, primary_key=True)
+    subscription_id = models.CharField(max_length=64, db_index=True, null=True)
+    customer_id = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=32, null=True, blank=True)
+    currency = models.CharField(max_length=3, default="")
+    description = models.TextField(null=True, blank=True)
+    total = models.BigIntegerField(default=0)
+    amount_due = models.BigIntegerField(default=0)
+    amount_paid = models.BigIntegerField(default=0)
+    amount_remaining = models.BigIntegerField(default=0)
+    # unix timestamps, as returned by stripe
+    created = models.PositiveBigIntegerField(null=True, blank=True)
+    due_date = models.PositiveBigIntegerField(null=True, blank=True)
+    # {"start": ..., "end": ...} of the first line
+    period = models.JSONField(default=dict, blank=True)
+    lines_descriptions = models.JSONField(default=list, blank=True)
+    hosted_invoice_url = models.URLField(max_length=512, null=True, blank=True)
+    invoice_pdf = models.URLField(max_length=512, null=True, blank=True)
+
+    # meta
+
+    class Meta:
+        ordering = ["-created"]
+
+    # methods
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.invoice_id,
+            "object": "invoice",
+            "subscription": self.subscription_id,
+            "customer": self.customer_id,
+            "status": self.status,
+            "currency": self.currency,
+            "description": self.description,
+            "total": self.total,
+            "amount_due": self.amount_due,
+            "amount_paid": self.amount_paid,
+            "amount_remaining": self.amount_remaining,
+            "created": self.created,
+            "due_date": self.due_date,
+            "lines": {
+                "object": "list",
+                "data": [
+                    {"description": description, "period": self.period}
+                    for description in self.lines_descriptions
+                ],
+            },
+            "hosted_invoice_url": self.hosted_invoice_url,
+            "invoice_pdf": self.invoice_pdf,
+        }
+
+    def to_stripe(self) -> stripe.Invoice:
+        return stripe.Invoice.construct_from(self.to_dict(), stripe.api_key)
+
+    # repr methods
+
+    def __str__(self) -> str:
+        return f"<invoice:{self.invoice_id},sub:{self.subscription_id}>"
+
+
+class StripeEvent(models.Model):
+    """
+    Processed stripe webhook event, to process each event only once.
+    """
+
+    # fields
+
+    event_id = models.CharField(max_length=64, primary_key=True)
+    type = models.CharField(max_length=128)
+    # unix timestamp, as returned by stripe
+    created = models.PositiveBigIntegerField()
+    received_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    # repr methods
+
+    def __str__(self) -> str:
+        return f"<event:{self.event_id},type:{self.type}>"
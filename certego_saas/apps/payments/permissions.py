@@ -1,11 +1,17 @@
 from rest_framework.permissions import BasePermission
 
+from certego_saas.ext.models import AppChoices
+
+from .decisions import decision_cache
+
 
 class UserHasActiveSubscription(BasePermission):
     """
     Allows access to customers who have an active stripe subscription.
 
     * Should be used along with :class:`rest_framework.permissions.IsAuthenticated`.
+    * Decisions are cached in process memory
+      (:mod:`certego_saas.apps.payments.decisions`).
     """
 
     message = {
@@ -22,8 +28,19 @@ class UserHasActiveSubscription(BasePermission):
         if not request.user.is_active:
             return False
 
+        appname = AppChoices.CURRENTAPP.value
+        allowed = decision_cache.get(request.user.pk, appname)
+        if allowed is not None:
+            return allowed
+        # read before computing: a concurrent invalidation outdates the decision
+        version = decision_cache.get_version(request.user.pk)
+        degraded = False
+        allowed = False
         if request.user.has_customer():
-            return (
-                request.user.customer.currentapp_subscription.has_active_subscription()
-            )
-        return False
+            subscription = request.user.customer.currentapp_subscription
+            allowed = subscription.has_active_subscription()
+            degraded = subscription.degraded
+        decision_cache.set(
+            request.user.pk, appname, allowed, degraded=degraded, version=version
+        )
+        return allowed
@@ -0,0 +1,126 @@
+"""
+Deferred creation of the stripe customers.
+
+At signup, a :class:`PendingCustomer` row is recorded (:func:`enqueue`)
+instead of calling ``stripe.Customer.create`` inside the request.
+A worker (``python manage.py provision_customers``) then creates
+the customers in batches, at most ``rate`` per second, retrying the
+failures with an exponential backoff. ``User.get_or_create_customer()``
+still creates the customer right away if it's needed before the worker
+gets to it.
+"""
+import datetime
+import logging
+import time
+from typing import Dict, List
+
+import stripe
+from django.db import transaction
+from django.utils import timezone
+
+from .consts import (
+    CUSTOMER_PROVISIONING_BATCH_SIZE,
+    CUSTOMER_PROVISIONING_LEASE,
+    CUSTOMER_PROVISIONING_MAX_ATTEMPTS,
+    CUSTOMER_PROVISIONING_RATE,
+    CUSTOMER_PROVISIONING_RETRY_BACKOFF,
+)
+from .exceptions import StripeUnavailable
+from .models import Customer, PendingCustomer
+
+__all__ = [
+    "enqueue",
+    "provision_pending",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(user) -> PendingCustomer:
+    """
+    Records that ``user`` needs a stripe customer.
+    """
+    pending, _ = PendingCustomer.objects.get_or_create(user=user)
+    return pending
+
+
+def _claim(batch_size: int, max_attempts: int) -> List[PendingCustomer]:
+    # a lease, rather than a lock held while calling stripe,
+    # keeps concurrent workers off the same rows
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            PendingCustomer.objects.select_for_update(skip_locked=True).filter(
+                next_attempt_at__lte=now, attempts__lt=max_attempts
+            )[:batch_size]
+        )
+        PendingCustomer.objects.filter(pk__in=[p.pk for p in batch]).update(
+            next_attempt_at=now
+            + datetime.timedelta(seconds=CUSTOMER_PROVISIONING_LEASE)
+        )
+    return batch
+
+
+def _retry_later(pending: PendingCustomer, error: Exception, max_attempts: int):
+    pending.attempts += 1
+    pending.last_error = str(error)[:1024]
+    backoff = CUSTOMER_PROVISIONING_RETRY_BACKOFF * 2 ** (pending.attempts - 1)
+    pending.next_attempt_at = timezone.now() + datetime.timedelta(
+        seconds=min(backoff, 60 * 60 * 6)
+    )
+    pending.save(update_fields=["attempts", "last_error", "next_attempt_at"])
+    if pending.attempts >= max_attempts:
+        logger.error(
+            f"giving up creating the stripe customer of user {pending.user_id}"
+            f" after {pending.attempts} attempts: {error}"
+        )
+    else:
+        logger.warning(
+            f"failed creating the stripe customer of user {pending.user_id}"
+            f" (attempt {pending.attempts}): {error}"
+        )
+
+
+def provision_pending(
+    batch_size: int = CUSTOMER_PROVISIONING_BATCH_SIZE,
+    rate: float = CUSTOMER_PROVISIONING_RATE,
+    max_attempts: int = CUSTOMER_PROVISIONING_MAX_ATTEMPTS,
+) -> Dict[str, int]:
+    """
+    Creates the stripe customers of a batch of due :class:`PendingCustomer`,
+    at most ``rate`` per second. Returns the number of ``created``,
+    ``existing`` (created meanwhile by ``get_or_create_customer``)
+    and ``failed`` customers. ``stopped`` counts the rest of the batch,
+    the failing customer included, when it is interrupted because stripe
+    is throttling us or is unavailable: the caller should then wait
+    before the next batch.
+    """
+    counts = {"created": 0, "existing": 0, "failed": 0, "stopped": 0}
+    interval = 1 / rate if rate else 0
+    next_call = time.monotonic()
+    batch = _claim(batch_size, max_attempts)
+    for position, pending in enumerate(batch):
+        delay = next_call - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_call = time.monotonic() + interval
+        try:
+            _, created = Customer._create_customer(user_id=pending.user_id)
+        except (stripe.error.RateLimitError, StripeUnavailable) as e:
+            # stripe is throttling us or is unavailable (circuit open):
+            # release the rest of the batch, don't burn its attempts
+            _retry_later(pending, e, max_attempts)
+            counts["failed"] += 1
+            released = [p.pk for p in batch[position + 1 :]]
+            PendingCustomer.objects.filter(pk__in=released).update(
+                next_attempt_at=timezone.now()
+            )
+            counts["stopped"] = len(released) + 1
+            break
+        except Exception as e:
+            _retry_later(pending, e, max_attempts)
+            counts["failed"] += 1
+            continue
+        PendingCustomer.objects.filter(pk=pending.pk).delete()
+        counts["created" if created else "existing"] += 1
+    return counts
@@ -0,0 +1,286 @@
+import calendar
+import datetime
+import logging
+import math
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+from django.utils import timezone
+
+from .cache import get_cache
+from .exceptions import CustomerWithoutSubscription, StripeUnavailable
+
+if TYPE_CHECKING:
+    from .models import Subscription
+
+__all__ = [
+    "QuotaAccountant",
+    "billing_period",
+    "calendar_period",
+    "quota_accountant",
+]
+
+logger = logging.getLogger(__name__)
+
+Period = Tuple[datetime.datetime, datetime.datetime]
+
+
+def _field(obj: Any, key: str) -> Any:
+    # ``stripe.StripeObject`` supports item access but not ``.get``
+    try:
+        return obj[key]
+    except (KeyError, TypeError):
+        return None
+
+
+def _add_months(moment: datetime.datetime, months: int) -> datetime.datetime:
+    # as stripe, clamps the day to the last day of shorter months
+    month = moment.month - 1 + months
+    year = moment.year + month // 12
+    month = month % 12 + 1
+    day = min(moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+
+def _months_between(start: datetime.datetime, end: datetime.datetime) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def calendar_period(now: datetime.datetime) -> Period:
+    """
+    Calendar month of ``now``.
+    """
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return start, _add_months(start, 1)
+
+
+def billing_period(start: int, end: int, now: datetime.datetime) -> Period:
+    """
+    Billing period containing ``now``, given the bounds (unix timestamps)
+    of a period of the same subscription, e.g. a stale
+    ``current_period_start``/``current_period_end``: in closed form,
+    whole months for monthly/yearly plans, fixed length otherwise.
+    """
+    tz = datetime.timezone.utc
+    start_dt = datetime.datetime.fromtimestamp(start, tz=tz)
+    end_dt = datetime.datetime.fromtimestamp(end, tz=tz)
+    if start_dt <= now < end_dt:
+        return start_dt, end_dt
+    months = _months_between(start_dt, end_dt)
+    if months > 0:
+        periods = _months_between(start_dt, now) // months
+        if _add_months(start_dt, periods * months) > now:
+            periods -= 1
+        return (
+            _add_months(start_dt, periods * months),
+            _add_months(start_dt, (periods + 1) * months),
+        )
+    length = end_dt - start_dt
+    periods = (now - start_dt) // length
+    return start_dt + periods * length, start_dt + (periods + 1) * length
+
+
+class QuotaAccountant:
+    """
+    Counts the submissions of each customer, per app and quota period
+    (the subscription billing period, the calendar month without
+    a subscription), with atomic counters in the payments cache.
+
+    - :meth:`record` must be called for every accounted submission.
+    - :meth:`is_exhausted` compares the usage with
+      :attr:`Subscription.monthly_submissions_limit`: O(1), no DB scan.
+    - :meth:`reconcile` persists the counters to :class:`QuotaUsage` rows
+      (see the ``reconcile_quota`` management command). On a cache miss
+      the counter is seeded from the DB row.
+    - the period bounds are cached per customer until the period ends
+      (or the subscription changes, see :meth:`invalidate_period`).
+    """
+
+    CACHE_KEY = "quota.%(appname)s.%(customer_id)s.%(period)s"
+    PERIOD_CACHE_KEY = "quota.period.%(appname)s.%(customer_id)s"
+    # counters outlive the longest quota period
+    CACHE_TIMEOUT = 60 * 60 * 24 * 40
+
+    def __init__(self, cache=None):
+        self._cache = cache
+
+    @property
+    def cache(self):
+        return self._cache or get_cache()
+
+    # periods
+
+    def _get_period_cache_key(self, subscription: "Subscription") -> str:
+        return self.PERIOD_CACHE_KEY % {
+            "appname": getattr(subscription.appname, "value", subscription.appname),
+            "customer_id": subscription.customer_id,
+        }
+
+    def _compute_period(
+        self, subscription: "Subscription", now: datetime.datetime
+    ) -> Tuple[Period, bool]:
+        # (period, whether it can be cached)
+        try:
+            stripe_subscription = subscription.get_subscription()
+        except CustomerWithoutSubscription:
+            return calendar_period(now), True
+        except StripeUnavailable:
+            return calendar_period(now), False
+        bounds = []
+        for field in ("current_period_start", "current_period_end"):
+            value = _field(stripe_subscription, field)
+            if value is None:
+                # moved to the subscription items in the most recent API versions
+                items = _field(_field(stripe_subscription, "items"), "data") or []
+                value = _field(items[0], field) if items else None
+            bounds.append(value)
+        if None in bounds:
+            return calendar_period(now), not subscription.degraded
+        return billing_period(bounds[0], bounds[1], now), not subscription.degraded
+
+    def get_period(
+        self, subscription: "Subscription", now: Optional[datetime.datetime] = None
+    ) -> Period:
+        """
+        ``(start, end)`` of the quota period containing ``now``.
+        """
+        if now is not None:
+            return self._compute_period(subscription, now)[0]
+        now = timezone.now()
+        key = self._get_period_cache_key(subscription)
+        period = self.cache.get(key, None)
+        if period is not None and period[0] <= now < period[1]:
+            return period
+        period, cacheable = self._compute_period(subscription, now)
+        if cacheable:
+            timeout = math.ceil((period[1] - now).total_seconds())
+            self.cache.set(key, period, max(timeout, 1))
+        return period
+
+    def get_period_start(
+        self, subscription: "Subscription", now: Optional[datetime.datetime] = None
+    ) -> datetime.date:
+        """
+        First day of the current quota period.
+        """
+        return self.get_period(subscription, now)[0].date()
+
+    def seconds_until_reset(
+        self,
+        subscription: Optional["Subscription"] = None,
+        now: Optional[datetime.datetime] = None,
+    ) -> float:
+        """
+        Seconds until the end of the current quota period
+        (of the calendar month, if ``subscription`` is ``None``).
+        """
+        if subscription is None:
+            now = now or timezone.now()
+            end = calendar_period(now)[1]
+        else:
+            end = self.get_period(subscription, now)[1]
+            now = now or timezone.now()
+        return max((end - now).total_seconds(), 0.0)
+
+    def invalidate_period(self, subscription: "Subscription") -> None:
+        self.cache.delete(self._get_period_cache_key(subscription))
+
+    def get_cache_key(
+        self, customer_id: str, appname: str, period_start: datetime.date
+    ) -> str:
+        return self.CACHE_KEY % {
+            # AppChoices members are formatted as "AppChoices.<NAME>"
+            "appname": getattr(appname, "value", appname),
+            "customer_id": customer_id,
+            "period": period_start.isoformat(),
+        }
+
+    # counters
+
+    def _seed(self, subscription: "Subscription", period_start: datetime.date) -> int:
+        from .models import QuotaUsage
+
+        usage, _ = QuotaUsage.objects.get_or_create(
+            customer_id=subscription.customer_id,
+            appname=subscription.appname,
+            period_start=period_start,
+        )
+        return usage.count
+
+    def usage(self, subscription: "Subscription") -> int:
+        """
+        Number of submissions in the current quota period.
+        """
+        period_start = self.get_period_start(subscription)
+        key = self.get_cache_key(
+            subscription.customer_id, subscription.appname, period_start
+        )
+        count = self.cache.get(key, None)
+        if count is None:
+            count = self._seed(subscription, period_start)
+            if not self.cache.add(key, count, self.CACHE_TIMEOUT):
+                # concurrently seeded
+                count = self.cache.get(key, count)
+        return count
+
+    def record(self, subscription: "Subscription", count: int = 1) -> int:
+        """
+        Account ``count`` submissions; returns the updated usage.
+        """
+        period_start = self.get_period_start(subscription)
+        key = self.get_cache_key(
+            subscription.customer_id, subscription.appname, period_start
+        )
+        try:
+            return self.cache.incr(key, count)
+        except ValueError:
+            seed = self._seed(subscription, period_start)
+            if self.cache.add(key, seed + count, self.CACHE_TIMEOUT):
+                return seed + count
+            return self.cache.incr(key, count)
+
+    def is_exhausted(self, subscription: "Subscription") -> bool:
+        return self.usage(subscription) >= subscription.monthly_submissions_limit
+
+    # persistence
+
+    def reconcile(self, period_start: Optional[datetime.date] = None) -> int:
+        """
+        Persist the cache counters of the periods starting on ``period_start``
+        (default: of all the periods whose counters may still be cached)
+        to the DB. Returns the number of updated rows.
+        """
+        from .models import QuotaUsage
+
+        if period_start is None:
+            usages = list(
+                QuotaUsage.objects.filter(
+                    period_start__gte=timezone.now().date()
+                    - datetime.timedelta(seconds=self.CACHE_TIMEOUT)
+                )
+            )
+        else:
+            usages = list(QuotaUsage.objects.filter(period_start=period_start))
+        keys = {
+            self.get_cache_key(
+                usage.customer_id, usage.appname, usage.period_start
+            ): usage
+            for usage in usages
+        }
+        counts = self.cache.get_many(list(keys))
+        to_update = []
+        now = timezone.now()
+        for key, count in counts.items():
+            usage = keys[key]
+            if count != usage.count:
+                usage.count = count
+                usage.updated_at = now
+                to_update.append(usage)
+        QuotaUsage.objects.bulk_update(to_update, ["count", "updated_at"])
+        logger.info(
+            f"reconciled {len(to_update)}/{len(usages)} quota usages"
+            f" of {period_start or 'the cached periods'}"
+        )
+        return len(to_update)
+
+
+quota_accountant = QuotaAccountant()
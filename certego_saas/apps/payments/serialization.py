@@ -0,0 +1,222 @@
+"""
+Compact cache serialization of the stripe objects.
+
+Instead of pickling whole :class:`stripe.Subscription`, :class:`stripe.Invoice`
+and :class:`stripe.Customer` object graphs, only the fields read by
+:meth:`Subscription.active_subscription`, ``SubscriptionSerializer``,
+``InvoiceSerializer`` and the entitlements are cached, as a versioned
+plain ``dict``. Bump :data:`SCHEMA_VERSION` when a spec changes:
+entries with another version are treated as cache misses.
+
+Rebuilding the ``StripeObject`` graph (``construct_from``) is as slow as
+unpickling it, so every packed entry carries a random token and the objects
+built from it are kept in a bounded per-process LRU
+(:data:`CONSTRUCTED_CACHE_SIZE` entries): reading an entry again costs a
+dict lookup. Like the values of the local tier of
+:class:`certego_saas.ext.cache.TwoTierCache`, the returned objects
+are shared and must not be modified.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
+
+import stripe
+
+__all__ = [
+    "SCHEMA_VERSION",
+    "is_packed",
+    "pack",
+    "unpack",
+]
+
+SCHEMA_VERSION = 2
+CONSTRUCTED_CACHE_SIZE = 256
+
+# field -> None (kept as is), nested spec, or [spec] for lists of objects
+Spec = Dict[str, Any]
+
+PRODUCT_SPEC: Spec = {
+    "id": None,
+    "object": None,
+    "name": None,
+    "description": None,
+    "active": None,
+    "metadata": None,
+}
+INVOICE_SPEC: Spec = {
+    "id": None,
+    "object": None,
+    "subscription": None,
+    "customer": None,
+    "status": None,
+    "currency": None,
+    "description": None,
+    "total": None,
+    "amount_due": None,
+    "amount_paid": None,
+    "amount_remaining": None,
+    "created": None,
+    "due_date": None,
+    "hosted_invoice_url": None,
+    "invoice_pdf": None,
+    "lines": {
+        "object": None,
+        "data": [{"description": None, "period": None}],
+    },
+}
+SUBSCRIPTION_SPEC: Spec = {
+    "id": None,
+    "object": None,
+    "customer": None,
+    "status": None,
+    "current_period_start": None,
+    "current_period_end": None,
+    "days_until_due": None,
+    "start_date": None,
+    "created": None,
+    "ended_at": None,
+    "cancel_at": None,
+    "cancel_at_period_end": None,
+    "canceled_at": None,
+    "plan": {
+        "id": None,
+        "object": None,
+        "currency": None,
+        "amount": None,
+        "interval": None,
+        "interval_count": None,
+        "product": PRODUCT_SPEC,
+    },
+    # billing period of the most recent API versions
+    "items": {
+        "object": None,
+        "data": [
+            {
+                "id": None,
+                "object": None,
+                "current_period_start": None,
+                "current_period_end": None,
+            }
+        ],
+    },
+    "latest_invoice": INVOICE_SPEC,
+}
+CUSTOMER_SPEC: Spec = {
+    "id": None,
+    "object": None,
+    "email": None,
+    "name": None,
+    "currency": None,
+    "balance": None,
+    "delinquent": None,
+    "created": None,
+    "metadata": None,
+}
+
+SPECS: Dict[str, Spec] = {
+    "subscription": SUBSCRIPTION_SPEC,
+    "invoice": INVOICE_SPEC,
+    "customer": CUSTOMER_SPEC,
+    "product": PRODUCT_SPEC,
+}
+CLASSES = {
+    "subscription": stripe.Subscription,
+    "invoice": stripe.Invoice,
+    "customer": stripe.Customer,
+    "product": stripe.Product,
+}
+
+
+def _select(data: Any, spec: Spec) -> Any:
+    if not isinstance(data, dict):
+        # not expanded (id) or null
+        return data
+    selected = {}
+    for field, subspec in spec.items():
+        if field not in data:
+            continue
+        value = data[field]
+        if isinstance(subspec, list):
+            value = [_select(item, subspec[0]) for item in value or []]
+        elif subspec is not None:
+            value = _select(value, subspec)
+        selected[field] = value
+    return selected
+
+
+def _pack_object(obj: Any) -> Dict:
+    data = obj.to_dict() if isinstance(obj, stripe.StripeObject) else obj
+    spec = SPECS.get(data.get("object"), None)
+    if spec is None:
+        raise ValueError(f"unsupported stripe object: {data.get('object')}")
+    return _select(data, spec)
+
+
+def pack(obj: Union[stripe.StripeObject, List[stripe.StripeObject]]) -> Dict:
+    """
+    Compact, versioned ``dict`` of a stripe object or of a list of them.
+    """
+    # the token identifies the constructed objects of this entry
+    packed = {"v": SCHEMA_VERSION, "k": uuid.uuid4().hex}
+    if isinstance(obj, list):
+        packed["list"] = [_pack_object(o) for o in obj]
+    else:
+        packed["object"] = _pack_object(obj)
+    return packed
+
+
+def _construct(data: Dict) -> stripe.StripeObject:
+    klass = CLASSES.get(data.get("object"), stripe.StripeObject)
+    return klass.construct_from(data, stripe.api_key)
+
+
+# token -> constructed object(s)
+_constructed: "OrderedDict[str, Any]" = OrderedDict()
+_constructed_lock = threading.Lock()
+
+
+def _get_constructed(token: Optional[str]) -> Any:
+    if token is None:
+        return None
+    with _constructed_lock:
+        constructed = _constructed.get(token, None)
+        if constructed is not None:
+            _constructed.move_to_end(token)
+        return constructed
+
+
+def _set_constructed(token: Optional[str], constructed: Any) -> None:
+    if token is None:
+        return
+    with _constructed_lock:
+        _constructed[token] = constructed
+        while len(_constructed) > CONSTRUCTED_CACHE_SIZE:
+            _constructed.popitem(last=False)
+
+
+def is_packed(packed: Any) -> bool:
+    """
+    Whether ``packed`` was packed with the current schema version.
+    """
+    return isinstance(packed, dict) and packed.get("v") == SCHEMA_VERSION
+
+
+def unpack(
+    packed: Any,
+) -> Optional[Union[stripe.StripeObject, List[stripe.StripeObject]]]:
+    """
+    Inverse of :func:`pack`; ``None`` for entries of another schema version.
+    """
+    if not is_packed(packed):
+        return None
+    token = packed.get("k")
+    constructed = _get_constructed(token)
+    if constructed is None:
+        if "list" in packed:
+            constructed = [_construct(data) for data in packed["list"]]
+        else:
+            constructed = _construct(packed["object"])
+        _set_constructed(token, constructed)
+    # the list is the caller's, its objects are shared
+    return list(constructed) if isinstance(constructed, list) else constructed
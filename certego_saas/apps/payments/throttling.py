@@ -1,24 +1,67 @@
-from abc import ABCMeta, abstractmethod
+import time
 
-from django.utils import timezone
 from rest_framework.exceptions import Throttled
 from rest_framework.throttling import BaseThrottle
 
+from certego_saas.ext.metrics import throttle_metrics
+from certego_saas.settings import certego_apps_settings
 
-class SubscriptionRateThrottle(BaseThrottle, metaclass=ABCMeta):
+from .entitlements import Entitlements
+from .quota import quota_accountant
+from .utils import get_default_product
+
+
+class SubscriptionRateThrottle(BaseThrottle):
     """
     Restrict access if
     :attr:`User.stripe.monthly_submissions_limit` has been exhausted.
+
+    Decisions are recorded in :data:`certego_saas.ext.metrics.throttle_metrics`
+    under the ``scope`` scope.
     """
 
-    @abstractmethod
+    scope = "subscription_quota"
+    # the subscription whose quota is exhausted, see :meth:`wait`
+    subscription = None
+
+    def get_subscription(self, request, view):
+        """
+        The user's subscription, ``None`` if the user has no customer
+        (yet): never creates one on stripe in the request.
+        """
+        customer = getattr(request.user, "customer", None)
+        if customer is None:
+            return None
+        return customer.currentapp_subscription
+
     def is_quota_exhausted(self, request, view) -> bool:
-        raise NotImplementedError()
+        """
+        By default, compares the usage counted by
+        :data:`certego_saas.apps.payments.quota.quota_accountant`
+        (remember to ``quota_accountant.record()`` each submission)
+        with the subscription's ``monthly_submissions_limit``.
+        """
+        subscription = self.get_subscription(request, view)
+        if subscription is None:
+            # no customer, no accounted submissions: free tier limit
+            default = Entitlements.from_product(get_default_product(), is_default=True)
+            return default.monthly_submissions_limit <= 0
+        return quota_accountant.is_exhausted(subscription)
 
     def allow_request(self, request, view):
         # check if monthly quota has been exhausted
+        start = time.perf_counter()
         quota_exhausted = self.is_quota_exhausted(request, view)
+        if certego_apps_settings.THROTTLE_METRICS_ENABLED:
+            user = getattr(request, "user", None)
+            throttle_metrics.record(
+                self.scope,
+                f"userId_{user.pk}" if user else None,
+                not quota_exhausted,
+                time.perf_counter() - start,
+            )
         if quota_exhausted:
+            self.subscription = self.get_subscription(request, view)
             raise Throttled(
                 detail="Monthly max submissions quota exhausted.",
                 wait=self.wait(),
@@ -28,13 +71,7 @@ class SubscriptionRateThrottle(BaseThrottle, metaclass=ABCMeta):
 
     def wait(self):
         """
-        calculates distance in seconds
-        from current time to 1st of next month.
+        Seconds until the end of the quota period: the subscription
+        billing period, or the calendar month.
         """
-        fromdate = timezone.datetime.today()
-        todate = fromdate
-        while todate.day != 1:
-            todate += timezone.timedelta(days=1)
-
-        delta = todate - fromdate
-        return delta.total_seconds()
+        return quota_accountant.seconds_until_reset(self.subscription)
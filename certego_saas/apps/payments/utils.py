@@ -1,66 +1,27 @@
 from typing import Dict, List
 
-import stripe
-
 from certego_saas.ext.models import AppChoices
 
-from .cache import cache_memoize
+from .catalog import catalog
 from .consts import CERTEGO_USERS_PRODUCT_NAME, PUBLIC_PRODUCT_NAME, STRIPE_LIVE_MODE
 
 
-@cache_memoize(60 * 60 * 24)
 def get_products() -> List[Dict]:
     """
     Returns list of stripe plans/products.
 
-    Alias for ``stripe.Price.list(expand=["data.product"])``.
+    Served from the catalog snapshot (see :mod:`certego_saas.apps.payments.catalog`).
     """
-    prices = stripe.Price.list(expand=["data.product"]).data
-    prod_price_list = []
-    for price in prices:
-        product = price.product
-        if product.name == "Integration":
-            continue  # skip to next iteration
-        if product.active:
-            prod_price_list.append(
-                {
-                    "id": product.id,
-                    "name": product.name,
-                    "description": product.description,
-                    "metadata": product.metadata,
-                    "currency": price.currency,
-                    "unit_amount": price.unit_amount,
-                }
-            )
-
-    return prod_price_list
+    return list(catalog.get().products)
 
 
-@cache_memoize(60 * 60 * 24)
 def get_products_prices_map() -> Dict[str, Dict]:
     """
     Returns dict mapping of stripe plans/products.
 
-    Alias for ``stripe.Price.list(expand=["data.product"])``.
+    Served from the catalog snapshot (see :mod:`certego_saas.apps.payments.catalog`).
     """
-    prices = stripe.Price.list(expand=["data.product"]).data
-    product_price_map = {}
-    for price in prices:
-        price_id = price.id
-        product_id = price.product.id
-        product_name = price.product.name
-        appname = price.product.metadata["appname"]
-        obj = {
-            "id": product_id,
-            "price_id": price_id,
-            "name": product_name,
-            "metadata": price.product.metadata,
-        }
-        product_price_map[price_id] = obj
-        product_price_map[product_id] = obj
-        product_price_map[f"{product_name}__{appname}"] = obj
-
-    return product_price_map
+    return catalog.get().prices_map
 
 
 def get_default_product() -> dict:
@@ -71,10 +32,10 @@ def get_default_product() -> dict:
 
     if STRIPE_LIVE_MODE:
         # public deployment
-        name = f"{PUBLIC_PRODUCT_NAME}__{AppChoices.CURRENTAPP}"
+        name = f"{PUBLIC_PRODUCT_NAME}__{AppChoices.CURRENTAPP.value}"
     else:
         # internal deployment
-        name = f"{CERTEGO_USERS_PRODUCT_NAME}__{AppChoices.CURRENTAPP}"
+        name = f"{CERTEGO_USERS_PRODUCT_NAME}__{AppChoices.CURRENTAPP.value}"
 
     default_product = get_products_prices_map()[name]
 
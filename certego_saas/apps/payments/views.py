@@ -0,0 +1,46 @@
+import logging
+
+import stripe
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .mirror import construct_event
+from .webhook import process_event
+
+__all__ = [
+    "StripeWebhookView",
+]
+
+logger = logging.getLogger(__name__)
+
+
+@extend_schema(exclude=True)
+class StripeWebhookView(APIView):
+    """
+    Receives the stripe webhook events: applies them to the local mirror
+    and invalidates the affected cache entries, once per event id
+    (see :func:`certego_saas.apps.payments.webhook.process_event`).
+
+    * `Stripe Webhooks Docs <https://stripe.com/docs/webhooks>`__
+    """
+
+    authentication_classes = []  # type: ignore
+    permission_classes = [AllowAny]
+    throttle_classes = []  # type: ignore
+
+    def post(self, request, *args, **kwargs) -> Response:
+        try:
+            event = construct_event(
+                request.body, request.META.get("HTTP_STRIPE_SIGNATURE", None)
+            )
+        except (ValueError, stripe.error.SignatureVerificationError) as e:
+            logger.warning(f"StripeWebhookView: rejected event: {e}")
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        processed = process_event(event)
+        logger.info(
+            f"StripeWebhookView: {event.type} ({event.id}) processed: {processed}"
+        )
+        return Response(status=status.HTTP_200_OK)
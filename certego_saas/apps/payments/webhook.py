@@ -0,0 +1,110 @@
+"""
+Idempotent processing of the stripe webhook events.
+
+Each event is:
+
+1. deduplicated by id (:class:`StripeEvent`), in the same transaction
+   that applies it to the local mirror (:func:`certego_saas.apps.payments.mirror.sync_event`),
+   so that an event redelivered by stripe is processed only once.
+2. after commit, used to invalidate only the cache entries
+   depending on the changed object (:func:`invalidate_caches`).
+"""
+import datetime
+import logging
+from typing import Any, Optional
+
+from django.core.cache import cache as default_cache
+from django.db import transaction
+from django.utils import timezone
+
+from certego_saas.ext.throttling import USER_THROTTLE_RATES_CACHE_KEY
+
+from . import invoices
+from .catalog import catalog
+from .consts import STRIPE_EVENTS_RETENTION_DAYS
+from .decisions import decision_cache
+from .mirror import _to_dict, get_invoice_subscription_id, sync_event
+from .models import Customer, StripeEvent, Subscription
+from .quota import quota_accountant
+
+__all__ = [
+    "process_event",
+    "invalidate_caches",
+    "prune_events",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _invalidate_subscription(
+    subscription_id: Optional[str], invoice_id: Optional[str] = None
+) -> None:
+    if not subscription_id:
+        return
+    subscription = (
+        Subscription.objects.select_related("customer")
+        .filter(pk=subscription_id)
+        .first()
+    )
+    if subscription is None:
+        return
+    subscription._retrieve_subscription.invalidate(subscription)
+    invoices.invalidate(subscription_id, invoice_id)
+    # the throttle rates and the permissions depend on the subscription
+    default_cache.delete(USER_THROTTLE_RATES_CACHE_KEY % subscription.customer.user_id)
+    decision_cache.invalidate(subscription.customer.user_id)
+    quota_accountant.invalidate_period(subscription)
+
+
+def _invalidate_customer(customer_id: Optional[str]) -> None:
+    customer = Customer.objects.filter(pk=customer_id).first()
+    if customer is not None:
+        customer.get_stripe_customer.invalidate(customer)
+        decision_cache.invalidate(customer.user_id)
+
+
+def invalidate_caches(event: Any) -> None:
+    """
+    Deletes the ``cache_memoize`` entries affected by ``event``
+    and expires the catalog snapshot on products/prices changes.
+    """
+    event = _to_dict(event)
+    event_type = event["type"]
+    obj = event["data"]["object"]
+    if event_type.startswith("customer.subscription."):
+        _invalidate_subscription(obj["id"])
+    elif event_type.startswith("invoice."):
+        _invalidate_subscription(get_invoice_subscription_id(obj), obj["id"])
+    elif event_type.startswith(("product.", "price.")):
+        catalog.invalidate()
+    elif event_type.startswith("customer."):
+        _invalidate_customer(obj["id"])
+
+
+def process_event(event: Any) -> bool:
+    """
+    Applies ``event`` to the mirror and invalidates the affected caches.
+    Returns ``False`` if the event had already been processed.
+    """
+    event = _to_dict(event)
+    with transaction.atomic():
+        _, created = StripeEvent.objects.get_or_create(
+            event_id=event["id"],
+            defaults={"type": event["type"], "created": event["created"]},
+        )
+        if not created:
+            logger.info(f"skipped duplicated stripe event {event['id']}")
+            return False
+        sync_event(event)
+        transaction.on_commit(lambda: invalidate_caches(event))
+    return True
+
+
+def prune_events(days: int = STRIPE_EVENTS_RETENTION_DAYS) -> int:
+    """
+    Deletes the processed events received more than ``days`` days ago.
+    """
+    deleted, _ = StripeEvent.objects.filter(
+        received_at__lt=timezone.now() - datetime.timedelta(days=days)
+    ).delete()
+    return deleted
@@ -90,6 +90,10 @@ if apps.is_installed("certego_saas.apps.payments"):
             return hasattr(self, "customer") and self.customer is not None
 
         def get_or_create_customer(self) -> Tuple[Customer, bool]:
+            """
+            Returns the user's ``Customer``, creating it on stripe
+            if the provisioning worker hasn't done it yet.
+            """
             if self.has_customer():
                 return self.customer, False
             return Customer._create_customer(user_id=self.pk)
@@ -113,12 +117,15 @@ if apps.is_installed("certego_saas.apps.payments"):
     @receiver(models.signals.post_save, sender=User)
     def post_save_user_handler(sender, instance: User, created: bool, **kwargs):
         """
-        Create corresponding ``Customer`` instance.
+        Create corresponding ``Customer`` instance; deferred to the
+        provisioning worker if ``STRIPE_CUSTOMER_PROVISIONING_DEFERRED``.
         """
         from certego_saas.apps.payments.consts import (
             TEST_ADMIN_CUSTOMER_ID,
             TEST_ADMIN_DF_SUBSCRIPTION_ID,
         )
+        from certego_saas.apps.payments.provisioning import enqueue
+        from certego_saas.settings import certego_apps_settings
 
         if (
             (not created)
@@ -146,7 +153,10 @@ if apps.is_installed("certego_saas.apps.payments"):
             )
             return
 
-        customer, _ = instance.get_or_create_customer()
+        if certego_apps_settings.STRIPE_CUSTOMER_PROVISIONING_DEFERRED:
+            enqueue(instance)
+        else:
+            customer, _ = instance.get_or_create_customer()
 
 else:
 
@@ -0,0 +1,329 @@
+"""
+Two-tier cache backend: a bounded in-process LRU (short TTL)
+in front of a shared cache (Redis, Memcached, ...).
+
+Example configuration, for the ``certego_saas.payments`` cache::
+
+    CACHES = {
+        "default": {...},
+        "certego_saas.payments.shared": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://redis:6379",
+            "KEY_PREFIX": "certego_saas.payments",
+        },
+        "certego_saas.payments": {
+            "BACKEND": "certego_saas.ext.cache.TwoTierCache",
+            "OPTIONS": {
+                "SHARED_ALIAS": "certego_saas.payments.shared",
+                "LOCAL_TIMEOUT": 5,
+                "LOCAL_MAX_ENTRIES": 1000,
+                "LOCAL_MAX_BYTES": 16 * 1024 * 1024,
+                "GENERATION_CHECK_INTERVAL": 1,
+            },
+        },
+    }
+
+Invalidation across processes: ``delete`` and ``delete_many`` append the
+deleted keys to a journal in the shared cache (a sequence number, plus an
+entry per deletion kept for ``LOCAL_TIMEOUT`` seconds); every process drops
+the local copies of the keys deleted since its last check, made at most
+every ``GENERATION_CHECK_INTERVAL`` seconds. If it missed part of the
+journal, or after a ``clear`` (which bumps a generation token), it drops
+its whole local tier. Other writes only drop the local copy of the process
+that made them: other processes may serve the previous value for up to
+``LOCAL_TIMEOUT`` seconds. Keys starting with ``lock.``, ``quota.``,
+``payments.decisions.`` or one of the ``LOCAL_EXCLUDED_PREFIXES``
+(e.g. counters) are never kept locally, nor journaled when deleted.
+"""
+import math
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+__all__ = [
+    "TwoTierCache",
+]
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Django cache backend, see the module documentation.
+    """
+
+    GENERATION_KEY = "two_tier_cache.generation"
+    DELETIONS_KEY = "two_tier_cache.deletions"
+    DELETION_KEY = "two_tier_cache.deletion.%d"
+    # beyond this, dropping the whole local tier is cheaper
+    MAX_DELETIONS_REPLAYED = 1000
+    DEFAULT_EXCLUDED_PREFIXES = ("lock.", "quota.", "payments.decisions.")
+
+    def __init__(self, location: str, params: Dict):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_alias = options["SHARED_ALIAS"]
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self.local_max_entries = options.get("LOCAL_MAX_ENTRIES", 1000)
+        self.local_max_bytes = options.get("LOCAL_MAX_BYTES", 16 * 1024 * 1024)
+        self.generation_check_interval = options.get("GENERATION_CHECK_INTERVAL", 1)
+        self.local_excluded_prefixes = self.DEFAULT_EXCLUDED_PREFIXES + tuple(
+            options.get("LOCAL_EXCLUDED_PREFIXES", ())
+        )
+        self._lock = threading.Lock()
+        # local key -> (value, expires_at, size)
+        self._local: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._local_bytes = 0
+        self._generation: Optional[str] = None
+        # last deletion of the journal applied to the local tier
+        self._deletion: Optional[int] = None
+        self._generation_checked_at = 0.0
+        self._stats = {
+            "local": {"hits": 0, "misses": 0},
+            "shared": {"hits": 0, "misses": 0},
+        }
+
+    @property
+    def shared(self) -> BaseCache:
+        return caches[self.shared_alias]
+
+    # local tier
+
+    def _local_key(self, key, version) -> Optional[str]:
+        if str(key).startswith(self.local_excluded_prefixes):
+            return None
+        return self.shared.make_key(key, version=version)
+
+    def _check_generation(self) -> None:
+        now = time.monotonic()
+        if now - self._generation_checked_at < self.generation_check_interval:
+            return
+        self._generation_checked_at = now
+        state = self.shared.get_many([self.GENERATION_KEY, self.DELETIONS_KEY])
+        generation = state.get(self.GENERATION_KEY, None)
+        deletion = state.get(self.DELETIONS_KEY, 0)
+        if deletion == self._deletion and generation == self._generation:
+            return
+        keys = [
+            self.DELETION_KEY % n
+            for n in range((self._deletion or 0) + 1, deletion + 1)
+        ]
+        replay = (
+            generation == self._generation
+            and self._deletion is not None
+            and deletion > self._deletion
+            and len(keys) <= self.MAX_DELETIONS_REPLAYED
+        )
+        entries = self.shared.get_many(keys) if replay else {}
+        with self._lock:
+            if replay and len(entries) == len(keys):
+                for local_keys in entries.values():
+                    for local_key in local_keys:
+                        self._local_pop(local_key)
+            else:
+                self._clear_local()
+        self._generation = generation
+        self._deletion = deletion
+
+    def _journal_deletions(self, local_keys: List[str]) -> None:
+        shared = self.shared
+        shared.add(self.DELETIONS_KEY, 0, None)
+        try:
+            deletion = shared.incr(self.DELETIONS_KEY)
+        except ValueError:
+            # evicted meanwhile
+            self._bump_generation()
+            return
+        # older local copies have expired anyway
+        timeout = math.ceil(self.local_timeout + self.generation_check_interval)
+        shared.set(self.DELETION_KEY % deletion, local_keys, timeout)
+        with self._lock:
+            for local_key in local_keys:
+                self._local_pop(local_key)
+
+    def _bump_generation(self) -> None:
+        # a random token, rather than a counter, survives a ``clear``
+        self._generation = uuid.uuid4().hex
+        self.shared.set(self.GENERATION_KEY, self._generation, None)
+        with self._lock:
+            self._clear_local()
+
+    def _clear_local(self) -> None:
+        self._local.clear()
+        self._local_bytes = 0
+
+    def _local_get(self, local_key: str) -> Any:
+        with self._lock:
+            item = self._local.get(local_key, None)
+            if item is None:
+                return _MISSING
+            value, expires_at, size = item
+            if expires_at <= time.monotonic():
+                self._local_pop(local_key)
+                return _MISSING
+            self._local.move_to_end(local_key)
+            return value
+
+    def _local_set(self, local_key: str, value: Any) -> None:
+        try:
+            size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return
+        if size > self.local_max_bytes:
+            return
+        with self._lock:
+            self._local_pop(local_key)
+            self._local[local_key] = (
+                value,
+                time.monotonic() + self.local_timeout,
+                size,
+            )
+            self._local_bytes += size
+            while (
+                len(self._local) > self.local_max_entries
+                or self._local_bytes > self.local_max_bytes
+            ):
+                _, (_, _, evicted_size) = self._local.popitem(last=False)
+                self._local_bytes -= evicted_size
+
+    def _local_pop(self, local_key: Optional[str]) -> None:
+        if local_key is None:
+            return
+        item = self._local.pop(local_key, None)
+        if item is not None:
+            self._local_bytes -= item[2]
+
+    def _local_discard(self, key, version) -> None:
+        local_key = self._local_key(key, version)
+        with self._lock:
+            self._local_pop(local_key)
+
+    # cache API
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self._check_generation()
+            value = self._local_get(local_key)
+            if value is not _MISSING:
+                self._stats["local"]["hits"] += 1
+                return value
+            self._stats["local"]["misses"] += 1
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._stats["shared"]["misses"] += 1
+            return default
+        self._stats["shared"]["hits"] += 1
+        if local_key is not None:
+            self._local_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found: Dict[Any, Any] = {}
+        # keys missing locally, with their local key (None if not kept locally)
+        missing: Dict[Any, Optional[str]] = {}
+        checked = False
+        for key in keys:
+            local_key = self._local_key(key, version)
+            if local_key is not None:
+                if not checked:
+                    self._check_generation()
+                    checked = True
+                value = self._local_get(local_key)
+                if value is not _MISSING:
+                    self._stats["local"]["hits"] += 1
+                    found[key] = value
+                    continue
+                self._stats["local"]["misses"] += 1
+            missing[key] = local_key
+        if missing:
+            # a single shared round trip for all the local misses
+            shared = self.shared.get_many(list(missing), version=version)
+            for key, local_key in missing.items():
+                if key not in shared:
+                    self._stats["shared"]["misses"] += 1
+                    continue
+                self._stats["shared"]["hits"] += 1
+                found[key] = shared[key]
+                if local_key is not None:
+                    self._local_set(local_key, shared[key])
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout=timeout, version=version)
+        self._local_discard(key, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout=timeout, version=version)
+        for key in data:
+            self._local_discard(key, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout=timeout, version=version)
+        if added:
+            self._local_discard(key, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout=timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta=delta, version=version)
+        self._local_discard(key, version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        value = self.shared.decr(key, delta=delta, version=version)
+        self._local_discard(key, version)
+        return value
+
+    def delete(self, key, version=None):
+        deleted = self.shared.delete(key, version=version)
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self._journal_deletions([local_key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version=version)
+        local_keys = [
+            local_key
+            for local_key in (self._local_key(key, version) for key in keys)
+            if local_key is not None
+        ]
+        if local_keys:
+            self._journal_deletions(local_keys)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        self.shared.clear()
+        self._bump_generation()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    # stats
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hits and misses per tier, plus the local tier's size.
+        """
+        with self._lock:
+            return {
+                "local": {
+                    **self._stats["local"],
+                    "entries": len(self._local),
+                    "bytes": self._local_bytes,
+                },
+                "shared": dict(self._stats["shared"]),
+            }
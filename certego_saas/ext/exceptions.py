@@ -1,49 +1,51 @@
-from typing import Optional
+import threading
+from typing import Callable, Dict, Optional, Union
 
+from django.utils.module_loading import import_string
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import exception_handler
 
 from certego_saas.apps.payments.consts import STRIPE_SENSITIVE_FIELDS_SET
+from certego_saas.settings import certego_apps_settings
 
 from .log import LogBuilder
+from .log_policy import get_log_policy
 
 __all__ = [
+    "ExceptionHandlerRegistry",
     "custom_exception_handler",
+    "get_exception_handlers",
 ]
 
+Handler = Callable[..., Optional[Response]]
+
 
 def custom_exception_handler(exc, context) -> Optional[Response]:
     """
     Extends ``rest_framework.views.exception_handler``.
 
     - Custom handlers for NotFound, ValidationError, AuthenticationError
+      and for the ones in the ``EXCEPTION_HANDLERS`` setting
+      (see :class:`ExceptionHandlerRegistry`).
     - Uses :class:`certego_saas.ext.log.LogBuilder` for JSON logging.
+    - Sampling and rate limiting of the logs
+      (see :mod:`certego_saas.ext.log_policy`).
     """
     # If an exception is thrown that we don't explicitly handle here, we want
     # to delegate to the default exception handler offered by DRF. If we do
     # handle this exception type, we will still want access to the response
     # generated by DRF, so we get that response up front.
     response = exception_handler(exc, context)
-    handlers = {
-        "NotFound": _handle_not_found_error,
-        "ValidationError": _handle_generic_error,
-        "AuthenticationError": _handle_stripe_error,
-    }
-    # This is how we identify the type of the current exception. We will use
-    # this in a moment to see whether we should handle this exception or let
-    # Django REST Framework do it's thing.
-    exc_class = exc.__class__.__name__
-    exc_class_base = exc.__class__.__base__.__name__
-
-    if exc_class in handlers:
-        handler = handlers[exc_class]
-        response = handler(exc, context, response)
-    elif exc_class_base in handlers:
-        handler = handlers[exc_class_base]
+    # Find out whether we should handle this exception
+    # or let Django REST Framework do it's thing.
+    handler = get_exception_handlers().resolve(exc.__class__)
+    if handler is not None:
         response = handler(exc, context, response)
 
-    if _should_log(exc, context):
+    if _should_log(exc, context) and get_log_policy().allow(
+        exc, context.get("view", None)
+    ):
         try:
             log_builder = LogBuilder(
                 request=context.get("request", None),
@@ -56,13 +58,82 @@ def custom_exception_handler(exc, context) -> Optional[Response]:
             log_builder.handle_log()
         except Exception:
             pass
-    else:
+    elif response is not None:
         # see django.utils.log.log_response
         response._has_been_logged = True  # type: ignore
 
     return response
 
 
+class ExceptionHandlerRegistry:
+    """
+    Maps exception classes to handlers with signature
+    ``handler(exc, context, response) -> Optional[Response]``.
+
+    Exception classes are registered by name (``"NotFound"``) or by
+    dotted path (``"rest_framework.exceptions.NotFound"``), so that they
+    don't need to be imported. The handler of an exception class is
+    resolved by walking its whole MRO, the dotted path taking precedence
+    over the name, and the result is memoized per class.
+    """
+
+    def __init__(self, handlers: Optional[Dict[str, Handler]] = None):
+        self._handlers: Dict[str, Handler] = dict(handlers or {})
+        self._resolved: Dict[type, Optional[Handler]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, exc_class: Union[str, type], handler: Handler) -> None:
+        if isinstance(exc_class, type):
+            exc_class = f"{exc_class.__module__}.{exc_class.__qualname__}"
+        with self._lock:
+            self._handlers[exc_class] = handler
+            self._resolved = {}
+
+    def resolve(self, exc_class: type) -> Optional[Handler]:
+        try:
+            return self._resolved[exc_class]
+        except KeyError:
+            pass
+        handler = None
+        for klass in exc_class.__mro__:
+            handler = self._handlers.get(
+                f"{klass.__module__}.{klass.__qualname__}", None
+            ) or self._handlers.get(klass.__name__, None)
+            if handler is not None:
+                break
+        self._resolved[exc_class] = handler
+        return handler
+
+    def __len__(self) -> int:
+        return len(self._handlers)
+
+
+_exception_handlers: Optional[ExceptionHandlerRegistry] = None
+
+
+def get_exception_handlers() -> ExceptionHandlerRegistry:
+    """
+    Default handlers updated with the ``EXCEPTION_HANDLERS`` setting:
+    a ``dict`` mapping exception class name/dotted path to the handler's dotted path.
+    """
+    global _exception_handlers
+    if _exception_handlers is None:
+        registry = ExceptionHandlerRegistry(
+            {
+                "NotFound": _handle_not_found_error,
+                "ValidationError": _handle_generic_error,
+                "AuthenticationError": _handle_stripe_error,
+            }
+        )
+        for exc_class, handler in certego_apps_settings.EXCEPTION_HANDLERS.items():
+            registry.register(
+                exc_class,
+                import_string(handler) if isinstance(handler, str) else handler,
+            )
+        _exception_handlers = registry
+    return _exception_handlers
+
+
 def _handle_generic_error(exc, context, response) -> Response:
     # This is about the most straightforward exception handler we can create.
     # We take the response generated by DRF and wrap it in the `errors` key.
@@ -0,0 +1,138 @@
+"""
+JSON serialization of :class:`certego_saas.ext.log.LogBuilder` records.
+
+Emits one compact line per event with a stable schema.
+Uses `orjson <https://github.com/ijl/orjson>`__ if installed,
+otherwise falls back to the standard library's :mod:`json`.
+
+Example ``LOGGING`` configuration::
+
+    "formatters": {
+        "json": {"()": "certego_saas.ext.formatters.JSONLogFormatter"},
+    },
+"""
+import datetime
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from certego_saas.settings import certego_apps_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+__all__ = [
+    "LOG_SCHEMA",
+    "JSONLogFormatter",
+    "dumps",
+    "serialize_log",
+]
+
+# ordered schema of the serialized ``LogBuilder.log``
+LOG_SCHEMA = (
+    "requested_at",
+    "response_ms",
+    "user_id",
+    "username_persistent",
+    "method",
+    "status_code",
+    "path",
+    "remote_addr",
+    "host",
+    "query_params",
+    "view",
+    "body",
+    "response",
+    "errors",
+)
+# fields that can hold arbitrarily large payloads
+TRUNCATED_FIELDS = ("query_params", "body", "response", "errors")
+TRUNCATED_SUFFIX = "...<truncated>"
+
+
+def _json_dumps(obj: Any) -> str:
+    return json.dumps(obj, default=str, separators=(",", ":"), ensure_ascii=False)
+
+
+if orjson is not None:
+
+    def dumps(obj: Any) -> str:
+        """
+        Compact JSON encoding; non-serializable values are encoded with ``str``.
+        """
+        try:
+            return orjson.dumps(
+                obj, default=str, option=orjson.OPT_NON_STR_KEYS
+            ).decode()
+        except TypeError:
+            return _json_dumps(obj)
+
+else:
+    dumps = _json_dumps
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.datetime.fromtimestamp(
+        timestamp, tz=datetime.timezone.utc
+    ).isoformat()
+
+
+def _truncate(value: Any, max_length: int) -> Optional[str]:
+    # always a string (or null), truncated or not: a stable type per field
+    if value is None:
+        return None
+    encoded = value if isinstance(value, str) else dumps(value)
+    if len(encoded) <= max_length:
+        return encoded
+    return encoded[:max_length] + TRUNCATED_SUFFIX
+
+
+def serialize_log(log: Dict[str, Any], max_length: int = 0) -> Dict[str, Any]:
+    """
+    Maps a ``LogBuilder.log`` to a JSON-friendly ``dict`` following
+    :data:`LOG_SCHEMA`: the user instance is replaced by its id, timestamps
+    are in ISO format and the payloads (:data:`TRUNCATED_FIELDS`) are
+    JSON-encoded strings, truncated if longer than ``max_length`` characters
+    (default: ``LOG_BODY_MAX_LENGTH`` setting).
+    Keys outside of the schema are appended as they are.
+    """
+    max_length = max_length or certego_apps_settings.LOG_BODY_MAX_LENGTH
+    log = dict(log)
+    user = log.pop("user", None)
+    log.setdefault("user_id", getattr(user, "pk", user))
+    log["requested_at"] = _isoformat(log.get("requested_at"))
+    for field in TRUNCATED_FIELDS:
+        log[field] = _truncate(log.get(field), max_length)
+    serialized = {field: log.pop(field, None) for field in LOG_SCHEMA}
+    serialized.update(log)
+    return serialized
+
+
+class JSONLogFormatter(logging.Formatter):
+    """
+    Formats each record as one JSON line:
+    ``timestamp``, ``level``, ``logger``, then either the fields of
+    :func:`serialize_log` (for ``LogBuilder`` records) or ``message``.
+    """
+
+    def __init__(self, *args, max_length: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_length = max_length
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "timestamp": _isoformat(record.created),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, dict) and not record.args:
+            payload.update(serialize_log(record.msg, max_length=self.max_length))
+        else:
+            payload["message"] = record.getMessage()
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return dumps(payload)
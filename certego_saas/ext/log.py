@@ -1,11 +1,13 @@
-import ast
 import ipaddress
 import logging
 import time
-from typing import Set, Union
+from typing import Optional, Set, Union
 
 from django_user_agents.utils import get_user_agent
 
+from .log_emitter import emit_log
+from .redaction import Redactor, get_redactor
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_SENSITIVE_FIELDS = {
@@ -31,6 +33,7 @@ class LogBuilder:
 
     logging_methods = "__all__"
     __sensitive_fields: Set[str] = set()
+    __redactor: Optional[Redactor] = None
 
     def __init__(self, request, response, view, exception=None):
         assert isinstance(
@@ -51,6 +54,19 @@ class LogBuilder:
         self.__sensitive_fields = DEFAULT_SENSITIVE_FIELDS | {
             field.lower() for field in value
         }
+        self.__redactor = None
+
+    @property
+    def redactor(self) -> Redactor:
+        """
+        :class:`certego_saas.ext.redaction.Redactor` compiled
+        for the current ``sensitive_fields``.
+        """
+        if self.__redactor is None:
+            self.__redactor = get_redactor(
+                self.sensitive_fields, substitute=self.CLEANED_SUBSTITUTE
+            )
+        return self.__redactor
 
     def build_log(self):
         if hasattr(self.response, "data"):
@@ -80,9 +96,12 @@ class LogBuilder:
     def handle_log(self):
         """
         Hook to define what happens with the log.
+
+        The record is emitted asynchronously if ``LOG_ASYNC_EMISSION`` is enabled
+        (see :mod:`certego_saas.ext.log_emitter`).
         """
         if self.should_log():
-            logger.log(logging.ERROR, self.log)
+            emit_log(logger, logging.ERROR, self.log)
 
     def should_log(self) -> bool:
         """
@@ -177,22 +196,9 @@ class LogBuilder:
 
         You can define your own sensitive fields in your view by defining a set
         eg: sensitive_fields = {'field1', 'field2'}
+
+        Nested payloads, and strings that look like a serialized
+        ``list``/``dict``, are cleaned as well
+        (see :class:`certego_saas.ext.redaction.Redactor`).
         """
-        if isinstance(data, bytes):
-            data = data.decode(errors="replace")
-
-        if isinstance(data, list):
-            return [self._clean_data(d) for d in data]
-        if isinstance(data, dict):
-            data = dict(data)
-
-            for key, value in data.items():
-                try:
-                    value = ast.literal_eval(value)
-                except (ValueError, SyntaxError):
-                    pass
-                if isinstance(value, (list, dict)):
-                    data[key] = self._clean_data(value)
-                if key.lower() in self.sensitive_fields:
-                    data[key] = self.CLEANED_SUBSTITUTE
-        return data
+        return self.redactor.clean(data)
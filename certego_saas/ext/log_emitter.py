@@ -0,0 +1,207 @@
+"""
+Asynchronous, queue-backed emission of log records.
+
+Records are created on the calling thread and handed over to a bounded
+in-process queue; a background thread passes them to the logger's handlers.
+Enable it with the ``LOG_ASYNC_EMISSION`` setting.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from typing import Dict, Optional
+
+from certego_saas.settings import certego_apps_settings
+
+__all__ = [
+    "AsyncLogEmitter",
+    "emit_log",
+    "get_emitter",
+]
+
+
+class AsyncLogEmitter:
+    """
+    Bounded queue + background writer thread.
+
+    Overflow policies (applied when the queue is full):
+
+    - ``drop_oldest``: discard the oldest queued record to make room.
+    - ``block``: wait up to ``block_timeout`` seconds, then drop the new record.
+    - ``sample``: once the queue is half full, only 1 out of every
+      ``1 / sample_rate`` records is admitted; records are dropped when full.
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    BLOCK = "block"
+    SAMPLE = "sample"
+    POLICIES = (DROP_OLDEST, BLOCK, SAMPLE)
+
+    _SENTINEL = object()
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        policy: str = DROP_OLDEST,
+        block_timeout: float = 1.0,
+        sample_rate: float = 0.1,
+    ):
+        if policy not in self.POLICIES:
+            raise ValueError(
+                f"Invalid overflow policy '{policy}', choose one of {self.POLICIES}."
+            )
+        if not 0 < sample_rate <= 1:
+            raise ValueError("sample_rate must be in the range (0, 1].")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.sample_every = max(1, round(1 / sample_rate))
+        self._lock = threading.Lock()
+        self._counters = {"queued": 0, "dropped": 0, "emitted": 0}
+        self._sampled = 0
+        self._pid: Optional[int] = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+
+    # public
+
+    def emit(self, logger: logging.Logger, level: int, msg, *args) -> bool:
+        """
+        Enqueue a record for ``logger``.
+        Returns ``False`` if the record was dropped.
+        """
+        if not logger.isEnabledFor(level):
+            return False
+        self._ensure_started()
+        record = logger.makeRecord(
+            logger.name, level, "(unknown file)", 0, msg, args, None
+        )
+        return self._put((logger, record))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counters of ``queued``, ``dropped`` and ``emitted`` records
+        plus the current queue ``size``.
+        """
+        with self._lock:
+            return {**self._counters, "size": self._queue.qsize()}
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        Flush the queue and stop the writer thread.
+        Registered with :mod:`atexit` so that the tail of the queue
+        is written when a worker exits.
+        """
+        thread = self._thread
+        if thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(self._SENTINEL)
+        thread.join(timeout)
+        self._thread = None
+
+    # internals
+
+    def _incr(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _ensure_started(self) -> None:
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid:
+                return
+            if self._pid is not None and self._pid != pid:
+                # forked: the parent's queue and thread are not usable here
+                self._queue = queue.Queue(maxsize=self.maxsize)
+                self._counters = dict.fromkeys(self._counters, 0)
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._run, name="certego_saas-log-emitter", daemon=True
+            )
+            self._thread.start()
+
+    def _put(self, item) -> bool:
+        if self.policy == self.SAMPLE and self._queue.qsize() >= self.maxsize // 2:
+            with self._lock:
+                self._sampled += 1
+                admit = (self._sampled - 1) % self.sample_every == 0
+            if not admit:
+                self._incr("dropped")
+                return False
+
+        if self.policy == self.BLOCK:
+            try:
+                self._queue.put(item, timeout=self.block_timeout)
+            except queue.Full:
+                self._incr("dropped")
+                return False
+            self._incr("queued")
+            return True
+
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                break
+            except queue.Full:
+                if self.policy != self.DROP_OLDEST:
+                    self._incr("dropped")
+                    return False
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._incr("dropped")
+            except queue.Empty:
+                pass
+        self._incr("queued")
+        return True
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._SENTINEL:
+                    return
+                logger, record = item
+                logger.handle(record)
+                self._incr("emitted")
+            except Exception:  # pragma: no cover
+                pass
+            finally:
+                self._queue.task_done()
+
+
+_emitter: Optional[AsyncLogEmitter] = None
+_emitter_lock = threading.Lock()
+
+
+def get_emitter() -> AsyncLogEmitter:
+    """
+    Returns the process-wide :class:`AsyncLogEmitter`,
+    configured from the ``LOG_QUEUE_*`` settings.
+    """
+    global _emitter
+    if _emitter is None:
+        with _emitter_lock:
+            if _emitter is None:
+                _emitter = AsyncLogEmitter(
+                    maxsize=certego_apps_settings.LOG_QUEUE_SIZE,
+                    policy=certego_apps_settings.LOG_QUEUE_OVERFLOW_POLICY,
+                    block_timeout=certego_apps_settings.LOG_QUEUE_BLOCK_TIMEOUT,
+                    sample_rate=certego_apps_settings.LOG_QUEUE_SAMPLE_RATE,
+                )
+                atexit.register(_emitter.stop)
+    return _emitter
+
+
+def emit_log(logger: logging.Logger, level: int, msg, *args) -> None:
+    """
+    ``logger.log(level, msg, *args)``, through the
+    :class:`AsyncLogEmitter` if ``LOG_ASYNC_EMISSION`` is enabled.
+    """
+    if certego_apps_settings.LOG_ASYNC_EMISSION:
+        get_emitter().emit(logger, level, msg, *args)
+    else:
+        logger.log(level, msg, *args)
@@ -0,0 +1,231 @@
+"""
+Sampling and rate limiting of exception logging.
+
+Used by :func:`certego_saas.ext.exceptions.custom_exception_handler`
+to decide, before any :class:`certego_saas.ext.log.LogBuilder` work is done,
+whether an exception should be logged.
+
+Policies are configured with the ``LOG_SAMPLING_POLICIES`` setting, a ``dict``
+whose keys are either a view (``module.ClassName``), an exception class name
+or ``"default"`` and whose values can contain:
+
+- ``sample_rate``: fraction of the errors that are considered (default ``1``,
+  ``0`` drops them all).
+- ``rate``: tokens refilled per second in the token bucket (default: no limit).
+- ``burst``: size of the token bucket (default ``1``).
+
+Example::
+
+    "LOG_SAMPLING_POLICIES": {
+        "default": {"rate": 1, "burst": 10},
+        "APIConnectionError": {"sample_rate": 0.1, "rate": 0.2, "burst": 5},
+    }
+
+Suppressed errors are counted per (view, exception class) and a
+"suppressed N similar errors" summary is logged every
+``LOG_SUPPRESSED_SUMMARY_INTERVAL`` seconds, by a background thread
+(:meth:`LogPolicy.start`), even if no more errors are logged.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from certego_saas.settings import certego_apps_settings
+
+from .log_emitter import emit_log
+
+__all__ = [
+    "LogPolicy",
+    "get_log_policy",
+]
+
+logger = logging.getLogger(__name__)
+
+_Key = Tuple[Optional[str], str]
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at", "seen", "suppressed")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated_at = now
+        self.seen = 0
+        self.suppressed = 0
+
+
+class LogPolicy:
+    """
+    Per-view/per-exception-class sampling + token bucket.
+    """
+
+    def __init__(
+        self,
+        policies: Dict[str, Dict],
+        summary_interval: float = 60,
+        clock=time.monotonic,
+    ):
+        self.policies = policies
+        self.summary_interval = summary_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets: Dict[_Key, _Bucket] = {}
+        self._last_flush = clock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # the process that started ``_thread``: a forked child needs its own
+        self._pid: Optional[int] = None
+
+    @staticmethod
+    def get_view_name(view) -> Optional[str]:
+        if view is None:
+            return None
+        return view.__module__ + "." + view.__class__.__name__
+
+    def get_policy(self, exc, view_name: Optional[str]) -> Optional[Dict]:
+        """
+        Policy for the view, then for the first exception class
+        found in the MRO, then the ``default`` one.
+        """
+        if view_name in self.policies:
+            return self.policies[view_name]
+        for klass in exc.__class__.__mro__:
+            if klass.__name__ in self.policies:
+                return self.policies[klass.__name__]
+        return self.policies.get("default", None)
+
+    def allow(self, exc, view=None) -> bool:
+        """
+        Returns ``True`` if a log record should be built for ``exc``.
+        """
+        if not self.policies:
+            return True
+        view_name = self.get_view_name(view)
+        policy = self.get_policy(exc, view_name)
+        now = self.clock()
+        allowed = True
+        if policy is not None:
+            key = (view_name, exc.__class__.__name__)
+            with self._lock:
+                allowed = self._consume(key, policy, now)
+        self.flush(now=now)
+        return allowed
+
+    def _consume(self, key: _Key, policy: Dict, now: float) -> bool:
+        burst = policy.get("burst", 1)
+        bucket = self._buckets.get(key, None)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(burst, now)
+
+        bucket.seen += 1
+        sample_rate = policy.get("sample_rate", 1)
+        if sample_rate <= 0:
+            bucket.suppressed += 1
+            return False
+        sample_every = max(1, round(1 / sample_rate))
+        if (bucket.seen - 1) % sample_every:
+            bucket.suppressed += 1
+            return False
+
+        rate = policy.get("rate", None)
+        if rate is None:
+            return True
+        bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated_at) * rate)
+        bucket.updated_at = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True
+        bucket.suppressed += 1
+        return False
+
+    def flush(self, now: Optional[float] = None, force: bool = False) -> None:
+        """
+        Log a summary for every key with suppressed errors,
+        at most once every ``summary_interval`` seconds unless ``force``.
+        """
+        now = self.clock() if now is None else now
+        if not force and now - self._last_flush < self.summary_interval:
+            return
+        with self._lock:
+            elapsed = now - self._last_flush
+            self._last_flush = now
+            suppressed = []
+            for key, bucket in self._buckets.items():
+                if bucket.suppressed:
+                    suppressed.append((key, bucket.suppressed))
+                    bucket.suppressed = 0
+        for (view_name, exc_class), count in suppressed:
+            emit_log(
+                logger,
+                logging.WARNING,
+                "suppressed %d similar errors (exception: %s, view: %s) in the last %ds",
+                count,
+                exc_class,
+                view_name,
+                elapsed,
+            )
+
+    # background flush
+
+    def start(self) -> None:
+        """
+        Flushes the summaries from a daemon thread every
+        ``summary_interval`` seconds, so the last ones aren't held
+        until the next error (or the process exit).
+        Safe to call again, e.g. after a fork.
+        """
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="log-policy-flush", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the flush thread and flushes the pending summaries.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush(force=True)
+
+    def _run(self) -> None:
+        while True:
+            # until the next flush is due, wherever the last one came from
+            remaining = self.summary_interval - (self.clock() - self._last_flush)
+            if self._stopped.wait(max(remaining, 0.01)):
+                return
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover
+                logger.exception("failed flushing the suppressed errors summaries")
+
+
+_log_policy: Optional[LogPolicy] = None
+_log_policy_lock = threading.Lock()
+
+
+def get_log_policy() -> LogPolicy:
+    """
+    Returns the process-wide :class:`LogPolicy` built from settings,
+    with its flush thread running in this process if there are policies.
+    """
+    global _log_policy
+    if _log_policy is None:
+        with _log_policy_lock:
+            if _log_policy is None:
+                _log_policy = LogPolicy(
+                    certego_apps_settings.LOG_SAMPLING_POLICIES,
+                    summary_interval=certego_apps_settings.LOG_SUPPRESSED_SUMMARY_INTERVAL,
+                )
+                atexit.register(_log_policy.stop)
+    if _log_policy.policies:
+        _log_policy.start()
+    return _log_policy
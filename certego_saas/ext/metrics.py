@@ -0,0 +1,229 @@
+"""
+In-process instrumentation of the throttling decisions.
+
+- :data:`throttle_decision` signal, sent for every decision
+  (only if there are receivers).
+- :data:`throttle_metrics`: allowed/denied counters and latency histograms
+  per scope, plus the top-N keys tracked with a space-bounded
+  heavy-hitters sketch (:class:`SpaceSaving`).
+
+Each process periodically publishes its snapshot to the default cache;
+use the ``throttle_metrics`` management command to dump the merged snapshot.
+"""
+import bisect
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache as default_cache
+from django.dispatch import Signal
+
+from certego_saas.settings import certego_apps_settings
+
+__all__ = [
+    "LatencyHistogram",
+    "SpaceSaving",
+    "ThrottleMetrics",
+    "throttle_decision",
+    "throttle_metrics",
+]
+
+logger = logging.getLogger(__name__)
+
+# kwargs: scope, key, allowed, latency (seconds)
+throttle_decision = Signal()
+
+
+class SpaceSaving:
+    """
+    `Space-Saving <https://www.cs.ucsb.edu/sites/default/files/documents/2005-23.pdf>`__
+    heavy-hitters sketch: tracks at most ``capacity`` keys,
+    every key with a frequency above ``total / capacity`` is guaranteed to be in it.
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.total = 0
+        # key -> [count, overestimation]
+        self._counters: Dict[str, List[int]] = {}
+
+    def add(self, key: str, count: int = 1) -> None:
+        self.total += count
+        counter = self._counters.get(key, None)
+        if counter is not None:
+            counter[0] += count
+            return
+        if len(self._counters) < self.capacity:
+            self._counters[key] = [count, 0]
+            return
+        evicted = min(self._counters, key=lambda k: self._counters[k][0])
+        min_count = self._counters.pop(evicted)[0]
+        self._counters[key] = [min_count + count, min_count]
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """
+        ``(key, count, overestimation)`` tuples, most frequent first.
+        """
+        items = sorted(
+            ((key, c[0], c[1]) for key, c in self._counters.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return items[:n] if n else items
+
+    @classmethod
+    def merge(
+        cls, tops: Iterable[List[Tuple[str, int, int]]], capacity: int
+    ) -> "SpaceSaving":
+        merged = cls(capacity)
+        for top in tops:
+            for key, count, error in top:
+                merged.add(key, count)
+                merged._counters[key][1] += error
+        return merged
+
+
+class LatencyHistogram:
+    """
+    Fixed buckets histogram of latencies, in milliseconds.
+    """
+
+    BOUNDS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, milliseconds: float) -> None:
+        self.buckets[bisect.bisect_left(self.BOUNDS, milliseconds)] += 1
+        self.count += 1
+        self.sum += milliseconds
+
+    def to_dict(self) -> Dict:
+        labels = [f"le_{bound}" for bound in self.BOUNDS] + ["le_inf"]
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum, 3),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class ThrottleMetrics:
+    """
+    Thread-safe, in-process throttling metrics.
+    """
+
+    CACHE_KEY = "throttle.metrics.%s"
+    CACHE_INDEX_KEY = "throttle.metrics.index"
+
+    def __init__(
+        self, top_keys: int = 100, publish_interval: float = 60, cache=default_cache
+    ):
+        self.top_keys = top_keys
+        self.publish_interval = publish_interval
+        self.cache = cache
+        self.process_id = f"{socket.gethostname()}.{os.getpid()}"
+        self._lock = threading.Lock()
+        self._last_publish = time.monotonic()
+        self.reset()
+
+    def reset(self) -> None:
+        self.started_at = time.time()
+        self.decisions: Dict[str, Dict[str, int]] = {}
+        self.latencies: Dict[str, LatencyHistogram] = {}
+        self.hot_keys = SpaceSaving(self.top_keys)
+
+    def record(self, scope: str, key: Optional[str], allowed: bool, latency: float):
+        """
+        Record a decision; ``latency`` is in seconds.
+        """
+        with self._lock:
+            decisions = self.decisions.setdefault(scope, {"allowed": 0, "denied": 0})
+            decisions["allowed" if allowed else "denied"] += 1
+            histogram = self.latencies.get(scope, None)
+            if histogram is None:
+                histogram = self.latencies[scope] = LatencyHistogram()
+            histogram.observe(latency * 1000)
+            if key is not None:
+                self.hot_keys.add(key)
+        if throttle_decision.receivers:
+            throttle_decision.send(
+                sender=self.__class__,
+                scope=scope,
+                key=key,
+                allowed=allowed,
+                latency=latency,
+            )
+        if time.monotonic() - self._last_publish >= self.publish_interval:
+            self.publish()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "process": self.process_id,
+                "started_at": self.started_at,
+                "decisions": {
+                    scope: dict(counts) for scope, counts in self.decisions.items()
+                },
+                "latencies": {
+                    scope: histogram.to_dict()
+                    for scope, histogram in self.latencies.items()
+                },
+                "hot_keys": self.hot_keys.top(),
+            }
+
+    def publish(self) -> None:
+        """
+        Store the snapshot of this process in the cache.
+        """
+        self._last_publish = time.monotonic()
+        timeout = self.publish_interval * 10
+        key = self.CACHE_KEY % self.process_id
+        try:
+            self.cache.set(key, self.snapshot(), timeout)
+            index = self.cache.get(self.CACHE_INDEX_KEY, None) or []
+            if key not in index:
+                self.cache.set(self.CACHE_INDEX_KEY, index + [key], timeout)
+        except Exception as e:
+            logger.warning(f"Failed to publish throttle metrics: {e}")
+
+    def collect(self, top: int = 0) -> Dict:
+        """
+        Merge the snapshots published by all the processes.
+        """
+        index = self.cache.get(self.CACHE_INDEX_KEY, None) or []
+        snapshots = [s for s in self.cache.get_many(index).values() if s]
+        decisions: Dict[str, Dict[str, int]] = {}
+        latencies: Dict[str, Dict] = {}
+        for snapshot in snapshots:
+            for scope, counts in snapshot["decisions"].items():
+                merged = decisions.setdefault(scope, {"allowed": 0, "denied": 0})
+                for decision, count in counts.items():
+                    merged[decision] += count
+            for scope, histogram in snapshot["latencies"].items():
+                merged = latencies.setdefault(
+                    scope, {"count": 0, "sum_ms": 0, "buckets": {}}
+                )
+                merged["count"] += histogram["count"]
+                merged["sum_ms"] += histogram["sum_ms"]
+                for bucket, count in histogram["buckets"].items():
+                    merged["buckets"][bucket] = merged["buckets"].get(bucket, 0) + count
+        hot_keys = SpaceSaving.merge(
+            (snapshot["hot_keys"] for snapshot in snapshots), self.top_keys
+        )
+        return {
+            "processes": [snapshot["process"] for snapshot in snapshots],
+            "decisions": decisions,
+            "latencies": latencies,
+            "hot_keys": hot_keys.top(top or None),
+        }
+
+
+throttle_metrics = ThrottleMetrics(
+    top_keys=certego_apps_settings.THROTTLE_METRICS_TOP_KEYS,
+    publish_interval=certego_apps_settings.THROTTLE_METRICS_PUBLISH_INTERVAL,
+)
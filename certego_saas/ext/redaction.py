@@ -0,0 +1,161 @@
+"""
+Redaction of sensitive data before logging.
+
+A :class:`Redactor` is compiled once for a given set of sensitive fields
+and can then be reused to clean any number of payloads.
+"""
+import ast
+from functools import lru_cache
+from typing import Any, FrozenSet, Iterable
+
+__all__ = [
+    "Redactor",
+    "get_redactor",
+]
+
+# returned by Redactor._parse_literal for literals too long to be parsed
+_OVERSIZED = object()
+
+
+class Redactor:
+    """
+    Replaces the value of every sensitive key found in a payload
+    (``dict``/``list`` of any depth) with ``substitute``.
+
+    - sensitive keys are normalised (lower-cased) once at construction.
+    - traversal is iterative, bounded by ``max_depth`` and ``max_nodes``.
+      Containers beyond these budgets are replaced by ``truncated``
+      so that nothing is leaked.
+    - string values are parsed with :func:`ast.literal_eval` only if they
+      look like a serialized ``list`` or ``dict``. Those longer than
+      ``max_literal_length`` are not parsed but replaced by ``truncated``.
+    """
+
+    DEFAULT_SUBSTITUTE = "********"
+    DEFAULT_TRUNCATED = "<truncated>"
+    DEFAULT_MAX_DEPTH = 32
+    DEFAULT_MAX_NODES = 100_000
+    DEFAULT_MAX_LITERAL_LENGTH = 64 * 1024
+
+    __slots__ = (
+        "sensitive_fields",
+        "substitute",
+        "truncated",
+        "max_depth",
+        "max_nodes",
+        "max_literal_length",
+    )
+
+    def __init__(
+        self,
+        sensitive_fields: Iterable[str],
+        substitute: str = DEFAULT_SUBSTITUTE,
+        truncated: str = DEFAULT_TRUNCATED,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        max_nodes: int = DEFAULT_MAX_NODES,
+        max_literal_length: int = DEFAULT_MAX_LITERAL_LENGTH,
+    ):
+        self.sensitive_fields: FrozenSet[str] = frozenset(
+            field.lower() for field in sensitive_fields
+        )
+        self.substitute = substitute
+        self.truncated = truncated
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.max_literal_length = max_literal_length
+
+    def is_sensitive(self, key) -> bool:
+        return isinstance(key, str) and key.lower() in self.sensitive_fields
+
+    def _parse_literal(self, value):
+        """
+        Returns the parsed container if ``value`` is a serialized
+        ``list``/``dict``, ``_OVERSIZED`` if it looks like one
+        but is too long to be parsed, otherwise ``None``.
+        """
+        if isinstance(value, bytes):
+            value = value.decode(errors="replace")
+        if not isinstance(value, str):
+            return None
+        stripped = value.strip()
+        if len(stripped) < 2 or (stripped[0], stripped[-1]) not in (
+            ("[", "]"),
+            ("{", "}"),
+        ):
+            return None
+        if len(stripped) > self.max_literal_length:
+            return _OVERSIZED
+        try:
+            parsed = ast.literal_eval(stripped)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            return None
+        return parsed if isinstance(parsed, (list, dict)) else None
+
+    def clean(self, data: Any) -> Any:
+        """
+        Returns a cleaned copy of ``data``. The input is never modified.
+        """
+        if isinstance(data, bytes):
+            data = data.decode(errors="replace")
+        if not isinstance(data, (list, dict)):
+            return data
+
+        root = dict(data) if isinstance(data, dict) else list(data)
+        nodes = 1
+        # each entry: (container copy, depth of the container)
+        stack = [(root, 0)]
+        while stack:
+            container, depth = stack.pop()
+            if isinstance(container, dict):
+                items = container.items()
+                from_dict = True
+            else:
+                items = enumerate(container)
+                from_dict = False
+            for key, value in list(items):
+                if from_dict:
+                    if self.is_sensitive(key):
+                        container[key] = self.substitute
+                        continue
+                    if not isinstance(value, (list, dict)):
+                        parsed = self._parse_literal(value)
+                        if parsed is None:
+                            continue
+                        if parsed is _OVERSIZED:
+                            container[key] = self.truncated
+                            continue
+                        value = parsed
+                elif isinstance(value, bytes):
+                    container[key] = value.decode(errors="replace")
+                    continue
+                elif not isinstance(value, (list, dict)):
+                    continue
+
+                nodes += 1
+                if depth + 1 > self.max_depth or nodes > self.max_nodes:
+                    container[key] = self.truncated
+                    continue
+                child = dict(value) if isinstance(value, dict) else list(value)
+                container[key] = child
+                stack.append((child, depth + 1))
+        return root
+
+
+@lru_cache(maxsize=32)
+def _compile(
+    sensitive_fields: FrozenSet[str], substitute: str, truncated: str
+) -> Redactor:
+    return Redactor(sensitive_fields, substitute=substitute, truncated=truncated)
+
+
+def get_redactor(
+    sensitive_fields: Iterable[str],
+    substitute: str = Redactor.DEFAULT_SUBSTITUTE,
+    truncated: str = Redactor.DEFAULT_TRUNCATED,
+) -> Redactor:
+    """
+    Returns the (cached) :class:`Redactor` compiled for ``sensitive_fields``.
+    """
+    return _compile(
+        frozenset(field.lower() for field in sensitive_fields), substitute, truncated
+    )
@@ -0,0 +1,188 @@
+import json
+import re
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+__all__ = [
+    "FakeStripeServer",
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep-alive
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def setup(self):
+        super().setup()
+        # headers and body are written separately: don't wait for the ack
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.fake.lock:
+            self.server.fake.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Request-Id", f"req_{uuid.uuid4().hex[:14]}")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self, method: str):
+        fake = self.server.fake
+        url = urlsplit(self.path)
+        if method == "POST":
+            length = int(self.headers.get("Content-Length", 0))
+            params = parse_qs(self.rfile.read(length).decode())
+        else:
+            params = parse_qs(url.query)
+        with fake.lock:
+            fake.requests += 1
+        if fake.latency:
+            time.sleep(fake.latency)
+        if fake.status != 200:
+            self._send(
+                fake.status, {"error": {"type": "api_error", "message": "fake error"}}
+            )
+            return
+        status, body = fake.route(method, url.path, params)
+        self._send(status, body)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeStripeServer"
+
+
+class FakeStripeServer:
+    """
+    Local stand-in of the stripe API, for tests and offline benchmarks.
+
+    Serves the objects registered with :meth:`add` (retrieve and list,
+    ``expand`` is ignored: objects are returned as registered) and
+    creates checkout/billing portal sessions and customers.
+    ``latency`` (seconds) is added to every response, ``status``
+    forces an error status code. ``requests`` and ``connections``
+    count the received requests and the opened connections.
+
+    Usage::
+
+        with FakeStripeServer(latency=0.01) as server:
+            stripe.api_base = server.url
+            ...
+    """
+
+    RESOURCES = {
+        "customers": "customer",
+        "subscriptions": "subscription",
+        "invoices": "invoice",
+        "prices": "price",
+        "products": "product",
+    }
+
+    def __init__(self, latency: float = 0, status: int = 200):
+        self.latency = latency
+        self.status = status
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.objects: Dict[str, Dict[str, Dict]] = {
+            obj: {} for obj in self.RESOURCES.values()
+        }
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]  # type: ignore
+        return f"http://{host}:{port}"
+
+    def add(self, obj: Dict) -> Dict:
+        self.objects[obj["object"]][obj["id"]] = obj
+        return obj
+
+    def route(self, method: str, path: str, params: Dict):
+        if method == "POST" and path in (
+            "/v1/checkout/sessions",
+            "/v1/billing_portal/sessions",
+        ):
+            obj = "checkout.session" if "checkout" in path else "billing_portal.session"
+            session_id = f"cs_{uuid.uuid4().hex[:24]}"
+            return 200, {
+                "id": session_id,
+                "object": obj,
+                "url": f"https://checkout.stripe.com/pay/{session_id}",
+            }
+        if method == "POST" and path == "/v1/customers":
+            return 200, self.add(
+                {
+                    "id": f"cus_{uuid.uuid4().hex[:14]}",
+                    "object": "customer",
+                    "email": params.get("email", [None])[0],
+                }
+            )
+        match = re.fullmatch(r"/v1/(\w+)(?:/(\w+))?", path)
+        if not match or match.group(1) not in self.RESOURCES:
+            return 404, {"error": {"type": "invalid_request_error"}}
+        objects = self.objects[self.RESOURCES[match.group(1)]]
+        object_id = match.group(2)
+        if object_id:
+            if object_id not in objects:
+                return 404, {
+                    "error": {
+                        "type": "invalid_request_error",
+                        "code": "resource_missing",
+                        "message": f"No such object: '{object_id}'",
+                    }
+                }
+            if method == "DELETE":
+                objects.pop(object_id)
+                return 200, {"id": object_id, "deleted": True}
+            return 200, objects[object_id]
+        data = list(objects.values())
+        subscription = params.get("subscription", [None])[0]
+        if subscription:
+            data = [o for o in data if o.get("subscription") == subscription]
+        return 200, {"object": "list", "url": path, "has_more": False, "data": data}
+
+    def start(self) -> "FakeStripeServer":
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="fake-stripe",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeStripeServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,100 @@
+import multiprocessing
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+__all__ = [
+    "SharedMemoryCache",
+]
+
+
+class SharedMemoryCache(BaseCache):
+    """
+    Cache backend shared between forked processes, for tests only.
+
+    A local stand-in for Redis/Memcached: data lives in a
+    :class:`multiprocessing.Manager` dict and every operation is
+    serialized by a process-shared lock, so ``add`` and ``incr``
+    are atomic across processes.
+
+    Call :meth:`shutdown` when done to stop the manager process.
+    """
+
+    def __init__(self, location: str = "", params=None):
+        super().__init__(params or {})
+        ctx = multiprocessing.get_context("fork")
+        self._manager = ctx.Manager()
+        self._data = self._manager.dict()
+        self._lock = ctx.RLock()
+
+    def _make_key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _get_alive(self, key, default=None):
+        item = self._data.get(key, None)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            return default
+        return value
+
+    def _set(self, key, value, timeout):
+        self._data[key] = (self.get_backend_timeout(timeout), value)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._make_key(key, version)
+        with self._lock:
+            if self._get_alive(key, self) is not self:
+                return False
+            self._set(key, value, timeout)
+            return True
+
+    def get(self, key, default=None, version=None):
+        key = self._make_key(key, version)
+        with self._lock:
+            return self._get_alive(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._make_key(key, version)
+        with self._lock:
+            self._set(key, value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._make_key(key, version)
+        with self._lock:
+            value = self._get_alive(key, self)
+            if value is self:
+                return False
+            self._set(key, value, timeout)
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._make_key(key, version)
+        with self._lock:
+            value = self._get_alive(key, self)
+            if value is self:
+                raise ValueError(f"Key '{key}' not found")
+            expires_at, _ = self._data[key]
+            self._data[key] = (expires_at, value + delta)
+            return value + delta
+
+    def delete(self, key, version=None):
+        key = self._make_key(key, version)
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def has_key(self, key, version=None):
+        key = self._make_key(key, version)
+        with self._lock:
+            return self._get_alive(key, self) is not self
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def shutdown(self):
+        self._manager.shutdown()
@@ -1,11 +1,233 @@
 """
 `DRF throttling <https://www.django-rest-framework.org/api-guide/throttling/>`__
+
+The algorithm used by the throttles is selected with the ``THROTTLE_ENGINE``
+setting (or the ``engine`` class attribute):
+
+- ``"history"``: DRF's default, a list of timestamps per key.
+- ``"gcra"``: :class:`GCRAThrottleEngine`, a single timestamp per key.
+- ``"atomic"``: :class:`AtomicThrottleEngine`, safe across processes
+  and a single cache round trip per check.
+
+The rate of each scope is resolved for every user, the most specific first
+(see :func:`get_user_throttle_rates`):
+
+1. ``ORGANIZATION_THROTTLE_RATES`` setting: ``{organization name: {scope: rate}}``.
+2. metadata ``throttle_<scope>`` of the user's subscribed stripe product.
+3. ``THROTTLE_RATES`` setting: ``{scope: rate}``.
+4. the throttle's ``default_rate``.
+5. DRF's ``DEFAULT_THROTTLE_RATES`` setting.
 """
-from typing import List, Union
+import hashlib
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Tuple, Union
 
+from django.apps import apps
 from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework.throttling import UserRateThrottle
 
+from certego_saas.settings import certego_apps_settings
+
+from .metrics import throttle_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ThrottleEngine:
+    """
+    Decides whether a request identified by a cache ``key``
+    is allowed by a rate of ``num_requests`` per ``duration`` seconds.
+    """
+
+    key_suffix = ""
+
+    def allow(
+        self, cache, key: str, num_requests: int, duration: int, now: float
+    ) -> Tuple[bool, Optional[float]]:
+        """
+        Returns whether the request is allowed and,
+        if not, the seconds to wait before the next one.
+        """
+        raise NotImplementedError()
+
+
+class GCRAThrottleEngine(ThrottleEngine):
+    """
+    `Generic Cell Rate Algorithm <https://en.wikipedia.org/wiki/Generic_cell_rate_algorithm>`__.
+
+    Stores only the theoretical arrival time (TAT) for each key, so both the
+    memory and the time spent per request are O(1) regardless of the rate.
+    Allows bursts of up to ``num_requests`` requests, then one request
+    every ``duration / num_requests`` seconds.
+    """
+
+    key_suffix = ".gcra"
+
+    def allow(
+        self, cache, key: str, num_requests: int, duration: int, now: float
+    ) -> Tuple[bool, Optional[float]]:
+        key += self.key_suffix
+        interval = duration / num_requests
+        tat = cache.get(key, None)
+        new_tat = max(tat or now, now) + interval
+        if new_tat - now > duration:
+            return False, new_tat - now - duration
+        cache.set(key, new_tat, math.ceil(new_tat - now))
+        return True, None
+
+
+class AtomicThrottleEngine(ThrottleEngine):
+    """
+    Throttle engine relying only on atomic cache primitives,
+    so that concurrent workers can't over-admit requests.
+
+    - Redis (django's ``RedisCache`` or ``django-redis``): GCRA executed
+      server side by a Lua script.
+    - any other backend: fixed window counter, ``incr`` + ``add`` with TTL.
+      Correct across processes if the backend's ``incr`` is atomic
+      (e.g. Memcached; not the file based cache).
+
+    In both cases the common path is a single cache round trip.
+    """
+
+    key_suffix = ".atomic"
+
+    LUA_GCRA = """
+local tat = tonumber(redis.call("GET", KEYS[1]))
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local duration = tonumber(ARGV[3])
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+if new_tat - now > duration then
+    return {0, tostring(new_tat - now - duration)}
+end
+redis.call("SET", KEYS[1], tostring(new_tat), "PX", math.ceil((new_tat - now) * 1000))
+return {1, "0"}
+"""
+
+    # scripts are cached by redis, by SHA1
+    LUA_GCRA_SHA = hashlib.sha1(LUA_GCRA.encode()).hexdigest()
+
+    @staticmethod
+    def get_redis_client(cache):
+        # django >= 4.0 RedisCache
+        client = getattr(cache, "_cache", None)
+        if client is not None and hasattr(client, "get_client"):
+            return client.get_client(write=True)
+        # django-redis
+        client = getattr(cache, "client", None)
+        if client is not None and hasattr(client, "get_client"):
+            return client.get_client(write=True)
+        return None
+
+    def _allow_lua(
+        self, client, cache, key: str, num_requests: int, duration: int, now: float
+    ) -> Tuple[bool, Optional[float]]:
+        from redis.exceptions import NoScriptError
+
+        args = [cache.make_key(key), repr(now), repr(duration / num_requests), duration]
+        try:
+            allowed, wait = client.evalsha(self.LUA_GCRA_SHA, 1, *args)
+        except NoScriptError:
+            # first call on this redis server (or script cache flushed)
+            allowed, wait = client.eval(self.LUA_GCRA, 1, *args)
+        if int(allowed):
+            return True, None
+        return False, float(wait)
+
+    def _allow_counter(
+        self, cache, key: str, num_requests: int, duration: int, now: float
+    ) -> Tuple[bool, Optional[float]]:
+        window = int(now // duration)
+        key = f"{key}.{window}"
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # first request of the window
+            if cache.add(key, 1, duration):
+                count = 1
+            else:
+                count = cache.incr(key)
+        if count <= num_requests:
+            return True, None
+        return False, (window + 1) * duration - now
+
+    def allow(
+        self, cache, key: str, num_requests: int, duration: int, now: float
+    ) -> Tuple[bool, Optional[float]]:
+        key += self.key_suffix
+        client = self.get_redis_client(cache)
+        if client is not None:
+            return self._allow_lua(client, cache, key, num_requests, duration, now)
+        return self._allow_counter(cache, key, num_requests, duration, now)
+
+
+PRODUCT_THROTTLE_RATE_PREFIX = "throttle_"
+USER_THROTTLE_RATES_CACHE_KEY = "throttle.rates.userId_%s"
+
+
+def _get_product_throttle_rates(user) -> Dict[str, str]:
+    if not apps.is_installed("certego_saas.apps.payments") or not user.has_customer():
+        return {}
+    from certego_saas.apps.payments.exceptions import CustomerWithoutSubscription
+
+    try:
+        metadata = user.customer.currentapp_subscription.subscribed_product().metadata
+    except CustomerWithoutSubscription:
+        return {}
+    return {
+        key[len(PRODUCT_THROTTLE_RATE_PREFIX) :]: value
+        for key, value in metadata.items()
+        if key.startswith(PRODUCT_THROTTLE_RATE_PREFIX)
+    }
+
+
+def get_user_throttle_rates(user) -> Dict[str, str]:
+    """
+    Returns the ``{scope: rate}`` mapping specific to ``user``:
+    stripe product metadata, overridden by the organization's rates.
+
+    The result is cached for ``THROTTLE_RATES_CACHE_TIMEOUT`` seconds
+    so that throttling doesn't trigger stripe or DB lookups on every request.
+    """
+    if not user or not user.is_authenticated:
+        return {}
+    cache_key = USER_THROTTLE_RATES_CACHE_KEY % user.pk
+    rates = default_cache.get(cache_key, None)
+    if rates is not None:
+        return rates
+
+    rates = {}
+    try:
+        rates.update(_get_product_throttle_rates(user))
+    except Exception as e:
+        # never fail a request because of stripe
+        logger.warning(f"Failed to retrieve product throttle rates: {e}")
+    if user.has_membership():
+        rates.update(
+            certego_apps_settings.ORGANIZATION_THROTTLE_RATES.get(
+                user.membership.organization.name, {}
+            )
+        )
+    default_cache.set(
+        cache_key, rates, certego_apps_settings.THROTTLE_RATES_CACHE_TIMEOUT
+    )
+    return rates
+
+
+THROTTLE_ENGINES: Dict[str, Optional[ThrottleEngine]] = {
+    "history": None,
+    "gcra": GCRAThrottleEngine(),
+    "atomic": AtomicThrottleEngine(),
+}
+
 
 class _CustomUserRateThrottle(UserRateThrottle):
     """
@@ -13,10 +235,43 @@ class _CustomUserRateThrottle(UserRateThrottle):
     - perform scoped throttling on per view-action combination basis.
     - disable throttling if running in internal deployment.
     - disable throttling if request method does not match.
+    - use the throttle engine set in ``engine`` or in the ``THROTTLE_ENGINE`` setting.
+    - resolve the rate per scope, subscription product and organization.
+    - record each decision in :data:`certego_saas.ext.metrics.throttle_metrics`.
     """
 
     cache_format = "throttle.userId_%(ident)s.%(scope)s"
     throttle_methods: Union[List[str], str] = "__all__"
+    engine: Optional[str] = None
+    default_rate: Optional[str] = None
+
+    def get_rate(self):
+        rate = certego_apps_settings.THROTTLE_RATES.get(self.scope, self.default_rate)
+        if rate is None:
+            return super().get_rate()
+        return rate
+
+    def get_request_rate(self, request) -> Optional[str]:
+        """
+        Rate for the user of ``request``; user rates are resolved
+        once per request and shared by all the throttles.
+        """
+        try:
+            rates = request._certego_throttle_rates
+        except AttributeError:
+            rates = get_user_throttle_rates(getattr(request, "user", None))
+            request._certego_throttle_rates = rates
+        return rates.get(self.scope, self.rate)
+
+    def get_engine(self) -> Optional[ThrottleEngine]:
+        """
+        ``None`` stands for DRF's default implementation.
+        """
+        name = self.engine or certego_apps_settings.THROTTLE_ENGINE
+        try:
+            return THROTTLE_ENGINES[name]
+        except KeyError:
+            raise ImproperlyConfigured(f"Unknown throttle engine: {name}")
 
     def get_cache_key(self, request, view):
         key = (
@@ -34,36 +289,61 @@ class _CustomUserRateThrottle(UserRateThrottle):
             and request.method.lower() not in self.throttle_methods
         ):
             return True
-        return super(_CustomUserRateThrottle, self).allow_request(request, view)
+        rate = self.get_request_rate(request)
+        if rate != self.rate:
+            self.rate = rate
+            self.num_requests, self.duration = self.parse_rate(rate)
+        if not certego_apps_settings.THROTTLE_METRICS_ENABLED:
+            return self._allow_request(request, view)
+        self.key = None
+        start = time.perf_counter()
+        allowed = self._allow_request(request, view)
+        throttle_metrics.record(
+            self.scope, self.key, allowed, time.perf_counter() - start
+        )
+        return allowed
+
+    def _allow_request(self, request, view) -> bool:
+        engine = self.get_engine()
+        if engine is None:
+            return super(_CustomUserRateThrottle, self).allow_request(request, view)
+
+        self._wait = None
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        allowed, self._wait = engine.allow(
+            self.cache, self.key, self.num_requests, self.duration, self.timer()
+        )
+        return allowed
+
+    def wait(self):
+        if self.get_engine() is None:
+            return super(_CustomUserRateThrottle, self).wait()
+        return self._wait
 
 
 class POSTModelUserRateThrottle(_CustomUserRateThrottle):
     scope = "POST_model"
     throttle_methods = ["post"]
-
-    def get_rate(self):
-        return "15/min"
+    default_rate = "15/min"
 
 
 class DELETEModelUserRateThrottle(_CustomUserRateThrottle):
     scope = "DELETE_model"
     throttle_methods = ["delete"]
-
-    def get_rate(self):
-        return "15/min"
+    default_rate = "15/min"
 
 
 class PATCHModelUserRateThrottle(_CustomUserRateThrottle):
     scope = "PUTPATCH_model"
     throttle_methods = ["patch", "put"]
-
-    def get_rate(self):
-        return "15/min"
+    default_rate = "15/min"
 
 
 class POSTUserRateThrottle(_CustomUserRateThrottle):
     scope = "POST_default"
     throttle_methods = ["post"]
-
-    def get_rate(self):
-        return "5/h"
+    default_rate = "5/h"
@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from certego_saas.ext.metrics import throttle_metrics
+
+
+class Command(BaseCommand):
+    help = "Dump the throttling metrics published by the running processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-t", "--top", type=int, default=10, help="How many hot keys to show"
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Dump the snapshot as JSON"
+        )
+
+    def handle(self, *args, **options):
+        snapshot = throttle_metrics.collect(top=options["top"])
+        if options["json"]:
+            self.stdout.write(json.dumps(snapshot, indent=2))
+            return
+        if not snapshot["processes"]:
+            self.stdout.write(self.style.ERROR("No throttle metrics published"))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Processes: {len(snapshot['processes'])}")
+        )
+        self.stdout.write("Decisions:")
+        for scope, counts in sorted(snapshot["decisions"].items()):
+            total = counts["allowed"] + counts["denied"]
+            latency = snapshot["latencies"].get(scope, {})
+            mean = latency["sum_ms"] / latency["count"] if latency.get("count") else 0
+            self.stdout.write(
+                f"  {scope}: {counts['allowed']} allowed, {counts['denied']} denied "
+                f"({counts['denied'] / total:.1%}), mean latency {mean:.3f} ms"
+            )
+        self.stdout.write("Hot keys:")
+        for key, count, error in snapshot["hot_keys"]:
+            self.stdout.write(f"  {key}: {count} (+/- {error})")
@@ -34,6 +34,24 @@ DEFAULTS = {
     "FILTER_NOTIFICATIONS_VIEW_FOR_CURRENTAPP": True,
     "USER_ACCESS_SERIALIZER": "certego_saas.apps.user.serializers.UserAccessSerializer",
     "ORGANIZATION_MAX_MEMBERS": 3,
+    # throttling
+    "THROTTLE_ENGINE": "history",
+    "THROTTLE_RATES": {},
+    "ORGANIZATION_THROTTLE_RATES": {},
+    "THROTTLE_RATES_CACHE_TIMEOUT": 60,
+    "THROTTLE_METRICS_ENABLED": True,
+    "THROTTLE_METRICS_TOP_KEYS": 100,
+    "THROTTLE_METRICS_PUBLISH_INTERVAL": 60,
+    # logging
+    "LOG_ASYNC_EMISSION": False,
+    "LOG_QUEUE_SIZE": 1000,
+    "LOG_QUEUE_OVERFLOW_POLICY": "drop_oldest",
+    "LOG_QUEUE_BLOCK_TIMEOUT": 1.0,
+    "LOG_QUEUE_SAMPLE_RATE": 0.1,
+    "LOG_BODY_MAX_LENGTH": 4096,
+    "LOG_SAMPLING_POLICIES": {},
+    "LOG_SUPPRESSED_SUMMARY_INTERVAL": 60,
+    "EXCEPTION_HANDLERS": {},
     # app info
     "HOST_URI": settings.HOST_URI,
     "HOST_NAME": settings.HOST_NAME,
@@ -46,6 +64,13 @@ DEFAULTS = {
     "TWITTER_ACCESS_TOKEN_SECRET": get_secret("TWITTER_ACCESS_TOKEN_SECRET", None),
     "STRIPE_LIVE_MODE": STRIPE_LIVE_MODE,
     "STRIPE_WEBHOOK_SIGNING_KEY": get_secret("STRIPE_WEBHOOK_SIGNING_KEY", None),
+    "STRIPE_MIRROR_ENABLED": False,
+    "STRIPE_CUSTOMER_PROVISIONING_DEFERRED": False,
+    "STRIPE_HTTP_POOL_SIZE": 10,
+    "STRIPE_MAX_NETWORK_RETRIES": 1,
+    "STRIPE_RETRY_MAX_DELAY": 2,
+    "STRIPE_TIMEOUTS": {},
+    "STRIPE_API_BASE": None,
     "TESTING": sys.argv[1:2] == ["test"],
 }
 
@@ -16,4 +16,6 @@ urlpatterns = [
     path("api/", include("certego_saas.apps.notifications.urls")),
     # organization sub-app
     path("api/me/", include("certego_saas.apps.organization.urls")),
+    # payments sub-app
+    path("api/payments/", include("certego_saas.apps.payments.urls")),
 ]
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+from django.test import tag
+
+from certego_saas.apps.organization.context import get_membership_context
+from certego_saas.apps.organization.models import Invitation, Membership, Organization
+from certego_saas.apps.organization.permissions import (
+    InvitationDestroyObjectPermission,
+    IsObjectAdminPermission,
+    IsObjectOwnerOrSameOrgOrCertegoOrgPermission,
+    IsObjectOwnerPermission,
+)
+
+from ... import CustomTestCase, User
+
+
+@tag("apps", "organization")
+class TestMembershipContext(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.owner = User.objects.create(username="test_context_owner")
+        self.member = User.objects.create(username="test_context_member")
+        self.certego_member = User.objects.create(username="test_context_certego")
+        self.no_org = User.objects.create(username="test_context_no_org")
+        self.org = Organization.create(name="testcontext", owner=self.owner)
+        Membership.objects.create(user=self.member, organization=self.org)
+        Membership.objects.create(
+            user=self.certego_member, organization=Organization.certego()
+        )
+
+    def tearDown(self) -> None:
+        self.org.delete()
+        for user in (self.owner, self.member, self.certego_member, self.no_org):
+            user.delete()
+        return super().tearDown()
+
+    @staticmethod
+    def _request(user: User):
+        # as in the views: the user comes without its membership
+        return SimpleNamespace(user=User.objects.get(pk=user.pk))
+
+    def _has_permission(self, permission, request, obj) -> bool:
+        return permission.has_object_permission(request, None, obj)
+
+    def test_single_query_per_request(self):
+        permission = IsObjectOwnerOrSameOrgOrCertegoOrgPermission()
+        request = self._request(self.no_org)
+        certego_obj = SimpleNamespace(user_id=self.certego_member.pk)
+        # the memberships, then the certego organization: once per request
+        with self.assertNumQueries(2):
+            self.assertTrue(self._has_permission(permission, request, certego_obj))
+            self.assertTrue(self._has_permission(permission, request, certego_obj))
+        with self.assertNumQueries(1):
+            self.assertFalse(
+                self._has_permission(
+                    permission, request, SimpleNamespace(user_id=self.member.pk)
+                )
+            )
+        self.assertIsNotNone(get_membership_context(request)._certego_pk)
+
+    def test_owner_without_organization(self):
+        permission = IsObjectOwnerOrSameOrgOrCertegoOrgPermission()
+        request = self._request(self.member)
+        # the memberships only: no certego organization lookup
+        with self.assertNumQueries(1):
+            self.assertFalse(
+                self._has_permission(
+                    permission, request, SimpleNamespace(user_id=self.no_org.pk)
+                )
+            )
+
+    def test_same_org(self):
+        permission = IsObjectOwnerOrSameOrgOrCertegoOrgPermission()
+        obj = SimpleNamespace(user_id=self.owner.pk)
+        self.assertTrue(
+            self._has_permission(permission, self._request(self.member), obj)
+        )
+        self.assertFalse(
+            self._has_permission(permission, self._request(self.no_org), obj)
+        )
+
+    def test_owner_and_admin(self):
+        owner_request = self._request(self.owner)
+        member_request = self._request(self.member)
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                self._has_permission(IsObjectOwnerPermission(), owner_request, self.org)
+            )
+            self.assertTrue(
+                self._has_permission(IsObjectAdminPermission(), owner_request, self.org)
+            )
+        self.assertFalse(
+            self._has_permission(IsObjectOwnerPermission(), member_request, self.org)
+        )
+        self.assertFalse(
+            self._has_permission(IsObjectAdminPermission(), member_request, self.org)
+        )
+
+    def test_invitation_destroy(self):
+        invitation = Invitation.objects.create(user=self.no_org, organization=self.org)
+        permission = InvitationDestroyObjectPermission()
+        self.assertTrue(
+            self._has_permission(permission, self._request(self.owner), invitation)
+        )
+        self.assertFalse(
+            self._has_permission(permission, self._request(self.member), invitation)
+        )
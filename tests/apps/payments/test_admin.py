@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+import stripe
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import tag
+from django.test.utils import CaptureQueriesContext
+
+from certego_saas.apps.payments import mirror, utils
+from certego_saas.apps.payments.catalog import CatalogLoader
+from certego_saas.models import Customer, Subscription, User
+
+from . import CustomTestCase
+from .test_mirror import PRICE, PRODUCT, SUBSCRIPTION, make_event
+
+
+@tag("apps", "payments")
+class TestPaymentsAdmin(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.admin = User.objects.create(
+            username="test_admin", is_staff=True, is_superuser=True
+        )
+        self.client.force_login(self.admin)
+        loader = CatalogLoader(cache=LocMemCache(f"catalog-{self.id()}", {}))
+        for patcher in (
+            patch.object(utils, "catalog", loader),
+            patch(
+                "certego_saas.apps.payments.catalog.list_prices",
+                return_value=[{**PRICE, "product": PRODUCT}],
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        mirror.sync_event(make_event(PRODUCT, "product.created"))
+        mirror.sync_event(make_event(PRICE, "price.created"))
+        self.users = []
+
+    def tearDown(self) -> None:
+        for user in self.users + [self.admin]:
+            user.delete()
+        return super().tearDown()
+
+    def _add_customers(self, count: int) -> None:
+        for _ in range(count):
+            i = len(self.users)
+            user = User.objects.create(username=f"test_admin_{i}")
+            self.users.append(user)
+            customer = Customer.objects.create(customer_id=f"cus_{i}", user=user)
+            customer.subscriptions.create(
+                subscription_id=f"sub_{i}", appname="DRAGONFLY"
+            )
+            mirror.sync_event(
+                make_event(
+                    {**SUBSCRIPTION, "id": f"sub_{i}", "customer": f"cus_{i}"},
+                    "customer.subscription.created",
+                )
+            )
+
+    def _count_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as queries, patch.object(
+            stripe.Subscription, "retrieve"
+        ) as retrieve:
+            response = self.client.get(url)
+            retrieve.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_constant_queries(self):
+        for url in (
+            "/admin/certego_saas_payments/customer/",
+            "/admin/certego_saas_payments/subscription/",
+        ):
+            with self.subTest(url=url):
+                self._add_customers(2)
+                few = self._count_queries(url)
+                self._add_customers(5)
+                self.assertEqual(self._count_queries(url), few)
+
+    def test_product_names(self):
+        self._add_customers(2)
+        subscriptions = list(Subscription.objects.all()) + [
+            Subscription(subscription_id="sub_unknown", appname="DRAGONFLY")
+        ]
+        with patch.object(stripe.Subscription, "retrieve") as retrieve:
+            names = Subscription.resolve_product_names(subscriptions)
+            retrieve.assert_not_called()
+        self.assertEqual(
+            names, {"sub_0": "Researcher", "sub_1": "Researcher", "sub_unknown": None}
+        )
+        response = self.client.get("/admin/certego_saas_payments/subscription/")
+        self.assertContains(response, "Researcher", count=2)
+
+    def test_subscriptions_map(self):
+        self._add_customers(1)
+        customer = Customer.objects.prefetch_related("subscriptions").get(pk="cus_0")
+        with self.assertNumQueries(0):
+            self.assertEqual(customer.dragonfly_subscription.subscription_id, "sub_0")
+            self.assertFalse(customer.intelowl_subscription.subscription_id)
+            self.assertIs(customer.dragonfly_subscription.customer, customer)
@@ -0,0 +1,108 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from django.test import override_settings, tag
+
+from certego_saas.apps.payments import cache as cache_module
+from certego_saas.apps.payments.cache import cache_memoize
+from certego_saas.apps.payments.exceptions import CustomerWithoutSubscription
+
+from . import CustomTestCase
+from .test_webhook import LOCMEM_CACHES
+
+
+@tag("apps", "payments")
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestCacheMemoize(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        cache_module.get_cache().clear()
+
+    def test_single_flight(self):
+        calls = []
+
+        @cache_memoize(60, single_flight=True)
+        def slow(arg):
+            calls.append(arg)
+            time.sleep(0.2)
+            return arg * 2
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(slow(21))) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(calls, [21])
+
+        slow.invalidate(21)
+        self.assertEqual(slow(21), 42)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(slow(21, _refresh=True), 42)
+        self.assertEqual(len(calls), 3)
+
+    def test_single_flight_holder_fails(self):
+        started = threading.Event()
+
+        @cache_memoize(60, single_flight=True, lock_timeout=30)
+        def flaky(fail):
+            if fail:
+                started.set()
+                time.sleep(0.1)
+                raise ValueError("stripe unavailable")
+            return 1
+
+        holder = threading.Thread(
+            target=lambda: self.assertRaises(ValueError, flaky, 1)
+        )
+        holder.start()
+        started.wait(5)
+        start = time.monotonic()
+        with self.assertRaises(ValueError):
+            flaky(1)
+        holder.join()
+        # computed after the lock release, not after lock_timeout
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_early_refresh(self):
+        func = MagicMock(return_value=1, __name__="func", __qualname__="func")
+        memoized = cache_memoize(60, early_refresh=1)(func)
+        memoized()
+        memoized()
+        self.assertEqual(func.call_count, 1)
+        entry = cache_module.caches[cache_module.CACHE_ALIAS].get(
+            memoized.get_cache_key()
+        )
+        # close to the expiry, with a high draw
+        with patch.object(cache_module.time, "time", return_value=entry.expires_at):
+            memoized()
+        self.assertEqual(func.call_count, 2)
+
+    def test_negative_caching(self):
+        func = MagicMock(
+            side_effect=CustomerWithoutSubscription(appname="DRAGONFLY"),
+            __name__="func",
+            __qualname__="func",
+        )
+        memoized = cache_memoize(
+            60,
+            negative_timeout=5,
+            negative_exceptions=(CustomerWithoutSubscription,),
+        )(func)
+        for _ in range(3):
+            with self.assertRaises(CustomerWithoutSubscription) as context:
+                memoized()
+            self.assertIn("DRAGONFLY", str(context.exception.detail))
+        self.assertEqual(func.call_count, 1)
+
+        # other exceptions are not cached
+        func.side_effect = ValueError()
+        memoized.invalidate()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                memoized()
+        self.assertEqual(func.call_count, 3)
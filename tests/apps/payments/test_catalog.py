@@ -0,0 +1,109 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import stripe
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import tag
+
+from certego_saas.apps.payments import catalog as catalog_module
+from certego_saas.apps.payments.catalog import CatalogLoader, build_snapshot
+
+from . import CustomTestCase
+
+
+def make_price(index, appname="DRAGONFLY", name=None):
+    return {
+        "id": f"price_{index}",
+        "object": "price",
+        "currency": "eur",
+        "unit_amount": index * 100,
+        "product": {
+            "id": f"prod_{index}",
+            "object": "product",
+            "name": name or f"Product {index}",
+            "description": None,
+            "active": True,
+            "metadata": {"appname": appname},
+        },
+    }
+
+
+@tag("apps", "payments")
+class TestCatalog(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.cache = LocMemCache(f"catalog-{self.id()}", {})
+
+    def test_build_snapshot(self):
+        snapshot = build_snapshot(
+            [make_price(1), make_price(2, name="Integration")], fetched_at=1
+        )
+        self.assertEqual([p["id"] for p in snapshot.products], ["prod_1"])
+        self.assertIs(snapshot.prices_map["price_2"], snapshot.prices_map["prod_2"])
+        self.assertEqual(
+            snapshot.prices_map["Product 1__DRAGONFLY"]["price_id"], "price_1"
+        )
+
+    def test_list_prices_pages(self):
+        listing = MagicMock()
+        listing.auto_paging_iter.return_value = iter(
+            stripe.Price.construct_from(make_price(i), "key") for i in range(250)
+        )
+        with patch.object(stripe.Price, "list", return_value=listing) as price_list:
+            prices = catalog_module.list_prices()
+        price_list.assert_called_once_with(expand=["data.product"], limit=100)
+        self.assertEqual(len(prices), 250)
+        self.assertEqual(len(build_snapshot(prices).products), 250)
+
+    def test_single_fetch(self):
+        loader = CatalogLoader(cache=self.cache, background=False)
+        with patch.object(
+            catalog_module, "list_prices", return_value=[make_price(1)]
+        ) as list_prices:
+            for _ in range(5):
+                loader.get()
+            # another process: loaded from the shared cache
+            CatalogLoader(cache=self.cache).get()
+        list_prices.assert_called_once()
+
+    def test_stale_while_revalidate(self):
+        loader = CatalogLoader(cache=self.cache, ttl=60, check_interval=0)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_list_prices():
+            started.set()
+            release.wait(5)
+            return [make_price(2)]
+
+        with patch.object(catalog_module, "list_prices", return_value=[make_price(1)]):
+            stale = loader.get()._replace(fetched_at=time.time() - 120)
+        loader._snapshot = stale
+        self.cache.set(loader.CACHE_KEY, stale)
+        with patch.object(
+            catalog_module, "list_prices", side_effect=slow_list_prices
+        ) as list_prices:
+            # the stale snapshot is served while a single refresh runs
+            for _ in range(3):
+                self.assertIn("price_1", loader.get().prices_map)
+            self.assertTrue(started.wait(5))
+            release.set()
+            for _ in range(100):
+                if not loader._refreshing:
+                    break
+                time.sleep(0.01)
+        list_prices.assert_called_once()
+        self.assertIn("price_2", loader.get().prices_map)
+
+    def test_refresh_failure(self):
+        loader = CatalogLoader(cache=self.cache, check_interval=0, background=False)
+        with patch.object(catalog_module, "list_prices", return_value=[make_price(1)]):
+            loader.get()
+        loader.invalidate()
+        with patch.object(
+            catalog_module,
+            "list_prices",
+            side_effect=stripe.error.APIConnectionError("error"),
+        ):
+            self.assertIn("price_1", loader.get().prices_map)
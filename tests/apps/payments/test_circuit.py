@@ -0,0 +1,123 @@
+import time
+from unittest.mock import patch
+
+import stripe
+from django.core.cache import caches
+from django.test import override_settings, tag
+
+from certego_saas.apps.payments import circuit, mirror
+from certego_saas.apps.payments.circuit import CircuitBreaker
+from certego_saas.apps.payments.consts import CACHE_ALIAS
+from certego_saas.apps.payments.exceptions import StripeUnavailable
+from certego_saas.apps.payments.http_client import StripeHTTPClient
+from certego_saas.models import Customer, Subscription, User
+
+from . import CustomTestCase
+from .test_mirror import PRICE, PRODUCT, SUBSCRIPTION, make_event
+from .test_webhook import LOCMEM_CACHES
+
+RETRIEVED = {
+    **SUBSCRIPTION,
+    "plan": {"id": "price_mirror", "object": "plan", "product": PRODUCT},
+}
+
+
+def fail(*args, **kwargs):
+    raise stripe.error.APIConnectionError("timed out")
+
+
+@tag("apps", "payments")
+class TestCircuitBreaker(CustomTestCase):
+    def test_trips_and_probes(self):
+        breaker = CircuitBreaker(
+            "test", failure_rate=0.5, minimum_calls=4, open_timeout=0.05
+        )
+        for func in (lambda: 1, fail, lambda: 1, fail):
+            try:
+                breaker.call(func)
+            except StripeUnavailable:
+                pass
+        self.assertEqual(breaker.state, breaker.OPEN)
+        # fails fast
+        with self.assertRaises(StripeUnavailable):
+            breaker.call(lambda: 1)
+
+        time.sleep(0.05)
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
+        with self.assertRaises(StripeUnavailable):
+            breaker.call(fail)
+        self.assertEqual(breaker.state, breaker.OPEN)
+        time.sleep(0.05)
+        self.assertEqual(breaker.call(lambda: 1), 1)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_client_errors_are_not_failures(self):
+        breaker = CircuitBreaker("test", minimum_calls=2)
+
+        def not_found():
+            raise stripe.error.InvalidRequestError("No such customer", "id")
+
+        for _ in range(3):
+            with self.assertRaises(stripe.error.InvalidRequestError):
+                breaker.call(not_found)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_call_timeout(self):
+        client = StripeHTTPClient(default_timeout=80)
+        self.assertEqual(circuit.call(lambda: client._timeout, _timeout=2), 2)
+        self.assertEqual(client._timeout, 80)
+
+
+@tag("apps", "payments")
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestDegradedEntitlements(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        caches[CACHE_ALIAS].clear()
+        self.user = User.objects.create(username="test_circuit")
+        self.customer = Customer.objects.create(
+            customer_id="cus_mirror", user=self.user
+        )
+        self.customer.subscriptions.create(
+            subscription_id="sub_mirror", appname="DRAGONFLY"
+        )
+        self.addCleanup(circuit.stripe_circuit.reset)
+
+    def tearDown(self) -> None:
+        self.user.delete()
+        return super().tearDown()
+
+    def _open_circuit(self):
+        circuit.stripe_circuit._open(time.monotonic())
+
+    def _subscription(self) -> Subscription:
+        return Subscription.objects.get(pk="sub_mirror")
+
+    def test_last_known_subscription(self):
+        retrieved = stripe.Subscription.construct_from(RETRIEVED, "key")
+        with patch.object(stripe.Subscription, "retrieve", return_value=retrieved):
+            self.assertFalse(self._subscription().entitlements.degraded)
+        subscription = self._subscription()
+        subscription._retrieve_subscription.invalidate(subscription)
+
+        self._open_circuit()
+        with patch.object(stripe.Subscription, "retrieve") as retrieve:
+            entitlements = self._subscription().entitlements
+            retrieve.assert_not_called()
+        self.assertTrue(entitlements.degraded)
+        self.assertTrue(entitlements.is_active)
+        self.assertEqual(entitlements.monthly_submissions_limit, 50)
+
+    def test_mirror_fallback(self):
+        with patch.object(stripe.Subscription, "retrieve", side_effect=fail):
+            with self.assertRaises(StripeUnavailable):
+                self._subscription().has_active_subscription()
+
+        mirror.sync_event(make_event(PRODUCT, "product.created"))
+        mirror.sync_event(make_event(PRICE, "price.created"))
+        mirror.sync_event(make_event(SUBSCRIPTION, "customer.subscription.created"))
+        self._open_circuit()
+        subscription = self._subscription()
+        self.assertTrue(subscription.has_active_subscription())
+        self.assertTrue(subscription.degraded)
+        self.assertEqual(subscription.product_name, "Researcher")
@@ -0,0 +1,163 @@
+import time
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import caches
+from django.test import override_settings, tag
+
+from certego_saas.apps.payments import webhook
+from certego_saas.apps.payments.consts import CACHE_ALIAS
+from certego_saas.apps.payments.decisions import DecisionCache, decision_cache
+from certego_saas.apps.payments.permissions import UserHasActiveSubscription
+from certego_saas.ext.models import AppChoices
+from certego_saas.models import Customer, Subscription, User
+
+from . import CustomTestCase
+from .test_webhook import LOCMEM_CACHES
+
+
+@tag("apps", "payments")
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestDecisionCache(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        caches[CACHE_ALIAS].clear()
+
+    def test_ttl(self):
+        cache = DecisionCache(ttl=0.05, negative_ttl=0.01)
+        cache.set(1, "DRAGONFLY", True)
+        cache.set(2, "DRAGONFLY", False)
+        cache.set(3, "DRAGONFLY", True, degraded=True)
+        self.assertTrue(cache.get(1, "DRAGONFLY"))
+        self.assertIs(cache.get(2, "DRAGONFLY"), False)
+        self.assertIsNone(cache.get(1, "QUOKKA"))
+        time.sleep(0.02)
+        self.assertTrue(cache.get(1, "DRAGONFLY"))
+        self.assertIsNone(cache.get(2, "DRAGONFLY"))
+        self.assertIsNone(cache.get(3, "DRAGONFLY"))
+
+    def test_bounded(self):
+        cache = DecisionCache(max_entries=2)
+        for user_id in range(3):
+            cache.set(user_id, "DRAGONFLY", True)
+        self.assertIsNone(cache.get(0, "DRAGONFLY"))
+        self.assertTrue(cache.get(2, "DRAGONFLY"))
+
+    def test_invalidate_other_process(self):
+        this = DecisionCache(generation_check_interval=0)
+        other = DecisionCache(generation_check_interval=0)
+        this.set(1, "DRAGONFLY", True)
+        other.set(1, "DRAGONFLY", True)
+        other.set(2, "DRAGONFLY", True)
+
+        this.invalidate(1)
+        self.assertIsNone(this.get(1, "DRAGONFLY"))
+        self.assertIsNone(other.get(1, "DRAGONFLY"))
+        # the other users keep their decisions
+        self.assertTrue(other.get(2, "DRAGONFLY"))
+
+        this.invalidate()
+        self.assertIsNone(other.get(2, "DRAGONFLY"))
+
+    def test_invalidated_while_computing(self):
+        this = DecisionCache(generation_check_interval=0)
+        version = this.get_version(1)
+        # e.g. a webhook event, from another process
+        DecisionCache().invalidate(1)
+        this.set(1, "DRAGONFLY", True, version=version)
+        self.assertIsNone(this.get(1, "DRAGONFLY"))
+
+    def test_signups_keep_the_decisions(self):
+        other = DecisionCache(generation_check_interval=0)
+        other.set(1, "DRAGONFLY", True)
+        user = User.objects.create(username="test_decisions_signup")
+        self.addCleanup(user.delete)
+        Customer.objects.create(customer_id="cus_decisions_signup", user=user)
+        self.assertTrue(other.get(1, "DRAGONFLY"))
+        self.assertIsNone(caches[CACHE_ALIAS].get(DecisionCache.VERSION_KEY % user.pk))
+
+
+@tag("apps", "payments")
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestUserHasActiveSubscription(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        caches[CACHE_ALIAS].clear()
+        self.user = User.objects.create(username="test_decisions")
+        self.customer = Customer.objects.create(
+            customer_id="cus_decisions", user=self.user
+        )
+        self.customer.subscriptions.create(
+            subscription_id="sub_decisions", appname=AppChoices.CURRENTAPP
+        )
+        self.addCleanup(decision_cache.invalidate)
+
+    def tearDown(self) -> None:
+        self.user.delete()
+        return super().tearDown()
+
+    def _has_permission(self) -> bool:
+        request = MagicMock(user=User.objects.get(pk=self.user.pk))
+        return UserHasActiveSubscription().has_permission(request, None)
+
+    def test_cached_decision(self):
+        with patch.object(
+            Subscription, "has_active_subscription", return_value=True
+        ) as has_active:
+            self.assertTrue(self._has_permission())
+            request = MagicMock(user=self.user)
+            with self.assertNumQueries(0):
+                self.assertTrue(
+                    UserHasActiveSubscription().has_permission(request, None)
+                )
+        has_active.assert_called_once()
+
+    def test_negative_decision(self):
+        with patch.object(
+            Subscription, "has_active_subscription", return_value=False
+        ) as has_active:
+            self.assertFalse(self._has_permission())
+            self.assertFalse(self._has_permission())
+        has_active.assert_called_once()
+
+    def test_model_signal_invalidation(self):
+        with patch.object(
+            Subscription, "has_active_subscription", return_value=False
+        ) as has_active:
+            self.assertFalse(self._has_permission())
+            self.customer.subscriptions.get().save()
+            self.assertFalse(self._has_permission())
+        self.assertEqual(has_active.call_count, 2)
+
+    def test_invalidation_while_computing(self):
+        def has_active_subscription():
+            decision_cache.invalidate(self.user.pk)
+            return True
+
+        with patch.object(decision_cache, "generation_check_interval", 0), patch.object(
+            Subscription,
+            "has_active_subscription",
+            side_effect=has_active_subscription,
+        ) as has_active:
+            self.assertTrue(self._has_permission())
+            self.assertTrue(self._has_permission())
+        self.assertEqual(has_active.call_count, 2)
+
+    def test_webhook_invalidation(self):
+        with patch.object(
+            Subscription, "has_active_subscription", return_value=False
+        ) as has_active:
+            self.assertFalse(self._has_permission())
+            webhook.invalidate_caches(
+                {
+                    "type": "customer.subscription.updated",
+                    "data": {
+                        "object": {
+                            "id": "sub_decisions",
+                            "object": "subscription",
+                            "customer": "cus_decisions",
+                        }
+                    },
+                }
+            )
+            self.assertFalse(self._has_permission())
+        self.assertEqual(has_active.call_count, 2)
@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+import stripe
+from django.test import tag
+
+from certego_saas.apps.payments import models
+from certego_saas.apps.payments.entitlements import Entitlements
+from certego_saas.models import Customer, Subscription, User
+
+from . import CustomTestCase
+from .test_mirror import PRICE, PRODUCT, SUBSCRIPTION
+
+DEFAULT_PRODUCT = {
+    "id": "prod_default",
+    "price_id": "price_default",
+    "name": "Certego_Internal",
+    "metadata": {
+        "max_submissions": "10",
+        "submission_type": "public",
+        "priority": "False",
+        "concurrent_profiles": "1",
+    },
+}
+
+
+@tag("apps", "payments")
+class TestEntitlements(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = User.objects.create(username="test_entitlements")
+        self.customer = Customer.objects.create(
+            customer_id="cus_mirror", user=self.user
+        )
+
+    def tearDown(self) -> None:
+        self.user.delete()
+        return super().tearDown()
+
+    def assertAllProperties(self, subscription, expected):
+        self.assertEqual(
+            [
+                subscription.product_name,
+                subscription.priority,
+                subscription.monthly_submissions_limit,
+                subscription.can_submit_private,
+                subscription.concurrent_profiles,
+            ],
+            expected,
+        )
+
+    def test_subscribed_product(self):
+        subscription = self.customer.subscriptions.create(
+            subscription_id="sub_mirror", appname="DRAGONFLY"
+        )
+        retrieved = stripe.Subscription.construct_from(
+            {**SUBSCRIPTION, "plan": {**PRICE, "product": PRODUCT}}, "key"
+        )
+        with patch.object(
+            Subscription, "_retrieve_subscription", return_value=retrieved
+        ) as retrieve:
+            self.assertAllProperties(subscription, ["Researcher", True, 50, True, 2])
+            self.assertAllProperties(subscription, ["Researcher", True, 50, True, 2])
+        retrieve.assert_called_once()
+        self.assertTrue(subscription.entitlements.is_active)
+        self.assertFalse(subscription.entitlements.is_default)
+
+    def test_default_product(self):
+        subscription = self.customer.currentapp_subscription
+        with patch.object(
+            models, "get_default_product", return_value=DEFAULT_PRODUCT
+        ) as get_default_product:
+            self.assertAllProperties(
+                subscription, ["Certego_Internal", False, 10, False, 1]
+            )
+        get_default_product.assert_called_once()
+        self.assertTrue(subscription.entitlements.is_default)
+        self.assertFalse(subscription.entitlements.is_active)
+
+    def test_slots(self):
+        entitlements = Entitlements.from_product(
+            {"id": "prod", "name": "Free", "metadata": {}}
+        )
+        self.assertEqual(entitlements.monthly_submissions_limit, 0)
+        self.assertFalse(entitlements.priority)
+        with self.assertRaises(AttributeError):
+            entitlements.extra = True
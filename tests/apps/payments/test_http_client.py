@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import stripe
+from django.test import tag
+
+from certego_saas.apps.payments import circuit
+from certego_saas.apps.payments.exceptions import StripeUnavailable
+from certego_saas.apps.payments.http_client import StripeHTTPClient
+from certego_saas.ext.test_utilities.fake_stripe import FakeStripeServer
+from certego_saas.models import Customer, Subscription
+
+from . import CustomTestCase
+from .test_circuit import RETRIEVED
+
+
+@tag("apps", "payments")
+class TestStripeHTTPClient(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.server = FakeStripeServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.add(RETRIEVED)
+        self.client = StripeHTTPClient(
+            timeouts={"/v1/checkout": 15, "/v1/checkout/sessions/cs_": 30},
+            pool_size=2,
+            retry_max_delay=0.01,
+        )
+        for patcher in (
+            patch.object(stripe, "api_base", self.server.url),
+            patch.object(stripe, "default_http_client", self.client),
+            patch.object(stripe, "max_network_retries", 1),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(circuit.stripe_circuit.reset)
+
+    def test_endpoint_timeouts(self):
+        self.assertEqual(self.client.timeout_for("https://x/v1/checkout/sessions"), 15)
+        self.assertEqual(
+            self.client.timeout_for("https://x/v1/checkout/sessions/cs_1"), 30
+        )
+        self.assertEqual(self.client.timeout_for("https://x/v1/subscriptions/s"), 5)
+        # writes wait at least STRIPE_WRITE_TIMEOUT
+        self.assertEqual(self.client.timeout_for("https://x/v1/customers", "post"), 15)
+        self.assertEqual(
+            self.client.timeout_for("https://x/v1/checkout/sessions/cs_1", "post"), 30
+        )
+        for retries in range(1, 10):
+            self.assertLessEqual(self.client._sleep_time_seconds(retries), 0.01)
+
+    def test_pooled_connections(self):
+        subscription = Subscription(subscription_id="sub_mirror", appname="DRAGONFLY")
+
+        def retrieve(_):
+            return subscription._retrieve_subscription(_refresh=True).status
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            statuses = list(executor.map(retrieve, range(40)))
+        self.assertEqual(statuses, ["active"] * 40)
+        self.assertEqual(self.server.requests, 40)
+        # keep-alive, at most ``pool_size`` idle connections kept
+        self.assertLess(self.server.connections, 40)
+
+        session = Customer(customer_id="cus_mirror").create_checkout_session(
+            "price_mirror", "https://ok", "https://ko"
+        )
+        self.assertTrue(session.id.startswith("cs_"))
+
+    def test_retries(self):
+        self.server.status = 500
+        subscription = Subscription(subscription_id="sub_mirror", appname="DRAGONFLY")
+        with self.assertRaises(StripeUnavailable):
+            subscription._retrieve_subscription(_refresh=True)
+        self.assertEqual(self.server.requests, 2)
@@ -0,0 +1,144 @@
+from unittest.mock import patch
+
+import stripe
+from django.core.cache import caches
+from django.test import override_settings, tag
+
+from certego_saas.apps.payments import invoices
+from certego_saas.apps.payments.consts import CACHE_ALIAS
+from certego_saas.apps.payments.invoices import paginate
+from certego_saas.models import Customer, User
+
+from . import CustomTestCase
+from .test_mirror import INVOICE
+from .test_webhook import LOCMEM_CACHES
+
+
+def make_invoice(index: int) -> dict:
+    return {**INVOICE, "id": f"in_{index}", "created": 1000 + index}
+
+
+def make_list(*indexes: int) -> stripe.ListObject:
+    return stripe.ListObject.construct_from(
+        {
+            "object": "list",
+            "url": "/v1/invoices",
+            "has_more": False,
+            "data": [make_invoice(i) for i in indexes],
+        },
+        "key",
+    )
+
+
+@tag("apps", "payments")
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestInvoicesCache(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        caches[CACHE_ALIAS].clear()
+        self.user = User.objects.create(username="test_invoices")
+        self.customer = Customer.objects.create(
+            customer_id="cus_mirror", user=self.user
+        )
+        self.subscription = self.customer.subscriptions.create(
+            subscription_id="sub_mirror", appname="DRAGONFLY"
+        )
+
+    def tearDown(self) -> None:
+        self.user.delete()
+        return super().tearDown()
+
+    def test_paginate(self):
+        ids = ["in_3", "in_2", "in_1"]
+        self.assertEqual(paginate(ids), ids)
+        self.assertEqual(paginate(ids, limit=2), ["in_3", "in_2"])
+        self.assertEqual(paginate(ids, limit=2, starting_after="in_2"), ["in_1"])
+        self.assertEqual(paginate(ids, starting_after="in_0"), [])
+
+    def test_incremental_listing(self):
+        with patch.object(
+            stripe.Invoice, "list", return_value=make_list(2, 1, 3)
+        ) as invoice_list:
+            result = self.subscription.get_invoices()
+            self.assertEqual([i.id for i in result], ["in_3", "in_2", "in_1"])
+            invoice_list.assert_called_once_with(subscription="sub_mirror", limit=100)
+            page = self.subscription.get_invoices(limit=1, starting_after="in_3")
+            self.assertEqual([i.id for i in page], ["in_2"])
+            self.assertEqual(invoice_list.call_count, 1)
+
+        # e.g. "invoice.created" webhook event
+        invoices.invalidate("sub_mirror")
+        with patch.object(
+            stripe.Invoice, "list", return_value=make_list(4)
+        ) as invoice_list:
+            result = self.subscription.get_invoices(limit=2)
+            self.assertEqual([i.id for i in result], ["in_4", "in_3"])
+            invoice_list.assert_called_once_with(
+                subscription="sub_mirror", limit=100, ending_before="in_3"
+            )
+
+    def test_missing_invoices(self):
+        with patch.object(stripe.Invoice, "list", return_value=make_list(2, 1)):
+            self.subscription.get_invoices()
+        # evicted, or invalidated by an "invoice.updated" event
+        updated = stripe.Invoice.construct_from(
+            {**make_invoice(1), "status": "void"}, "key"
+        )
+        invoices.invalidate("sub_mirror", "in_1")
+        with patch.object(
+            stripe.Invoice, "list", return_value=make_list()
+        ), patch.object(stripe.Invoice, "retrieve", return_value=updated) as retrieve:
+            result = self.subscription.get_invoices()
+            retrieve.assert_called_once_with("in_1")
+        self.assertEqual([i.status for i in result], ["paid", "void"])
+
+        # deleted draft
+        caches[CACHE_ALIAS].delete("invoice.in_2")
+        with patch.object(
+            stripe.Invoice,
+            "retrieve",
+            side_effect=stripe.error.InvalidRequestError(
+                "No such invoice", "id", code="resource_missing"
+            ),
+        ):
+            result = self.subscription.get_invoices()
+        self.assertEqual([i.id for i in result], ["in_1"])
+        self.assertEqual(caches[CACHE_ALIAS].get("invoices.sub_mirror").ids, ("in_1",))
+
+    def test_expired_invoices(self):
+        with patch.object(stripe.Invoice, "list", return_value=make_list(2, 1)):
+            self.subscription.get_invoices()
+        # as when the invoices expire before the index
+        caches[CACHE_ALIAS].delete_many(["invoice.in_1", "invoice.in_2"])
+        with patch.object(
+            stripe.Invoice, "list", return_value=make_list(3, 2, 1)
+        ) as invoice_list, patch.object(stripe.Invoice, "retrieve") as retrieve:
+            result = self.subscription.get_invoices()
+            invoice_list.assert_called_once_with(subscription="sub_mirror", limit=100)
+            retrieve.assert_not_called()
+        self.assertEqual([i.id for i in result], ["in_3", "in_2", "in_1"])
+        self.assertIsNotNone(caches[CACHE_ALIAS].get("invoice.in_1"))
+
+    def test_open_invoices_expire_sooner(self):
+        listed = make_list(2, 1)
+        listed.data[1]["status"] = "open"
+        cache = caches[CACHE_ALIAS]
+        # as with the webhook configured
+        with patch.object(
+            invoices, "INVOICES_CACHE_TIMEOUT", 60 * 60 * 24 * 30
+        ), patch.object(stripe.Invoice, "list", return_value=listed), patch.object(
+            cache, "set_many", wraps=cache.set_many
+        ) as set_many:
+            self.subscription.get_invoices()
+        timeouts = {
+            key: call.args[1]
+            for call in set_many.call_args_list
+            for key in call.args[0]
+        }
+        self.assertEqual(
+            timeouts,
+            {
+                "invoice.in_2": 60 * 60 * 24 * 30,
+                "invoice.in_1": invoices.SUBSCRIPTION_CACHE_TIMEOUT,
+            },
+        )
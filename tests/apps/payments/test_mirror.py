@@ -0,0 +1,179 @@
+import json
+import time
+from unittest.mock import patch
+
+import stripe
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import tag
+
+from certego_saas.apps.payments import mirror, utils
+from certego_saas.apps.payments.catalog import CatalogLoader
+from certego_saas.apps.payments.exceptions import CustomerWithoutSubscription
+from certego_saas.apps.payments.utils import get_products
+from certego_saas.models import Customer, User
+from certego_saas.settings import certego_apps_settings
+
+from . import CustomTestCase
+
+PRODUCT = {
+    "id": "prod_mirror",
+    "object": "product",
+    "name": "Researcher",
+    "description": "50 submissions",
+    "active": True,
+    "metadata": {
+        "max_submissions": "50",
+        "submission_type": "private",
+        "priority": "True",
+        "concurrent_profiles": "2",
+        "appname": "DRAGONFLY",
+    },
+}
+PRICE = {
+    "id": "price_mirror",
+    "object": "price",
+    "product": "prod_mirror",
+    "active": True,
+    "currency": "eur",
+    "unit_amount": 1500,
+}
+SUBSCRIPTION = {
+    "id": "sub_mirror",
+    "object": "subscription",
+    "customer": "cus_mirror",
+    "status": "active",
+    "items": {"object": "list", "data": [{"price": PRICE}]},
+    "current_period_start": 1000,
+    "current_period_end": 2000,
+    "start_date": 1000,
+    "created": 1000,
+    "cancel_at_period_end": False,
+}
+INVOICE = {
+    "id": "in_mirror",
+    "object": "invoice",
+    "customer": "cus_mirror",
+    "subscription": "sub_mirror",
+    "status": "paid",
+    "currency": "eur",
+    "total": 1500,
+    "amount_due": 1500,
+    "amount_paid": 1500,
+    "amount_remaining": 0,
+    "created": 1000,
+    "lines": {
+        "object": "list",
+        "data": [{"description": "1 × Researcher", "period": {"start": 1000}}],
+    },
+}
+
+
+def make_event(obj, event_type, created=1000):
+    return {
+        "id": f"evt_{event_type}_{created}",
+        "object": "event",
+        "type": event_type,
+        "created": created,
+        "data": {"object": obj},
+    }
+
+
+@tag("apps", "payments")
+class TestStripeMirror(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = User.objects.create(username="test_mirror")
+        self.customer = Customer.objects.create(
+            customer_id="cus_mirror", user=self.user
+        )
+        self.subscription = self.customer.subscriptions.create(
+            subscription_id="sub_mirror", appname="DRAGONFLY"
+        )
+        patcher = patch.object(certego_apps_settings, "STRIPE_MIRROR_ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.user.delete()
+        return super().tearDown()
+
+    def _sync_all(self):
+        mirror.sync_event(make_event(PRODUCT, "product.created"))
+        mirror.sync_event(make_event(SUBSCRIPTION, "customer.subscription.created"))
+        mirror.sync_event(make_event(INVOICE, "invoice.paid"))
+
+    def test_subscription_from_mirror(self):
+        with self.assertRaises(CustomerWithoutSubscription):
+            self.subscription.get_subscription()
+        self.assertFalse(self.subscription.has_active_subscription())
+
+        self._sync_all()
+        with patch.object(stripe.Subscription, "retrieve") as retrieve:
+            self.assertTrue(self.subscription.has_active_subscription())
+            self.assertEqual(self.subscription.product_name, "Researcher")
+            self.assertEqual(self.subscription.monthly_submissions_limit, 50)
+            self.assertEqual(self.subscription.concurrent_profiles, 2)
+            self.assertTrue(self.subscription.priority)
+            self.assertTrue(self.subscription.can_submit_private)
+            active = self.subscription.active_subscription()
+            self.assertEqual(active["product"]["unit_amount"], 1500)
+            self.assertEqual(active["current_period_end"], 2000)
+            self.assertEqual(len(active["invoices"]), 1)
+            latest_invoice = self.subscription.get_latest_invoice()
+            self.assertEqual(latest_invoice.id, "in_mirror")
+            self.assertEqual(latest_invoice.lines.data[0].period["start"], 1000)
+            retrieve.assert_not_called()
+
+    def test_outdated_events_are_discarded(self):
+        self._sync_all()
+        canceled = {**SUBSCRIPTION, "status": "canceled"}
+        mirror.sync_event(
+            make_event(canceled, "customer.subscription.deleted", created=3000)
+        )
+        self.assertFalse(self.subscription.has_active_subscription())
+        # delivered late
+        self.assertIsNone(
+            mirror.sync_event(
+                make_event(SUBSCRIPTION, "customer.subscription.updated", created=2000)
+            )
+        )
+        self.assertFalse(self.subscription.has_active_subscription())
+
+    def test_products_from_mirror(self):
+        self._sync_all()
+        loader = CatalogLoader(cache=LocMemCache(f"catalog-{self.id()}", {}))
+        with patch.object(stripe.Price, "list") as price_list, patch.object(
+            utils, "catalog", loader
+        ):
+            products = get_products()
+            price_list.assert_not_called()
+        self.assertEqual(len(products), 1)
+        self.assertEqual(products[0]["id"], "prod_mirror")
+        self.assertEqual(products[0]["unit_amount"], 1500)
+
+    def test_webhook(self):
+        payload = json.dumps(make_event(PRODUCT, "product.updated"))
+        secret = "whsec_test"
+        timestamp = int(time.time())
+        signature = stripe.WebhookSignature._compute_signature(
+            f"{timestamp}.{payload}", secret
+        )
+        url = "/api/payments/stripe/webhook"
+        with patch.object(mirror, "STRIPE_WEBHOOK_SIGNING_KEY", secret):
+            response = self.client.post(
+                url,
+                payload,
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE="t=%d,v1=invalid" % timestamp,
+            )
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post(
+                url,
+                payload,
+                content_type="application/json",
+                HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}",
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            mirror.StripeProduct.objects.get(pk="prod_mirror").name, "Researcher"
+        )
@@ -0,0 +1,158 @@
+from io import StringIO
+from unittest.mock import patch
+
+import stripe
+from django.core.management import call_command
+from django.test import override_settings, tag
+
+from certego_saas.apps.payments.exceptions import StripeUnavailable
+from certego_saas.apps.payments.models import PendingCustomer
+from certego_saas.apps.payments.provisioning import provision_pending
+from certego_saas.models import Customer, User
+from certego_saas.settings import certego_apps_settings
+
+from . import CustomTestCase
+
+
+def create_customer(**kwargs):
+    user_id = kwargs["metadata"]["user_id"]
+    return stripe.Customer.construct_from({"id": f"cus_{user_id}"}, "key")
+
+
+@tag("apps", "payments")
+@override_settings(STAGE_CI=False)
+class TestCustomerProvisioning(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        patcher = patch.object(
+            certego_apps_settings, "STRIPE_CUSTOMER_PROVISIONING_DEFERRED", True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _signup(self, username: str) -> User:
+        with patch.object(stripe.Customer, "create") as create:
+            user = User.objects.create(username=username, email=f"{username}@test.com")
+            create.assert_not_called()
+        self.assertTrue(PendingCustomer.objects.filter(user=user).exists())
+        self.assertFalse(user.has_customer())
+        return user
+
+    def test_provision_pending(self):
+        users = [self._signup(f"test_provisioning_{i}") for i in range(3)]
+        with patch.object(
+            stripe.Customer, "create", side_effect=create_customer
+        ) as create:
+            counts = provision_pending(batch_size=2, rate=0)
+            self.assertEqual(
+                counts, {"created": 2, "existing": 0, "failed": 0, "stopped": 0}
+            )
+            counts = provision_pending(batch_size=2, rate=0)
+            self.assertEqual(
+                counts, {"created": 1, "existing": 0, "failed": 0, "stopped": 0}
+            )
+            self.assertEqual(create.call_count, 3)
+            self.assertEqual(
+                {call.kwargs["idempotency_key"] for call in create.call_args_list},
+                {f"customer-create-accounts-{user.pk}" for user in users},
+            )
+        self.assertFalse(PendingCustomer.objects.exists())
+        self.assertEqual(
+            Customer.objects.get(user=users[0]).customer_id, f"cus_{users[0].pk}"
+        )
+
+    def test_retries(self):
+        first = self._signup("test_provisioning_retry_0")
+        self._signup("test_provisioning_retry_1")
+        with patch.object(
+            stripe.Customer,
+            "create",
+            side_effect=stripe.error.RateLimitError("Too many requests"),
+        ) as create:
+            counts = provision_pending(rate=0)
+            self.assertEqual(
+                counts, {"created": 0, "existing": 0, "failed": 1, "stopped": 2}
+            )
+            # the rest of the batch is released
+            create.reset_mock()
+            counts = provision_pending(rate=0)
+            self.assertEqual(counts["failed"], 1)
+            # nothing due: both are backing off
+            self.assertEqual(provision_pending(rate=0)["failed"], 0)
+        pending = PendingCustomer.objects.get(user=first)
+        self.assertEqual(pending.attempts, 1)
+        self.assertIn("Too many requests", pending.last_error)
+
+    def test_stripe_unavailable(self):
+        for i in range(3):
+            self._signup(f"test_provisioning_unavailable_{i}")
+        with patch.object(
+            stripe.Customer, "create", side_effect=StripeUnavailable()
+        ) as create:
+            counts = provision_pending(rate=0)
+        self.assertEqual(
+            counts, {"created": 0, "existing": 0, "failed": 1, "stopped": 3}
+        )
+        create.assert_called_once()
+        self.assertEqual(
+            sorted(PendingCustomer.objects.values_list("attempts", flat=True)),
+            [0, 0, 1],
+        )
+
+    def test_command_stops_when_stripe_is_unavailable(self):
+        for i in range(5):
+            self._signup(f"test_provisioning_command_{i}")
+        out, err = StringIO(), StringIO()
+        with patch.object(
+            stripe.Customer, "create", side_effect=StripeUnavailable()
+        ) as create:
+            call_command("provision_customers", "--rate=0", stdout=out, stderr=err)
+        create.assert_called_once()
+        self.assertEqual(
+            sorted(PendingCustomer.objects.values_list("attempts", flat=True)),
+            [0, 0, 0, 0, 1],
+        )
+        self.assertIn("5 stopped", out.getvalue())
+        self.assertIn("stripe is unavailable", err.getvalue())
+
+    def test_command_waits_when_stripe_is_unavailable(self):
+        for i in range(3):
+            self._signup(f"test_provisioning_command_wait_{i}")
+        with patch.object(
+            stripe.Customer, "create", side_effect=StripeUnavailable()
+        ) as create, patch(
+            "certego_saas.apps.payments.management.commands.provision_customers"
+            ".time.sleep",
+            side_effect=KeyboardInterrupt,
+        ) as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command(
+                    "provision_customers",
+                    "--rate=0",
+                    "--loop",
+                    "--interval=30",
+                    stdout=StringIO(),
+                )
+        create.assert_called_once()
+        sleep.assert_called_once_with(30)
+
+    def test_lazy_creation(self):
+        user = self._signup("test_provisioning_lazy")
+        with patch.object(stripe.Customer, "create", side_effect=create_customer):
+            customer, created = user.get_or_create_customer()
+        self.assertTrue(created)
+        self.assertFalse(PendingCustomer.objects.filter(user=user).exists())
+        self.assertEqual(
+            provision_pending(rate=0),
+            {"created": 0, "existing": 0, "failed": 0, "stopped": 0},
+        )
+
+    def test_not_deferred(self):
+        with patch.object(
+            certego_apps_settings, "STRIPE_CUSTOMER_PROVISIONING_DEFERRED", False
+        ), patch.object(stripe.Customer, "create", side_effect=create_customer):
+            user = User.objects.create(
+                username="test_provisioning_now", email="now@test.com"
+            )
+        self.assertTrue(Customer.objects.filter(user=user).exists())
+        self.assertFalse(PendingCustomer.objects.filter(user=user).exists())
@@ -0,0 +1,196 @@
+import datetime
+from types import SimpleNamespace
+from unittest.mock import PropertyMock, patch
+
+import stripe
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.test import tag
+from rest_framework.exceptions import Throttled
+
+from certego_saas.apps.payments.quota import (
+    QuotaAccountant,
+    billing_period,
+    calendar_period,
+)
+from certego_saas.apps.payments.throttling import SubscriptionRateThrottle
+from certego_saas.models import Customer, Subscription, User
+
+from . import CustomTestCase
+
+UTC = datetime.timezone.utc
+
+
+def timestamp(*args) -> int:
+    return int(datetime.datetime(*args, tzinfo=UTC).timestamp())
+
+
+@tag("apps", "payments")
+class TestQuotaAccountant(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = User.objects.create(username="test_quota")
+        self.customer = Customer.objects.create(customer_id="cus_quota", user=self.user)
+        self.subscription = self.customer.currentapp_subscription
+        self.accountant = QuotaAccountant(cache=LocMemCache(f"quota-{self.id()}", {}))
+        patcher = patch.object(
+            Subscription,
+            "monthly_submissions_limit",
+            new_callable=PropertyMock,
+            return_value=3,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.user.delete()
+        return super().tearDown()
+
+    def test_record_and_exhaust(self):
+        self.assertEqual(self.accountant.usage(self.subscription), 0)
+        self.assertFalse(self.accountant.is_exhausted(self.subscription))
+        for expected in (1, 2, 3):
+            self.assertEqual(self.accountant.record(self.subscription), expected)
+        self.assertTrue(self.accountant.is_exhausted(self.subscription))
+
+    def test_reconcile_and_seed(self):
+        for _ in range(2):
+            self.accountant.record(self.subscription)
+        usage = self.customer.quota_usages.get()
+        self.assertEqual(usage.count, 0)
+        self.assertEqual(self.accountant.reconcile(), 1)
+        usage.refresh_from_db()
+        self.assertEqual(usage.count, 2)
+        # nothing changed
+        self.assertEqual(self.accountant.reconcile(), 0)
+        # cache flushed: the counter is seeded from the DB
+        self.accountant.cache.clear()
+        self.assertEqual(self.accountant.usage(self.subscription), 2)
+        self.assertEqual(self.accountant.record(self.subscription), 3)
+
+    def test_throttle(self):
+        request = SimpleNamespace(user=self.user)
+        throttle = SubscriptionRateThrottle()
+        with patch(
+            "certego_saas.apps.payments.throttling.quota_accountant", self.accountant
+        ):
+            self.assertTrue(throttle.allow_request(request, None))
+            for _ in range(3):
+                self.accountant.record(self.subscription)
+            with self.assertRaises(Throttled) as cm:
+                throttle.allow_request(request, None)
+        # no subscription: until the end of the calendar month
+        now = datetime.datetime.now(UTC)
+        expected = (calendar_period(now)[1] - now).total_seconds()
+        self.assertAlmostEqual(cm.exception.wait, expected, delta=2)
+
+    def test_throttle_without_customer(self):
+        user = User.objects.create(username="test_quota_no_customer")
+        self.addCleanup(user.delete)
+        request = SimpleNamespace(user=User.objects.get(pk=user.pk))
+        free = {"id": "prod_free", "name": "free", "metadata": {"max_submissions": "0"}}
+        with patch.object(stripe.Customer, "create") as create, patch(
+            "certego_saas.apps.payments.throttling.get_default_product",
+            return_value=free,
+        ):
+            with self.assertRaises(Throttled):
+                SubscriptionRateThrottle().allow_request(request, None)
+            free["metadata"]["max_submissions"] = "10"
+            self.assertTrue(SubscriptionRateThrottle().allow_request(request, None))
+        create.assert_not_called()
+        self.assertFalse(Customer.objects.filter(user=user).exists())
+
+    def test_reconcile_command(self):
+        with patch(
+            "certego_saas.apps.payments.management.commands.reconcile_quota.quota_accountant",
+            self.accountant,
+        ):
+            self.accountant.record(self.subscription)
+            call_command("reconcile_quota", stdout=open("/dev/null", "w"))
+        self.assertEqual(self.customer.quota_usages.get().count, 1)
+
+    def test_billing_period(self):
+        self.subscription.subscription_id = "sub_quota"
+        retrieved = stripe.Subscription.construct_from(
+            {
+                "id": "sub_quota",
+                "object": "subscription",
+                "current_period_start": timestamp(2026, 1, 15, 10),
+                "current_period_end": timestamp(2026, 2, 15, 10),
+            },
+            "key",
+        )
+        with patch.object(
+            Subscription, "get_subscription", return_value=retrieved
+        ) as get_subscription:
+            start, end = self.accountant.get_period(self.subscription)
+            self.accountant.get_period(self.subscription)
+            # stale bounds: rolled forward to the current period
+            self.assertLessEqual(start, datetime.datetime.now(UTC))
+            self.assertEqual((start.day, start.hour), (15, 10))
+            self.assertEqual(_months(start, end), 1)
+            # cached per customer, until the period ends
+            get_subscription.assert_called_once()
+            self.assertAlmostEqual(
+                self.accountant.seconds_until_reset(self.subscription),
+                (end - datetime.datetime.now(UTC)).total_seconds(),
+                delta=2,
+            )
+            self.accountant.invalidate_period(self.subscription)
+            self.accountant.get_period(self.subscription)
+            self.assertEqual(get_subscription.call_count, 2)
+        self.accountant.record(self.subscription)
+        self.assertEqual(self.customer.quota_usages.get().period_start, start.date())
+
+
+def _months(start, end) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+@tag("apps", "payments")
+class TestPeriods(CustomTestCase):
+    def test_calendar_period(self):
+        now = datetime.datetime(2026, 12, 18, 9, 30, tzinfo=UTC)
+        self.assertEqual(
+            calendar_period(now),
+            (
+                datetime.datetime(2026, 12, 1, tzinfo=UTC),
+                datetime.datetime(2027, 1, 1, tzinfo=UTC),
+            ),
+        )
+
+    def test_monthly_period(self):
+        start, end = timestamp(2026, 1, 31), timestamp(2026, 2, 28)
+        now = datetime.datetime(2026, 1, 31, 12, tzinfo=UTC)
+        self.assertEqual(billing_period(start, end, now)[1].day, 28)
+        # the anchor day is kept over the shorter months
+        now = datetime.datetime(2026, 4, 10, tzinfo=UTC)
+        self.assertEqual(
+            billing_period(start, end, now),
+            (
+                datetime.datetime(2026, 3, 31, tzinfo=UTC),
+                datetime.datetime(2026, 4, 30, tzinfo=UTC),
+            ),
+        )
+        # boundary
+        now = datetime.datetime(2026, 4, 30, tzinfo=UTC)
+        self.assertEqual(billing_period(start, end, now)[0], now)
+
+    def test_yearly_and_weekly_periods(self):
+        start, end = timestamp(2024, 2, 29), timestamp(2025, 2, 28)
+        now = datetime.datetime(2026, 10, 18, tzinfo=UTC)
+        self.assertEqual(
+            billing_period(start, end, now),
+            (
+                datetime.datetime(2026, 2, 28, tzinfo=UTC),
+                datetime.datetime(2027, 2, 28, tzinfo=UTC),
+            ),
+        )
+        start, end = timestamp(2026, 10, 1), timestamp(2026, 10, 8)
+        self.assertEqual(
+            billing_period(start, end, now),
+            (
+                datetime.datetime(2026, 10, 15, tzinfo=UTC),
+                datetime.datetime(2026, 10, 22, tzinfo=UTC),
+            ),
+        )
@@ -0,0 +1,120 @@
+import pickle
+from unittest.mock import patch
+
+import stripe
+from django.test import tag
+
+from certego_saas.apps.payments import serialization
+from certego_saas.apps.payments.serialization import pack, unpack
+from certego_saas.apps.payments.serializers import (
+    InvoiceSerializer,
+    SubscriptionSerializer,
+)
+
+from . import CustomTestCase
+from .test_mirror import INVOICE, PRICE, PRODUCT, SUBSCRIPTION
+
+FULL_INVOICE = {
+    **INVOICE,
+    "hosted_invoice_url": "https://invoice.stripe.com/i/in_mirror",
+    "invoice_pdf": "https://pay.stripe.com/invoice/in_mirror/pdf",
+    "due_date": None,
+    "description": None,
+    "customer_address": {"city": "Modena", "country": "IT"},
+    "status_transitions": {"paid_at": 1000},
+    "lines": {
+        "object": "list",
+        "has_more": False,
+        "data": [
+            {
+                "id": "il_1",
+                "object": "line_item",
+                "description": "1 × Researcher",
+                "period": {"start": 1000, "end": 2000},
+                "price": PRICE,
+                "amount": 1500,
+            }
+        ],
+    },
+}
+FULL_SUBSCRIPTION = {
+    **SUBSCRIPTION,
+    "plan": {
+        "id": "price_mirror",
+        "object": "plan",
+        "currency": "eur",
+        "amount": 1500,
+        "interval": "month",
+        "product": PRODUCT,
+    },
+    "latest_invoice": FULL_INVOICE,
+    "default_payment_method": "pm_secret",
+    "days_until_due": None,
+    "ended_at": None,
+    "cancel_at": None,
+    "canceled_at": None,
+}
+
+
+def normalize(data):
+    return {
+        key: value.to_dict() if isinstance(value, stripe.StripeObject) else value
+        for key, value in data.items()
+    }
+
+
+@tag("apps", "payments")
+class TestSerialization(CustomTestCase):
+    def test_roundtrip(self):
+        subscription = stripe.Subscription.construct_from(FULL_SUBSCRIPTION, "key")
+        packed = pack(subscription)
+        self.assertLess(len(pickle.dumps(packed)), len(pickle.dumps(subscription)))
+        self.assertNotIn("default_payment_method", packed["object"])
+        self.assertNotIn(
+            "price", packed["object"]["latest_invoice"]["lines"]["data"][0]
+        )
+
+        unpacked = unpack(pickle.loads(pickle.dumps(packed)))
+        self.assertIsInstance(unpacked, stripe.Subscription)
+        self.assertEqual(unpacked.plan.product.metadata.max_submissions, "50")
+        self.assertEqual(
+            normalize(InvoiceSerializer(unpacked.latest_invoice).data),
+            normalize(InvoiceSerializer(subscription.latest_invoice).data),
+        )
+        for field in SubscriptionSerializer().fields:
+            if field in FULL_SUBSCRIPTION:
+                self.assertEqual(unpacked[field], subscription[field], field)
+
+    def test_lists_and_versions(self):
+        invoices = [stripe.Invoice.construct_from(FULL_INVOICE, "key")] * 2
+        packed = pack(invoices)
+        self.assertEqual([i.id for i in unpack(packed)], ["in_mirror"] * 2)
+        packed["v"] = serialization.SCHEMA_VERSION + 1
+        self.assertIsNone(unpack(packed))
+        self.assertIsNone(unpack(invoices))
+
+    def test_constructed_once(self):
+        packed = pack(stripe.Subscription.construct_from(FULL_SUBSCRIPTION, "key"))
+        first = unpack(pickle.loads(pickle.dumps(packed)))
+        with patch.object(stripe.Subscription, "construct_from") as construct_from:
+            # as read again from the cache
+            self.assertIs(unpack(pickle.loads(pickle.dumps(packed))), first)
+            construct_from.assert_not_called()
+            # a new entry, e.g. after an invalidation
+            unpack(pack(first))
+            construct_from.assert_called_once()
+
+        invoices = pack([stripe.Invoice.construct_from(FULL_INVOICE, "key")])
+        first = unpack(invoices)
+        second = unpack(invoices)
+        self.assertIsNot(first, second)
+        self.assertIs(first[0], second[0])
+
+    def test_constructed_bounded(self):
+        with patch.object(serialization, "CONSTRUCTED_CACHE_SIZE", 2):
+            packed = [pack(stripe.Invoice.construct_from(FULL_INVOICE, "key"))]
+            first = unpack(packed[0])
+            for _ in range(2):
+                packed.append(pack(first))
+                unpack(packed[-1])
+            self.assertIsNot(unpack(packed[0]), first)
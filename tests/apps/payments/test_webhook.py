@@ -0,0 +1,87 @@
+from unittest.mock import patch
+
+import stripe
+from django.test import override_settings, tag
+
+from certego_saas.apps.payments import utils, webhook
+from certego_saas.apps.payments.catalog import CatalogLoader
+from certego_saas.apps.payments.models import StripeEvent, StripeSubscription
+from certego_saas.apps.payments.utils import get_products
+from certego_saas.apps.payments.webhook import process_event, prune_events
+from certego_saas.models import Customer, User
+
+from . import CustomTestCase
+from .test_mirror import PRICE, PRODUCT, SUBSCRIPTION, make_event
+
+LOCMEM_CACHES = {
+    alias: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": f"test_webhook_{alias}",
+    }
+    for alias in ("default", "certego_saas.payments")
+}
+
+
+@tag("apps", "payments")
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestStripeWebhook(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = User.objects.create(username="test_webhook")
+        self.customer = Customer.objects.create(
+            customer_id="cus_mirror", user=self.user
+        )
+        self.subscription = self.customer.subscriptions.create(
+            subscription_id="sub_mirror", appname="DRAGONFLY"
+        )
+
+    def tearDown(self) -> None:
+        self.user.delete()
+        return super().tearDown()
+
+    def test_duplicated_events(self):
+        event = make_event(SUBSCRIPTION, "customer.subscription.updated")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(process_event(event))
+            self.assertFalse(process_event(event))
+        self.assertEqual(StripeEvent.objects.filter(pk=event["id"]).count(), 1)
+        self.assertEqual(
+            StripeSubscription.objects.get(pk="sub_mirror").status, "active"
+        )
+
+    def test_targeted_invalidation(self):
+        retrieved = stripe.Subscription.construct_from(SUBSCRIPTION, "key")
+        loader = CatalogLoader(check_interval=0, background=False)
+        with patch.object(
+            stripe.Subscription, "retrieve", return_value=retrieved
+        ) as retrieve, patch(
+            "certego_saas.apps.payments.catalog.list_prices",
+            return_value=[{**PRICE, "product": PRODUCT}],
+        ) as list_prices, patch.object(
+            utils, "catalog", loader
+        ), patch.object(
+            webhook, "catalog", loader
+        ):
+            self.subscription.get_subscription()
+            self.subscription.get_subscription(expand=["latest_invoice"])
+            get_products()
+            self.assertEqual(retrieve.call_count, 1)
+
+            # unrelated: the subscription stays cached
+            with self.captureOnCommitCallbacks(execute=True):
+                process_event(make_event(PRODUCT, "product.updated"))
+            self.subscription.get_subscription()
+            self.assertEqual(retrieve.call_count, 1)
+            get_products()
+            self.assertEqual(list_prices.call_count, 2)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                process_event(make_event(SUBSCRIPTION, "customer.subscription.updated"))
+            self.subscription.get_subscription()
+            self.assertEqual(retrieve.call_count, 2)
+
+    def test_prune_events(self):
+        process_event(make_event(PRODUCT, "product.created"))
+        self.assertEqual(prune_events(days=1), 0)
+        StripeEvent.objects.update(received_at="2000-01-01T00:00:00Z")
+        self.assertEqual(prune_events(days=1), 1)
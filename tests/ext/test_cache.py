@@ -0,0 +1,150 @@
+from unittest.mock import patch
+
+from django.test import override_settings, tag
+
+from certego_saas.ext.cache import TwoTierCache
+
+from .. import CustomTestCase
+
+
+def make_cache(**options):
+    return TwoTierCache(
+        "",
+        {
+            "OPTIONS": {
+                "SHARED_ALIAS": "shared",
+                "GENERATION_CHECK_INTERVAL": 0,
+                **options,
+            }
+        },
+    )
+
+
+@tag("ext")
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+        "shared": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test_two_tier_cache",
+        },
+    }
+)
+class TwoTierCacheTestCase(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.cache = make_cache()
+        self.cache.shared.clear()
+
+    def test_tiers(self):
+        self.assertIsNone(self.cache.get("key"))
+        self.cache.set("key", {"value": 1})
+        for _ in range(3):
+            self.assertEqual(self.cache.get("key"), {"value": 1})
+        stats = self.cache.stats()
+        self.assertEqual(stats["shared"], {"hits": 1, "misses": 1})
+        self.assertEqual(stats["local"]["hits"], 2)
+        self.assertEqual(stats["local"]["entries"], 1)
+        self.assertGreater(stats["local"]["bytes"], 0)
+
+    def test_cross_process_invalidation(self):
+        other = make_cache()
+        self.cache.set("key", 1)
+        self.assertEqual(other.get("key"), 1)
+        # set: other processes keep their local copy until it expires
+        self.cache.set("key", 2)
+        self.assertEqual(self.cache.get("key"), 2)
+        self.assertEqual(other.get("key"), 1)
+        # delete: the key is dropped from every local tier
+        self.cache.set("other", 1)
+        other.get("other")
+        self.cache.delete("key")
+        self.assertIsNone(other.get("key"))
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(other.get("other"), 1)
+        self.assertEqual(other.stats()["local"]["hits"], 2)
+        self.cache.delete_many(["other"])
+        self.assertIsNone(other.get("other"))
+
+    def test_missed_deletions(self):
+        other = make_cache()
+        self.cache.set_many({"a": 1, "b": 2})
+        other.get_many(["a", "b"])
+        self.cache.delete("a")
+        # e.g. evicted, or expired before the other process looked
+        self.cache.shared.delete(TwoTierCache.DELETION_KEY % 1)
+        self.assertIsNone(other.get("a"))
+        self.assertEqual(other.get("b"), 2)
+        self.assertEqual(other.stats()["local"]["entries"], 1)
+        # clear: every local tier is dropped
+        other.get("b")
+        self.cache.clear()
+        self.assertIsNone(other.get("b"))
+
+    def test_local_expiration(self):
+        cache = make_cache(LOCAL_TIMEOUT=0)
+        cache.set("key", 1)
+        cache.get("key")
+        cache.shared.set("key", 2)
+        self.assertEqual(cache.get("key"), 2)
+
+    def test_bounds(self):
+        cache = make_cache(LOCAL_MAX_ENTRIES=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+            cache.get(key)
+        self.assertEqual(list(cache._local), [cache.shared.make_key(k) for k in "bc"])
+
+        cache = make_cache(LOCAL_MAX_BYTES=200)
+        cache.set("small", "x")
+        cache.set("big", "x" * 500)
+        cache.get("small")
+        cache.get("big")
+        self.assertEqual(cache.stats()["local"]["entries"], 1)
+        self.assertEqual(cache.get("big"), "x" * 500)
+
+    def test_excluded_prefixes_and_counters(self):
+        cache = make_cache(LOCAL_EXCLUDED_PREFIXES=["quota."])
+        cache.add("quota.counter", 1)
+        self.assertEqual(cache.incr("quota.counter"), 2)
+        self.assertEqual(cache.get("quota.counter"), 2)
+        self.assertEqual(cache.get("quota.counter"), 2)
+        self.assertEqual(cache.stats()["local"]["entries"], 0)
+        self.assertEqual(cache.stats()["shared"]["hits"], 2)
+
+    def test_locks_keep_the_local_tier(self):
+        other = make_cache()
+        self.cache.set("key", 1)
+        other.get("key")
+        self.assertTrue(self.cache.add("lock.key", 1))
+        self.assertFalse(other.add("lock.key", 1))
+        self.cache.delete("lock.key")
+        other.get("key")
+        self.assertEqual(other.stats()["local"]["hits"], 1)
+        self.assertIsNone(self.cache.shared.get(TwoTierCache.DELETIONS_KEY))
+
+    def test_default_excluded_prefixes(self):
+        for key in ("quota.x", "payments.decisions.gen.1", "lock.x"):
+            self.cache.set(key, 1)
+            self.cache.get(key)
+        self.assertEqual(self.cache.stats()["local"]["entries"], 0)
+
+    def test_many(self):
+        self.cache = make_cache(GENERATION_CHECK_INTERVAL=60)
+        self.cache.set_many({"a": 1, "b": 2, "quota.c": 3})
+        self.assertEqual(self.cache.get("a"), 1)
+        with patch.object(
+            self.cache.shared, "get_many", wraps=self.cache.shared.get_many
+        ) as shared_get_many:
+            self.assertEqual(
+                self.cache.get_many(["a", "b", "quota.c", "d"]),
+                {"a": 1, "b": 2, "quota.c": 3},
+            )
+            # "a" from the local tier, one shared round trip for the others
+            shared_get_many.assert_called_once_with(["b", "quota.c", "d"], version=None)
+            shared_get_many.reset_mock()
+            self.assertEqual(self.cache.get_many(["a", "b"]), {"a": 1, "b": 2})
+            shared_get_many.assert_not_called()
+        # set_many drops the stale local copies
+        self.cache.set_many({"a": 10})
+        self.assertEqual(self.cache.get_many(["a"]), {"a": 10})
@@ -0,0 +1,54 @@
+from django.test import tag
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+
+from certego_saas.ext.exceptions import (
+    ExceptionHandlerRegistry,
+    custom_exception_handler,
+)
+
+from .. import CustomTestCase
+
+
+class CustomNotFound(NotFound):
+    pass
+
+
+class DeepCustomNotFound(CustomNotFound):
+    pass
+
+
+def _handler(exc, context, response):
+    return Response({"handled": exc.__class__.__name__})
+
+
+def _other_handler(exc, context, response):
+    return Response({"other": True})
+
+
+@tag("ext", "exceptions")
+class TestExceptionHandlerRegistry(CustomTestCase):
+    def test_resolve_mro(self):
+        registry = ExceptionHandlerRegistry({"APIException": _handler})
+        self.assertIs(registry.resolve(DeepCustomNotFound), _handler)
+        self.assertIsNone(registry.resolve(KeyError))
+
+    def test_resolve_precedence(self):
+        registry = ExceptionHandlerRegistry(
+            {"NotFound": _handler, "CustomNotFound": _other_handler}
+        )
+        self.assertIs(registry.resolve(DeepCustomNotFound), _other_handler)
+        registry.register(DeepCustomNotFound, _handler)
+        self.assertIs(registry.resolve(DeepCustomNotFound), _handler)
+        # dotted path takes precedence over the name
+        registry.register(f"{__name__}.CustomNotFound", _handler)
+        self.assertIs(registry.resolve(CustomNotFound), _handler)
+
+    def test_custom_exception_handler(self):
+        response = custom_exception_handler(ValidationError({"field": ["invalid"]}), {})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"errors": {"field": ["invalid"]}})
+        # subclass of a subclass of NotFound
+        response = custom_exception_handler(DeepCustomNotFound(), {})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("errors", response.data)
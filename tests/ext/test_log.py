@@ -0,0 +1,136 @@
+import json
+import logging
+
+from django.test import tag
+
+from certego_saas.ext.formatters import LOG_SCHEMA, JSONLogFormatter, serialize_log
+from certego_saas.ext.log import DEFAULT_SENSITIVE_FIELDS, LogBuilder
+from certego_saas.ext.redaction import Redactor, get_redactor
+
+from .. import CustomTestCase, User
+
+
+@tag("ext", "log")
+class TestRedactor(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.redactor = Redactor(DEFAULT_SENSITIVE_FIELDS | {"Custom"})
+
+    def test_clean_nested(self):
+        data = {
+            "username": "user",
+            "Password": "hunter2",
+            "custom": "value",
+            "nested": [{"token": "abc", "list": [{"api": 1}]}, b"bytes"],
+        }
+        cleaned = self.redactor.clean(data)
+        self.assertEqual(
+            cleaned,
+            {
+                "username": "user",
+                "Password": "********",
+                "custom": "********",
+                "nested": [
+                    {"token": "********", "list": [{"api": "********"}]},
+                    "bytes",
+                ],
+            },
+        )
+        # input is not modified
+        self.assertEqual(data["Password"], "hunter2")
+        self.assertEqual(data["nested"][0]["token"], "abc")
+
+    def test_clean_serialized_values(self):
+        cleaned = self.redactor.clean(
+            {
+                "dict": "{'secret': 'x', 'other': 1}",
+                "list": " [{'key': 'x'}] ",
+                "number": "5",
+                "text": "[not a literal",
+                "tuple": "('secret', 1)",
+            }
+        )
+        self.assertEqual(cleaned["dict"], {"secret": "********", "other": 1})
+        self.assertEqual(cleaned["list"], [{"key": "********"}])
+        self.assertEqual(cleaned["number"], "5")
+        self.assertEqual(cleaned["text"], "[not a literal")
+        self.assertEqual(cleaned["tuple"], "('secret', 1)")
+
+    def test_clean_oversized_serialized_values(self):
+        redactor = Redactor({"password"}, max_literal_length=64)
+        oversized = repr({"password": "x", "padding": "x" * 64})
+        cleaned = redactor.clean({"dict": oversized, "text": "x" * 100})
+        self.assertEqual(cleaned["dict"], "<truncated>")
+        self.assertEqual(cleaned["text"], "x" * 100)
+
+    def test_clean_scalars(self):
+        self.assertEqual(self.redactor.clean(b"body"), "body")
+        self.assertEqual(self.redactor.clean("body"), "body")
+        self.assertIsNone(self.redactor.clean(None))
+
+    def test_budgets(self):
+        redactor = Redactor({"password"}, max_depth=2, max_nodes=4)
+        deep = {"a": {"b": {"c": {"password": "x"}}}}
+        self.assertEqual(redactor.clean(deep), {"a": {"b": {"c": "<truncated>"}}})
+        wide = {str(i): {"password": "x"} for i in range(5)}
+        cleaned = redactor.clean(wide)
+        self.assertEqual(list(cleaned.values()).count("<truncated>"), 2)
+        self.assertNotIn({"password": "x"}, cleaned.values())
+
+    def test_get_redactor_is_cached(self):
+        self.assertIs(get_redactor({"a", "b"}), get_redactor({"b", "a"}))
+
+    def test_log_builder_clean_data(self):
+        log_builder = LogBuilder(request=None, response=None, view=None)
+        self.assertEqual(log_builder._clean_data({"token": "x"}), {"token": "x"})
+        log_builder.sensitive_fields = {"Extra"}
+        self.assertEqual(
+            log_builder._clean_data({"token": "x", "extra": "y", "other": "z"}),
+            {"token": "********", "extra": "********", "other": "z"},
+        )
+
+
+@tag("ext", "log")
+class TestJSONLogFormatter(CustomTestCase):
+    def _record(self, msg) -> logging.LogRecord:
+        return logging.LogRecord(
+            "test", logging.ERROR, "(unknown file)", 0, msg, (), None
+        )
+
+    def test_format_log_builder_record(self):
+        user = User(pk=7, username="test")
+        line = JSONLogFormatter(max_length=20).format(
+            self._record(
+                {
+                    "requested_at": 0,
+                    "user": user,
+                    "method": "POST",
+                    "body": {"text": "x" * 100},
+                    "response": {"detail": "error"},
+                    "extra": 1,
+                }
+            )
+        )
+        self.assertNotIn("\n", line)
+        payload = json.loads(line)
+        self.assertEqual(
+            list(payload), ["timestamp", "level", "logger", *LOG_SCHEMA, "extra"]
+        )
+        self.assertEqual(payload["level"], "ERROR")
+        self.assertEqual(payload["user_id"], 7)
+        self.assertEqual(payload["requested_at"], "1970-01-01T00:00:00+00:00")
+        # payloads are always strings, truncated or not
+        self.assertEqual(payload["response"], '{"detail":"error"}')
+        self.assertTrue(payload["body"].endswith("...<truncated>"))
+        self.assertEqual(len(payload["body"]), 20 + len("...<truncated>"))
+
+    def test_format_message(self):
+        payload = json.loads(JSONLogFormatter().format(self._record("message")))
+        self.assertEqual(payload["message"], "message")
+        self.assertNotIn("user_id", payload)
+
+    def test_serialize_anonymous(self):
+        serialized = serialize_log({"user": None, "body": None})
+        self.assertIsNone(serialized["user_id"])
+        self.assertIsNone(serialized["requested_at"])
+        self.assertIsNone(serialized["body"])
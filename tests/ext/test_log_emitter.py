@@ -0,0 +1,95 @@
+import logging
+import threading
+
+from django.test import tag
+
+from certego_saas.ext.log_emitter import AsyncLogEmitter
+
+from .. import CustomTestCase
+
+
+class _BlockingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.unblock = threading.Event()
+        self.entered = threading.Event()
+
+    def emit(self, record):
+        self.entered.set()
+        self.unblock.wait(5)
+        self.records.append(record.msg)
+
+
+@tag("ext", "log")
+class TestAsyncLogEmitter(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.handler = _BlockingHandler()
+        self.logger = logging.getLogger("tests.ext.test_log_emitter")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self) -> None:
+        self.handler.unblock.set()
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(logging.NOTSET)
+        return super().tearDown()
+
+    def _fill(self, emitter: AsyncLogEmitter, count: int):
+        # the first record keeps the writer busy inside the handler
+        emitter.emit(self.logger, logging.ERROR, "busy")
+        self.handler.entered.wait(5)
+        for i in range(count):
+            emitter.emit(self.logger, logging.ERROR, i)
+
+    def test_stop_flushes_queue(self):
+        emitter = AsyncLogEmitter(maxsize=10)
+        self.handler.unblock.set()
+        for i in range(5):
+            self.assertTrue(emitter.emit(self.logger, logging.ERROR, i))
+        emitter.stop()
+        self.assertEqual(self.handler.records, [0, 1, 2, 3, 4])
+        self.assertEqual(
+            emitter.stats(), {"queued": 5, "dropped": 0, "emitted": 5, "size": 0}
+        )
+
+    def test_drop_oldest(self):
+        emitter = AsyncLogEmitter(maxsize=3, policy=AsyncLogEmitter.DROP_OLDEST)
+        self._fill(emitter, 5)
+        self.handler.unblock.set()
+        emitter.stop()
+        self.assertEqual(self.handler.records, ["busy", 2, 3, 4])
+        self.assertEqual(emitter.stats()["dropped"], 2)
+
+    def test_block(self):
+        emitter = AsyncLogEmitter(
+            maxsize=2, policy=AsyncLogEmitter.BLOCK, block_timeout=0.01
+        )
+        self._fill(emitter, 3)
+        self.handler.unblock.set()
+        emitter.stop()
+        self.assertEqual(self.handler.records, ["busy", 0, 1])
+        self.assertEqual(emitter.stats()["dropped"], 1)
+
+    def test_sample(self):
+        emitter = AsyncLogEmitter(
+            maxsize=10, policy=AsyncLogEmitter.SAMPLE, sample_rate=0.5
+        )
+        self._fill(emitter, 11)
+        self.handler.unblock.set()
+        emitter.stop()
+        # 5 records are always admitted, then 1 out of 2
+        self.assertEqual(self.handler.records, ["busy", 0, 1, 2, 3, 4, 5, 7, 9])
+        self.assertEqual(emitter.stats()["dropped"], 3)
+
+    def test_disabled_level(self):
+        emitter = AsyncLogEmitter()
+        self.logger.setLevel(logging.CRITICAL)
+        self.assertFalse(emitter.emit(self.logger, logging.ERROR, "ignored"))
+        self.assertEqual(emitter.stats()["queued"], 0)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            AsyncLogEmitter(policy="unknown")
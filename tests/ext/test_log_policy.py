@@ -0,0 +1,117 @@
+import logging
+import time
+from unittest.mock import patch
+
+from django.test import tag
+from rest_framework.exceptions import APIException, NotFound
+
+from certego_saas.ext import log_policy
+from certego_saas.ext.log_policy import LogPolicy, get_log_policy
+
+from .. import CustomTestCase
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _View:
+    pass
+
+
+@tag("ext", "log")
+class TestLogPolicy(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.clock = _Clock()
+
+    def test_no_policies(self):
+        policy = LogPolicy({}, clock=self.clock)
+        self.assertTrue(all(policy.allow(APIException()) for _ in range(100)))
+
+    def test_token_bucket(self):
+        policy = LogPolicy({"default": {"rate": 1, "burst": 3}}, clock=self.clock)
+        decisions = [policy.allow(APIException()) for _ in range(5)]
+        self.assertEqual(decisions, [True, True, True, False, False])
+        self.clock.now += 1
+        self.assertTrue(policy.allow(APIException()))
+        self.assertFalse(policy.allow(APIException()))
+
+    def test_sample_rate(self):
+        policy = LogPolicy({"APIException": {"sample_rate": 0.25}}, clock=self.clock)
+        # resolved through the MRO
+        decisions = [policy.allow(NotFound()) for _ in range(8)]
+        self.assertEqual(decisions.count(True), 2)
+
+    def test_view_policy(self):
+        view = _View()
+        policy = LogPolicy(
+            {f"{__name__}._View": {"rate": 0, "burst": 1}}, clock=self.clock
+        )
+        self.assertTrue(policy.allow(APIException(), view))
+        self.assertFalse(policy.allow(APIException(), view))
+        # other views are not limited
+        self.assertTrue(policy.allow(APIException()))
+        self.assertTrue(policy.allow(APIException()))
+
+    def test_summary(self):
+        policy = LogPolicy(
+            {"default": {"rate": 0, "burst": 1}}, summary_interval=60, clock=self.clock
+        )
+        for _ in range(4):
+            policy.allow(APIException())
+        with self.assertLogs("certego_saas.ext.log_policy", logging.WARNING) as cm:
+            self.clock.now += 61
+            policy.allow(APIException())
+        self.assertEqual(len(cm.records), 1)
+        self.assertIn("suppressed 4 similar errors", cm.output[0])
+        # counters are reset after the summary
+        policy.allow(APIException())
+        with self.assertLogs("certego_saas.ext.log_policy", logging.WARNING) as cm:
+            policy.flush(force=True)
+        self.assertIn("suppressed 1 similar errors", cm.output[0])
+
+    def test_sample_rate_zero(self):
+        policy = LogPolicy({"default": {"sample_rate": 0}}, clock=self.clock)
+        self.assertFalse(any(policy.allow(APIException()) for _ in range(3)))
+        with self.assertLogs("certego_saas.ext.log_policy", logging.WARNING) as cm:
+            policy.flush(force=True)
+        self.assertIn("suppressed 3 similar errors", cm.output[0])
+
+    def test_background_flush(self):
+        policy = LogPolicy({"default": {"rate": 0, "burst": 1}}, summary_interval=0.05)
+        self.addCleanup(policy.stop)
+        for _ in range(3):
+            policy.allow(APIException())
+        with self.assertLogs("certego_saas.ext.log_policy", logging.WARNING) as cm:
+            # no more errors: flushed by the thread
+            policy.start()
+            time.sleep(0.2)
+        self.assertIn("suppressed 2 similar errors", cm.output[0])
+
+    def test_restart_after_fork(self):
+        policy = LogPolicy({"default": {"rate": 0}}, summary_interval=60)
+        self.addCleanup(policy.stop)
+        policy.start()
+        parent_thread = policy._thread
+        policy.start()
+        self.assertIs(policy._thread, parent_thread)
+        # in a forked child the parent's thread isn't running
+        with patch.object(log_policy.os, "getpid", return_value=-1):
+            policy.start()
+        self.assertIsNot(policy._thread, parent_thread)
+        self.assertTrue(policy._thread.is_alive())
+
+    @patch.object(log_policy, "atexit")
+    def test_get_log_policy_thread(self, _):
+        for policies, started in (({}, False), ({"default": {"rate": 1}}, True)):
+            with patch.object(log_policy, "_log_policy", None), patch.object(
+                log_policy.certego_apps_settings, "LOG_SAMPLING_POLICIES", policies
+            ):
+                policy = get_log_policy()
+                self.addCleanup(policy.stop)
+                self.assertEqual(policy._thread is not None, started)
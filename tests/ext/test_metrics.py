@@ -0,0 +1,82 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import tag
+
+from certego_saas.ext.metrics import (
+    LatencyHistogram,
+    SpaceSaving,
+    ThrottleMetrics,
+    throttle_decision,
+)
+
+from .. import CustomTestCase
+
+
+@tag("ext", "metrics")
+class TestThrottleMetrics(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.cache = LocMemCache(f"metrics-{self.id()}", {})
+        self.metrics = ThrottleMetrics(
+            top_keys=3, publish_interval=3600, cache=self.cache
+        )
+
+    def test_space_saving(self):
+        sketch = SpaceSaving(capacity=3)
+        for key, count in (("a", 50), ("b", 30), ("c", 1), ("d", 1), ("e", 10)):
+            for _ in range(count):
+                sketch.add(key)
+        top = sketch.top(2)
+        self.assertEqual([key for key, _, _ in top], ["a", "b"])
+        self.assertEqual(top[0][1], 50)
+        self.assertEqual(sketch.total, 92)
+        self.assertEqual(len(sketch.top()), 3)
+
+    def test_latency_histogram(self):
+        histogram = LatencyHistogram()
+        for milliseconds in (0.1, 0.7, 3, 5000):
+            histogram.observe(milliseconds)
+        data = histogram.to_dict()
+        self.assertEqual(data["count"], 4)
+        self.assertEqual(data["buckets"]["le_0.5"], 1)
+        self.assertEqual(data["buckets"]["le_1"], 1)
+        self.assertEqual(data["buckets"]["le_5"], 1)
+        self.assertEqual(data["buckets"]["le_inf"], 1)
+
+    def test_record_and_collect(self):
+        received = []
+
+        def receiver(sender, **kwargs):
+            received.append(kwargs)
+
+        throttle_decision.connect(receiver)
+        self.addCleanup(throttle_decision.disconnect, receiver)
+
+        self.metrics.record("POST_model", "key_1", True, 0.001)
+        self.metrics.record("POST_model", "key_1", False, 0.002)
+        self.metrics.record("POST_default", "key_2", True, 0.001)
+        self.assertEqual(len(received), 3)
+        self.assertFalse(received[1]["allowed"])
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(
+            snapshot["decisions"]["POST_model"], {"allowed": 1, "denied": 1}
+        )
+        self.assertEqual(snapshot["hot_keys"][0][:2], ("key_1", 2))
+
+        # nothing published yet
+        self.assertEqual(self.metrics.collect()["processes"], [])
+        self.metrics.publish()
+        other = ThrottleMetrics(top_keys=3, cache=self.cache)
+        other.process_id = "other"
+        other.record("POST_model", "key_2", False, 0.001)
+        other.publish()
+
+        collected = self.metrics.collect()
+        self.assertEqual(len(collected["processes"]), 2)
+        self.assertEqual(
+            collected["decisions"]["POST_model"], {"allowed": 1, "denied": 2}
+        )
+        self.assertEqual(collected["latencies"]["POST_model"]["count"], 3)
+        self.assertEqual(
+            sorted(collected["hot_keys"]), [("key_1", 2, 0), ("key_2", 2, 0)]
+        )
@@ -0,0 +1,236 @@
+import importlib.util
+import multiprocessing
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import tag
+
+from certego_saas.apps.organization.models import Organization
+from certego_saas.ext.test_utilities.shared_cache import SharedMemoryCache
+from certego_saas.ext.throttling import (
+    AtomicThrottleEngine,
+    POSTModelUserRateThrottle,
+    POSTUserRateThrottle,
+    _CustomUserRateThrottle,
+    certego_apps_settings,
+    get_user_throttle_rates,
+)
+
+from .. import CustomTestCase, User
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _View:
+    action = "create"
+
+
+class GCRAPOSTModelUserRateThrottle(POSTModelUserRateThrottle):
+    engine = "gcra"
+
+
+class AtomicPOSTModelUserRateThrottle(POSTModelUserRateThrottle):
+    engine = "atomic"
+
+
+@tag("ext", "throttling")
+class TestThrottling(CustomTestCase):
+    throttle_class = GCRAPOSTModelUserRateThrottle
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = User(pk=1, username="throttled")
+        self.request = SimpleNamespace(user=self.user, method="POST", META={})
+        self.cache = LocMemCache(f"throttling-{self.id()}", {})
+        self.clock = _Clock()
+
+    def _throttle(self):
+        throttle = self.throttle_class()
+        throttle.cache = self.cache
+        throttle.timer = self.clock
+        return throttle
+
+    def _allow(self) -> bool:
+        return self._throttle().allow_request(self.request, _View())
+
+    def test_burst_then_steady_rate(self):
+        # 15/min: burst of 15 requests
+        self.assertTrue(all(self._allow() for _ in range(15)))
+        throttle = self._throttle()
+        self.assertFalse(throttle.allow_request(self.request, _View()))
+        self.assertAlmostEqual(throttle.wait(), 4.0)
+        # one request every 4 seconds
+        self.clock.now += 4
+        self.assertTrue(self._allow())
+        self.assertFalse(self._allow())
+
+    def test_recover_after_duration(self):
+        for _ in range(15):
+            self._allow()
+        self.assertFalse(self._allow())
+        self.clock.now += 60
+        self.assertTrue(all(self._allow() for _ in range(15)))
+        self.assertFalse(self._allow())
+
+    def test_ignored_method(self):
+        self.request.method = "GET"
+        self.assertTrue(all(self._allow() for _ in range(30)))
+
+    def test_keys_are_per_user(self):
+        for _ in range(15):
+            self._allow()
+        self.assertFalse(self._allow())
+        self.request.user = User(pk=2, username="other")
+        self.assertTrue(self._allow())
+
+
+@tag("ext", "throttling")
+class TestAtomicThrottling(TestThrottling):
+    throttle_class = AtomicPOSTModelUserRateThrottle
+
+    def test_burst_then_steady_rate(self):
+        # fixed window: 15 requests per minute
+        self.assertTrue(all(self._allow() for _ in range(15)))
+        throttle = self._throttle()
+        self.assertFalse(throttle.allow_request(self.request, _View()))
+        self.assertAlmostEqual(throttle.wait(), 20.0)
+        self.clock.now += 20
+        self.assertTrue(self._allow())
+
+    def test_no_redis_client(self):
+        self.assertIsNone(AtomicThrottleEngine.get_redis_client(self.cache))
+
+    @unittest.skipUnless(importlib.util.find_spec("redis"), "redis not installed")
+    def test_lua_script_by_sha(self):
+        from redis.exceptions import NoScriptError
+
+        loaded = set()
+
+        class Client:
+            # a new client per request, as RedisCache.get_client()
+            def evalsha(self, sha, numkeys, *args):
+                if sha not in loaded:
+                    raise NoScriptError()
+                return [1, "0"]
+
+            def eval(self, script, numkeys, *args):
+                loaded.add(AtomicThrottleEngine.LUA_GCRA_SHA)
+                return [1, "0"]
+
+        engine = AtomicThrottleEngine()
+        for _ in range(3):
+            self.assertEqual(
+                engine._allow_lua(Client(), self.cache, "key", 10, 60, 0.0),
+                (True, None),
+            )
+        self.assertEqual(len(loaded), 1)
+
+    def test_multiprocess(self):
+        cache = SharedMemoryCache()
+        self.addCleanup(cache.shutdown)
+        ctx = multiprocessing.get_context("fork")
+        admitted = ctx.Value("i", 0)
+        request = self.request
+
+        def worker():
+            throttle = self.throttle_class()
+            throttle.cache = cache
+            throttle.timer = lambda: 1000.0
+            for _ in range(10):
+                if throttle.allow_request(request, _View()):
+                    with admitted.get_lock():
+                        admitted.value += 1
+
+        processes = [ctx.Process(target=worker) for _ in range(6)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+            self.assertEqual(process.exitcode, 0)
+        self.assertEqual(admitted.value, 15)
+
+
+@tag("ext", "throttling")
+class TestThrottleRates(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = User.objects.create(username="test_throttle_rates")
+        self.organization = Organization.create("test_throttle_org", self.user)
+        self.user.refresh_from_db()
+        self.cache = LocMemCache(f"throttling-{self.id()}", {})
+
+    def tearDown(self) -> None:
+        self.organization.delete()
+        self.user.delete()
+        return super().tearDown()
+
+    def _allowed(self, count: int) -> int:
+        request = SimpleNamespace(user=self.user, method="POST", META={})
+        allowed = 0
+        for _ in range(count):
+            throttle = GCRAPOSTModelUserRateThrottle()
+            throttle.cache = self.cache
+            allowed += throttle.allow_request(request, _View())
+        return allowed
+
+    def test_default_rate(self):
+        self.assertEqual(POSTModelUserRateThrottle().rate, "15/min")
+        with patch.object(
+            certego_apps_settings, "THROTTLE_RATES", {"POST_model": "20/min"}
+        ):
+            self.assertEqual(POSTModelUserRateThrottle().rate, "20/min")
+            self.assertEqual(self._allowed(30), 20)
+
+    def test_drf_rate(self):
+        class MyScopeThrottle(_CustomUserRateThrottle):
+            scope = "myscope"
+
+        with patch.object(MyScopeThrottle, "THROTTLE_RATES", {"myscope": "10/min"}):
+            self.assertEqual(MyScopeThrottle().rate, "10/min")
+
+    @patch(
+        "certego_saas.ext.throttling._get_product_throttle_rates",
+        return_value={"POST_model": "3/min"},
+    )
+    def test_product_rate(self, _):
+        self.assertEqual(self._allowed(10), 3)
+
+    @patch(
+        "certego_saas.ext.throttling._get_product_throttle_rates",
+        return_value={"POST_model": "3/min"},
+    )
+    def test_organization_rate(self, _):
+        with patch.object(
+            certego_apps_settings,
+            "ORGANIZATION_THROTTLE_RATES",
+            {"test_throttle_org": {"POST_model": "2/min"}},
+        ):
+            self.assertEqual(self._allowed(10), 2)
+
+    @patch("certego_saas.ext.throttling.get_user_throttle_rates", return_value={})
+    def test_rates_resolved_once_per_request(self, mocked):
+        request = SimpleNamespace(user=self.user, method="POST", META={})
+        for throttle_class in (
+            POSTModelUserRateThrottle,
+            POSTUserRateThrottle,
+        ):
+            throttle = throttle_class()
+            throttle.cache = self.cache
+            throttle.allow_request(request, _View())
+        self.assertEqual(mocked.call_count, 1)
+
+    @patch(
+        "certego_saas.ext.throttling._get_product_throttle_rates",
+        side_effect=RuntimeError("stripe is down"),
+    )
+    def test_product_rate_failure(self, _):
+        with self.assertLogs("certego_saas.ext.throttling", "WARNING"):
+            self.assertEqual(get_user_throttle_rates(self.user), {})
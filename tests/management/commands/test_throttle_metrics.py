@@ -0,0 +1,27 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+
+from certego_saas.ext.metrics import ThrottleMetrics
+from tests import CustomTestCase
+
+
+class TestThrottleMetrics(CustomTestCase):
+    def test_dump(self):
+        metrics = ThrottleMetrics(cache=LocMemCache("test_throttle_metrics", {}))
+        metrics.record("POST_model", "key_1", False, 0.001)
+        metrics.publish()
+        with patch(
+            "certego_saas.management.commands.throttle_metrics.throttle_metrics",
+            metrics,
+        ):
+            out = StringIO()
+            call_command("throttle_metrics", stdout=out)
+            self.assertIn("POST_model: 0 allowed, 1 denied", out.getvalue())
+            out = StringIO()
+            call_command("throttle_metrics", "--json", stdout=out)
+            snapshot = json.loads(out.getvalue())
+            self.assertEqual(snapshot["hot_keys"], [["key_1", 1, 0]])